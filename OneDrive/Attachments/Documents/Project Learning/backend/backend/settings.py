@@ -73,6 +73,33 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # File-backed test DB (not in-memory) so threaded tests get normal
+            # SQLite locking instead of "table is locked" errors.
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+
+# Cache: Redis when REDIS_URL is set (same instance as the live-event pub/sub),
+# else per-process local memory. Used for analytics response caching; keys
+# include the team's data version so writes invalidate them automatically.
+# LocMemCache evicts least-recently-used entries past MAX_ENTRIES; on Redis set
+# maxmemory-policy allkeys-lru for the same behaviour.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+            "TIMEOUT": 60 * 60,
+            "KEY_PREFIX": "sportshub",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "sportshub",
+            "TIMEOUT": 60 * 60,
+            "OPTIONS": {"MAX_ENTRIES": 1000},
         }
     }
 
@@ -92,6 +119,12 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024 * 1024  # 10 GB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024         # 10 MB in RAM, rest streamed to disk
 
+# Let the front web server send recordings / media after Django checks access
+# (see stato/media.py). "" = Django streams the bytes itself,
+# "x-accel-redirect" = nginx (internal location at MEDIA_OFFLOAD_PREFIX), "x-sendfile" = Apache etc.
+MEDIA_OFFLOAD = os.environ.get("MEDIA_OFFLOAD", "").lower()
+MEDIA_OFFLOAD_PREFIX = os.environ.get("MEDIA_OFFLOAD_PREFIX", "/protected-media/")
+
 # ----------------------------
 # CORS – allow frontend (Expo / web) to call API
 # ----------------------------
@@ -103,8 +136,16 @@ from corsheaders.defaults import default_headers
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "authorization",
     "content-type",
+    "if-none-match",
+    "upload-checksum",
+    "upload-length",
+    "upload-offset",
 ]
 
+# Let web clients read the ETag so they can poll with If-None-Match,
+# and the resumable-upload offset (stato/uploads.py)
+CORS_EXPOSE_HEADERS = ["ETag", "Upload-Offset", "Upload-Length", "Location"]
+
 CORS_ALLOW_METHODS = [
     "DELETE",
     "GET",
@@ -128,7 +169,8 @@ CSRF_TRUSTED_ORIGINS = _trusted.split(",") if _trusted else [
 # ----------------------------
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication that trusts the team_id / role claims (no DB lookups)
+        "stato.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
@@ -143,3 +185,21 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+
+# ----------------------------
+# xG model (see stato/xg_models.py)
+# ----------------------------
+XG_MODEL = os.environ.get("XG_MODEL", "zone_v1")
+
+# ----------------------------
+# Media worker (manage.py run_media_jobs, see stato/media_jobs.py)
+# ----------------------------
+FFMPEG_BINARY = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+
+# HLS renditions of recordings (stato/hls.py). Off by default: transcoding a
+# full match takes minutes of worker CPU. (name, height, video bitrate).
+HLS_ENABLED = os.environ.get("HLS_ENABLED", "false").lower() in ("1", "true", "yes")
+HLS_RENDITIONS = [
+    ("360p", 360, "800k"),
+    ("720p", 720, "2500k"),
+]
@@ -19,7 +19,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.http import JsonResponse, HttpResponse
 import os
-import re
+
+from stato.media import offload_enabled, offload_response, ranged_file_response
+from stato.clips import CLIPS_ROOT
+from stato.hls import HLS_ROOT
+from stato.uploads import UPLOAD_STAGING_DIR
 
 def root_view(request):
     """Respond to GET / so WebSocket clients hitting the wrong server get a clear response."""
@@ -45,46 +49,38 @@ def _serve_media_with_ranges(request, path):
         return r
     media_root = os.path.abspath(str(settings.MEDIA_ROOT))
     file_path = os.path.normpath(os.path.join(media_root, path))
-    if not file_path.startswith(media_root) or not os.path.isfile(file_path):
+    staging_root = os.path.join(media_root, UPLOAD_STAGING_DIR)
+    hls_root = os.path.join(media_root, HLS_ROOT)
+    clips_root = os.path.join(media_root, CLIPS_ROOT)
+    if (
+        not file_path.startswith(media_root)
+        or file_path.startswith(staging_root)  # half-finished uploads
+        or file_path.startswith(hls_root)  # only via the signed /recording/hls/ endpoint
+        or file_path.startswith(clips_root)  # only via the signed clip stream endpoint
+        or not os.path.isfile(file_path)
+    ):
         r = HttpResponse(status=404)
         _add_cors_headers(request, r)
         return r
-    size = os.path.getsize(file_path)
     content_type = "application/octet-stream"
     if path.lower().endswith(".mp4"):
         content_type = "video/mp4"
     elif path.lower().endswith(".webm"):
         content_type = "video/webm"
-    range_header = request.META.get("HTTP_RANGE")
-    if not range_header:
-        with open(file_path, "rb") as f:
-            content = f.read()
-        response = HttpResponse(content, status=200, content_type=content_type)
-        response["Content-Length"] = str(size)
-        response["Accept-Ranges"] = "bytes"
+    elif path.lower().endswith((".jpg", ".jpeg")):
+        content_type = "image/jpeg"
+    elif path.lower().endswith(".vtt"):
+        content_type = "text/vtt"
+    elif path.lower().endswith(".json"):
+        content_type = "application/json"
+    if offload_enabled():
+        # The front server sends the file (and handles Range)
+        response = offload_response(os.path.relpath(file_path, media_root), content_type)
         _add_cors_headers(request, response)
         return response
-    match = re.match(r"bytes=(\d*)-(\d*)", range_header)
-    if not match:
-        r = HttpResponse(status=416)
-        _add_cors_headers(request, r)
-        return r
-    start_s, end_s = match.groups()
-    start = int(start_s) if start_s else 0
-    end = int(end_s) if end_s else size - 1
-    if start >= size:
-        r = HttpResponse(status=416)
-        _add_cors_headers(request, r)
-        return r
-    end = min(end, size - 1)
-    length = end - start + 1
-    with open(file_path, "rb") as f:
-        f.seek(start)
-        content = f.read(length)
-    response = HttpResponse(content, status=206, content_type=content_type)
-    response["Content-Range"] = f"bytes {start}-{end}/{size}"
-    response["Content-Length"] = str(length)
-    response["Accept-Ranges"] = "bytes"
+    size = os.path.getsize(file_path)
+    # Streams the file / range in fixed-size chunks (or sendfile); never reads it whole
+    response = ranged_file_response(request, open(file_path, "rb"), size, content_type)
     _add_cors_headers(request, response)
     return response
 
@@ -0,0 +1,177 @@
+"""
+Materialised per-team, per-season totals (TeamSeasonAggregate).
+
+Write paths keep the rows current: shot xG is added with an atomic F()
+update on the hot path, and the rarer writes (match created, score patched,
+match finished, squad changed) refresh just the affected (team, season) row.
+Read endpoints then load a handful of rows instead of aggregating every
+match. `manage.py rebuild_team_aggregates` rebuilds everything from scratch.
+
+Functions take an optional `apps` registry so the data migration can use
+historical models.
+"""
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+SCOPES = ("all", "finished")
+
+
+def season_key(season):
+    """Aggregate rows use "" for matches with no season."""
+    return season or ""
+
+
+def _season_filter(key):
+    if key:
+        return Q(season=key)
+    return Q(season__isnull=True) | Q(season="")
+
+
+def match_totals(matches_qs):
+    """
+    Goals, xG, W/D/L and match count for a set of matches in one
+    conditional-aggregate query.
+    """
+    decimal = DecimalField(max_digits=10, decimal_places=2)
+    return matches_qs.aggregate(
+        match_count=Count("id"),
+        total_goals_scored=Coalesce(Sum("goals_scored"), 0),
+        total_goals_conceded=Coalesce(Sum("goals_conceded"), 0),
+        total_xg=Coalesce(Sum("xg"), Value(Decimal("0")), output_field=decimal),
+        total_xg_against=Coalesce(Sum("xg_against"), Value(Decimal("0")), output_field=decimal),
+        wins=Count("id", filter=Q(goals_scored__gt=F("goals_conceded"))),
+        draws=Count("id", filter=Q(goals_scored=F("goals_conceded"))),
+        losses=Count("id", filter=Q(goals_scored__lt=F("goals_conceded"))),
+    )
+
+
+def _formation_stats(matches_qs):
+    rows = matches_qs.exclude(formation__isnull=True).exclude(formation="").values("formation").annotate(
+        matches=Count("id"),
+        wins=Count("id", filter=Q(goals_scored__gt=F("goals_conceded"))),
+        draws=Count("id", filter=Q(goals_scored=F("goals_conceded"))),
+        losses=Count("id", filter=Q(goals_scored__lt=F("goals_conceded"))),
+        goals_for=Coalesce(Sum("goals_scored"), 0),
+        goals_against=Coalesce(Sum("goals_conceded"), 0),
+    )
+    return {row.pop("formation"): row for row in rows}
+
+
+def refresh_team_season(team_id, season, apps=global_apps):
+    """Recompute both scopes of one (team, season) aggregate from the match data."""
+    Match = apps.get_model("stato", "Match")
+    PlayerEventStat = apps.get_model("stato", "PlayerEventStat")
+    TeamSeasonAggregate = apps.get_model("stato", "TeamSeasonAggregate")
+
+    key = season_key(season)
+    season_matches = Match.objects.filter(team_id=team_id).filter(_season_filter(key))
+
+    for scope in SCOPES:
+        matches = season_matches if scope == "all" else season_matches.filter(state="finished")
+        totals = match_totals(matches)
+
+        event_totals = {}
+        if scope == "finished":
+            event_stats = PlayerEventStat.objects.filter(team_id=team_id, match__in=matches).values("event").annotate(
+                total=Sum("count"),
+                matches=Count("match", distinct=True),
+            )
+            event_totals = {
+                row["event"]: {"total": row["total"] or 0, "matches": row["matches"]}
+                for row in event_stats
+            }
+
+        TeamSeasonAggregate.objects.update_or_create(
+            team_id=team_id,
+            season=key,
+            scope=scope,
+            defaults={
+                "match_count": totals["match_count"],
+                "goals_scored": totals["total_goals_scored"],
+                "goals_conceded": totals["total_goals_conceded"],
+                "wins": totals["wins"],
+                "draws": totals["draws"],
+                "losses": totals["losses"],
+                "xg": totals["total_xg"],
+                "xg_against": totals["total_xg_against"],
+                "formations": _formation_stats(matches),
+                "event_totals": event_totals,
+            },
+        )
+
+
+def refresh_team(team_id, apps=global_apps):
+    """Recompute every season aggregate for one team (e.g. after squad changes)."""
+    Match = apps.get_model("stato", "Match")
+    TeamSeasonAggregate = apps.get_model("stato", "TeamSeasonAggregate")
+
+    seasons = {season_key(s) for s in Match.objects.filter(team_id=team_id).values_list("season", flat=True).distinct()}
+    seasons |= set(TeamSeasonAggregate.objects.filter(team_id=team_id).values_list("season", flat=True))
+    for season in seasons:
+        refresh_team_season(team_id, season, apps=apps)
+
+
+def rebuild_all(team_ids=None, apps=global_apps):
+    """Rebuild aggregates for the given teams (default: every team). Returns the team count."""
+    Team = apps.get_model("stato", "Team")
+    teams = Team.objects.all()
+    if team_ids:
+        teams = teams.filter(id__in=team_ids)
+    count = 0
+    for team_id in teams.values_list("id", flat=True):
+        refresh_team(team_id, apps=apps)
+        count += 1
+    return count
+
+
+def add_season_xg(match, amount):
+    """Hot path: add a shot's xG to the match's season aggregate rows."""
+    if not amount:
+        return
+    TeamSeasonAggregate = global_apps.get_model("stato", "TeamSeasonAggregate")
+    scopes = ["all", "finished"] if match.state == "finished" else ["all"]
+    TeamSeasonAggregate.objects.filter(
+        team_id=match.team_id,
+        season=season_key(match.season),
+        scope__in=scopes,
+    ).update(xg=F("xg") + amount)
+
+
+def season_totals(team, season=None, scope="all"):
+    """
+    Totals for one season (or all seasons when season is None) in one query.
+    Returns a dict with the TeamSeasonAggregate counters plus merged
+    `formations` and `event_totals`.
+    """
+    TeamSeasonAggregate = global_apps.get_model("stato", "TeamSeasonAggregate")
+    rows = TeamSeasonAggregate.objects.filter(team=team, scope=scope)
+    if season:
+        rows = rows.filter(season=season)
+
+    totals = {
+        "match_count": 0,
+        "goals_scored": 0,
+        "goals_conceded": 0,
+        "wins": 0,
+        "draws": 0,
+        "losses": 0,
+        "xg": Decimal("0"),
+        "xg_against": Decimal("0"),
+        "formations": {},
+        "event_totals": {},
+    }
+    for row in rows:
+        for field in ("match_count", "goals_scored", "goals_conceded", "wins", "draws", "losses", "xg", "xg_against"):
+            totals[field] += getattr(row, field)
+        for formation, data in (row.formations or {}).items():
+            merged = totals["formations"].setdefault(formation, dict.fromkeys(data, 0))
+            for k, v in data.items():
+                merged[k] = merged.get(k, 0) + v
+        for event, data in (row.event_totals or {}).items():
+            merged = totals["event_totals"].setdefault(event, {"total": 0, "matches": 0})
+            merged["total"] += data.get("total", 0)
+            merged["matches"] += data.get("matches", 0)
+    return totals
@@ -0,0 +1,116 @@
+"""
+JWT authentication that trusts the signed team_id / role claims.
+
+CustomTokenObtainPairSerializer stamps team_id, role and the profile's
+auth_version into every token. When the token's auth_version is still the
+user's current one, ClaimsJWTAuthentication returns a lazy User (only the
+pk loaded) carrying the claims, and _get_team() turns team_id into a lazy
+Team, so the usual request does no identity queries at all.
+
+Join / leave / removal from a squad bump Profile.auth_version
+(bump_auth_version). Tokens minted before that no longer match, and their
+claims are ignored: the request falls back to the normal User -> Profile ->
+Team lookup, so a stale token never grants the old team. The current
+version is read from Django's cache when it is shared between workers
+(Redis in production) and only hits the database on a miss. With a
+per-process cache (LocMemCache when REDIS_URL is unset) a bump could only
+clear the worker that handled it, so the version is always read from the
+database: one single-column query instead of User -> Profile -> Team.
+
+Tokens without the claims (issued before this existed) always take the
+database path. The lazy user skips simplejwt's is_active check; accounts
+are never deactivated through the app, and access tokens live 30 minutes.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Profile, Team
+
+AUTH_VERSION_TIMEOUT = 300
+
+
+def _auth_version_key(user_id):
+    return f"authv:{user_id}"
+
+
+def _cache_is_shared():
+    """False for caches that live inside one process, where another worker's bump can't be seen."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def current_auth_version(user_id):
+    """The user's Profile.auth_version, from the cache when it is shared between workers."""
+    def from_db():
+        return Profile.objects.filter(user_id=user_id).values_list("auth_version", flat=True).first()
+
+    if not _cache_is_shared():
+        return from_db()
+    key = _auth_version_key(user_id)
+    try:
+        version = cache.get(key)
+    except Exception:
+        version = None
+    if version is None:
+        version = from_db()
+        if version is None:
+            return None
+        try:
+            cache.set(key, version, AUTH_VERSION_TIMEOUT)
+        except Exception:
+            pass
+    return version
+
+
+def bump_auth_version(user_ids):
+    """Invalidate the team/role claims in these users' existing tokens."""
+    user_ids = [uid for uid in user_ids if uid]
+    if not user_ids:
+        return
+    Profile.objects.filter(user_id__in=user_ids).update(auth_version=F("auth_version") + 1)
+    try:
+        cache.delete_many([_auth_version_key(uid) for uid in user_ids])
+    except Exception:
+        pass
+
+
+def team_handle(team_id):
+    """
+    Team with only the pk loaded: works in filters, FK assignments and
+    related managers without a query; other fields load on first access.
+    """
+    return Team.from_db(DEFAULT_DB_ALIAS, ["id"], [team_id])
+
+
+def load_team(team):
+    """Load every field of a team_handle() in one query (no-op for a full Team)."""
+    deferred = team.get_deferred_fields()
+    if deferred:
+        team.refresh_from_db(fields=list(deferred))
+    return team
+
+
+def token_claims(user):
+    """(team_id, role) trusted from the token, or None if this request has to look them up."""
+    return getattr(user, "token_claims", None)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        claimed = validated_token.get("auth_version")
+        if user_id is None or claimed is None or "team_id" not in validated_token:
+            return super().get_user(validated_token)
+
+        if current_auth_version(user_id) != claimed:
+            # Membership changed since the token was issued: ignore its claims
+            return super().get_user(validated_token)
+
+        user = User.from_db(DEFAULT_DB_ALIAS, ["id"], [User._meta.pk.to_python(user_id)])
+        user.token_claims = (validated_token.get("team_id"), validated_token.get("role"))
+        return user
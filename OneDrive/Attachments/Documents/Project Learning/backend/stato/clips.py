@@ -0,0 +1,104 @@
+"""
+Per-event highlight clips, cut by the "clips" media job (stato/media_jobs.py).
+
+For every timed event in a recorded match, ffmpeg stream-copies
+CLIP_BEFORE seconds before to CLIP_AFTER seconds after the event into
+clips/<match_id>/<event_id>.mp4 - no re-encoding, so a clip takes a fraction
+of a second. Those paths are guessable, so /media/ refuses CLIPS_ROOT and
+clips are only served through the signed /players/<id>/clips/<event>/stream/
+URLs the playlist endpoint hands out. Stream copy can only start on a keyframe, so the start is the
+keyframe at or before (second - CLIP_BEFORE) from the seek index, and
+start_second records where the clip really begins.
+
+The job is queued when a recording is attached and when timed events are
+added to a finished match. Events that already have a clip of the current
+recording are skipped, and a cut that fails is logged and the job moves on
+to the next event; the job then fails so the worker's retry cuts just the
+missing ones. Deleting an event (or its player) deletes its clip file.
+"""
+import logging
+import os
+import subprocess
+
+from django.core.files.storage import default_storage
+
+from .media_jobs import MediaJobError, ffmpeg_binary, register_media_job
+from .models import HighlightClip, MatchRecording, PlayerEventInstance
+from .seek_index import load_seek_index
+
+logger = logging.getLogger(__name__)
+
+CLIP_BEFORE = 8
+CLIP_AFTER = 4
+FFMPEG_TIMEOUT = 120
+CLIPS_ROOT = "clips"
+
+
+def clip_window(index, second):
+    """(start, duration) of the clip for an event at `second`, start snapped to a keyframe."""
+    start = max(second - CLIP_BEFORE, 0)
+    keyframe = index.keyframe_at(start) if index else None
+    if keyframe:
+        start = keyframe[0]
+    return start, second + CLIP_AFTER - start
+
+
+def cut_clip(ffmpeg, source_path, target_path, start, duration):
+    """Stream-copy [start, start + duration) of source_path into target_path (written atomically)."""
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp_path = f"{target_path}.tmp.mp4"
+    try:
+        subprocess.run(
+            [
+                ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+                "-ss", f"{start:.3f}", "-i", source_path, "-t", f"{duration:.3f}",
+                "-map", "0", "-c", "copy", "-avoid_negative_ts", "make_zero",
+                "-movflags", "+faststart", tmp_path,
+            ],
+            check=True, capture_output=True, timeout=FFMPEG_TIMEOUT,
+        )
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@register_media_job("clips")
+def cut_highlight_clips(match):
+    recording_name = MatchRecording.objects.filter(match=match).values_list("file", flat=True).first()
+    if not recording_name or not default_storage.exists(recording_name):
+        return 0
+    events = (
+        PlayerEventInstance.objects.filter(match=match, second__isnull=False)
+        .exclude(clip__source=recording_name)
+        .order_by("second", "id")
+    )
+    if not events.exists():
+        return 0
+
+    ffmpeg = ffmpeg_binary()
+    source_path = default_storage.path(recording_name)
+    index = load_seek_index(recording_name)
+    count = 0
+    failed = []
+    for event in events:
+        start, duration = clip_window(index, event.second)
+        name = f"{CLIPS_ROOT}/{match.id}/{event.id}.mp4"
+        try:
+            cut_clip(ffmpeg, source_path, default_storage.path(name), start, duration)
+        except subprocess.CalledProcessError as e:
+            logger.warning("ffmpeg failed on event %s: %s", event.id, e.stderr.decode(errors="replace")[-500:])
+            failed.append(event.id)
+            continue
+        except subprocess.TimeoutExpired:
+            logger.warning("ffmpeg timed out on event %s", event.id)
+            failed.append(event.id)
+            continue
+        HighlightClip.objects.update_or_create(
+            event=event,
+            defaults={"file": name, "source": recording_name, "start_second": start, "duration": duration},
+        )
+        count += 1
+    if failed:
+        raise MediaJobError(f"Cut {count} clips; ffmpeg failed on events {', '.join(map(str, failed))}.")
+    return count
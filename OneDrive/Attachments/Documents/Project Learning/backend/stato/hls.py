@@ -0,0 +1,143 @@
+"""
+HLS renditions of match recordings, built by the "hls" media job
+(stato/media_jobs.py) when settings.HLS_ENABLED is on.
+
+ffmpeg transcodes the recording once into every HLS_RENDITIONS entry (never
+upscaling past the source height), with keyframes forced every
+HLS_SEGMENT_SECONDS so the renditions' segments line up and a player can
+switch bitrate at any boundary. Output, under hls/<recording name without
+extension>/:
+
+    master.m3u8              variant playlist listing the renditions
+    <name>/index.m3u8        VOD media playlist of one rendition
+    <name>/seg-00000.ts ...  ~6 s MPEG-TS segments
+
+Clients fetch everything through the signed /recording/hls/ endpoint in
+stato/views_match.py: it checks the same stream token as /recording/stream/
+and appends it to every URI in the playlists. /media/ refuses HLS_ROOT, like
+upload staging. Segments never change once written, so they are served
+public and immutable: a CDN or proxy in front can cache them (keyed on the
+signed URL), and clients don't re-download on seek.
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .media_jobs import MediaJobError, ffmpeg_binary, register_media_job
+from .models import MatchRecording
+from .mp4 import Mp4Error, has_audio, read_moov
+from .versioning import bump_team_version
+
+HLS_SEGMENT_SECONDS = 6
+FFMPEG_TIMEOUT = 4 * 3600
+HLS_ROOT = "hls"
+MASTER_NAME = "master.m3u8"
+
+# The only files the signed endpoint will serve from an HLS directory
+_HLS_PATH = re.compile(r"^(master\.m3u8|[\w-]+/(index\.m3u8|seg-\d{5}\.ts))$")
+
+
+def hls_dir(recording_name):
+    return f"{HLS_ROOT}/{os.path.splitext(recording_name)[0]}"
+
+
+def hls_file(recording_name, path):
+    """Storage name of `path` inside the recording's HLS directory, or None if it isn't a playlist or segment."""
+    if not _HLS_PATH.match(path or ""):
+        return None
+    return f"{hls_dir(recording_name)}/{path}"
+
+
+def has_hls(recording_name):
+    return default_storage.exists(f"{hls_dir(recording_name)}/{MASTER_NAME}")
+
+
+def delete_hls(recording_name):
+    shutil.rmtree(default_storage.path(hls_dir(recording_name)), ignore_errors=True)
+
+
+def sign_playlist(text, token):
+    """Append ?token= to every URI line of an m3u8 playlist (tags and comments start with #)."""
+    suffix = f"?token={quote(token, safe='')}"
+    return "\n".join(
+        line + suffix if line.strip() and not line.startswith("#") else line
+        for line in text.split("\n")
+    )
+
+
+def _source_has_audio(path):
+    try:
+        _, moov = read_moov(path)
+    except (Mp4Error, OSError):
+        return True  # Not an MP4 we can read; let ffmpeg decide
+    return has_audio(moov)
+
+
+def ffmpeg_command(ffmpeg, source_path, out_dir, renditions, audio):
+    count = len(renditions)
+    graph = f"[0:v]split={count}" + "".join(f"[v{i}]" for i in range(count)) + ";" + ";".join(
+        f"[v{i}]scale=-2:min(ih\\,{height})[out{i}]" for i, (_, height, _) in enumerate(renditions)
+    )
+    command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", source_path, "-filter_complex", graph]
+    stream_map = []
+    for i, (name, _, bitrate) in enumerate(renditions):
+        command += ["-map", f"[out{i}]", f"-b:v:{i}", bitrate, f"-maxrate:v:{i}", bitrate]
+        if audio:
+            command += ["-map", "0:a:0"]
+            stream_map.append(f"v:{i},a:{i},name:{name}")
+        else:
+            stream_map.append(f"v:{i},name:{name}")
+    command += [
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})", "-sc_threshold", "0",
+    ]
+    if audio:
+        command += ["-c:a", "aac", "-b:a", "96k", "-ac", "2"]
+    command += [
+        "-f", "hls", "-hls_time", str(HLS_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(out_dir, "%v", "seg-%05d.ts"),
+        "-master_pl_name", MASTER_NAME,
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(out_dir, "%v", "index.m3u8"),
+    ]
+    return command
+
+
+@register_media_job("hls")
+def build_hls(match):
+    recording_name = MatchRecording.objects.filter(match=match).values_list("file", flat=True).first()
+    if not recording_name or not default_storage.exists(recording_name) or has_hls(recording_name):
+        return 0
+
+    ffmpeg = ffmpeg_binary()
+    renditions = settings.HLS_RENDITIONS
+    source_path = default_storage.path(recording_name)
+    target = default_storage.path(hls_dir(recording_name))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Built in a scratch directory and renamed into place, so players never see a partial set
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(target), prefix=".hls-")
+    try:
+        for name, _, _ in renditions:
+            os.makedirs(os.path.join(tmp_dir, name))
+        try:
+            subprocess.run(
+                ffmpeg_command(ffmpeg, source_path, tmp_dir, renditions, _source_has_audio(source_path)),
+                check=True, capture_output=True, timeout=FFMPEG_TIMEOUT,
+            )
+        except subprocess.CalledProcessError as e:
+            raise MediaJobError(f"ffmpeg failed: {e.stderr.decode(errors='replace')[-500:]}")
+        os.chmod(tmp_dir, 0o755)
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(tmp_dir, target)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    # Playback URLs now include hls_url
+    bump_team_version(match.team_id)
+    return len(renditions)
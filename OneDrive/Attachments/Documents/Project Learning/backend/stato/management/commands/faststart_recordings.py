@@ -0,0 +1,25 @@
+# management/commands/faststart_recordings.py
+from django.core.management.base import BaseCommand
+
+from stato.models import Match
+from stato.uploads import prepare_attached_recording
+
+
+class Command(BaseCommand):
+    help = 'Rewrite existing MP4 recordings with moov first, set duration_seconds from the file and rebuild seek indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, help='Only recordings for this team id')
+
+    def handle(self, *args, **options):
+        matches = Match.objects.exclude(recording__file="").filter(recording__isnull=False)
+        if options.get('team'):
+            matches = matches.filter(team_id=options['team'])
+
+        count = 0
+        for match in matches.iterator():
+            # Same work as the "prepare" media job, so size / revision (stream tokens) stay in step
+            count += prepare_attached_recording(match)
+        self.stdout.write(
+            self.style.SUCCESS(f'Checked {count} recording(s)')
+        )
@@ -0,0 +1,24 @@
+# management/commands/purge_stale_uploads.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from stato.models import RecordingUpload
+from stato.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable recording uploads (and their staging files) untouched for --hours'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48, help='Age of the last chunk (default 48)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = list(RecordingUpload.objects.filter(updated_at__lt=cutoff))
+        for upload in stale:
+            discard_upload(upload)
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {len(stale)} stale upload(s)')
+        )
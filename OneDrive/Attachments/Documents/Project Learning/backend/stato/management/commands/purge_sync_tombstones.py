@@ -0,0 +1,14 @@
+# management/commands/purge_sync_tombstones.py
+from django.core.management.base import BaseCommand
+
+from stato.sync import TOMBSTONE_RETENTION, purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than TOMBSTONE_RETENTION (older sync tokens get a full snapshot)'
+
+    def handle(self, *args, **options):
+        count = purge_tombstones()
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {count} tombstone(s) older than {TOMBSTONE_RETENTION.days} days')
+        )
@@ -0,0 +1,40 @@
+# management/commands/rebuild_match_xg.py
+from django.core.management.base import BaseCommand
+from stato.aggregates import refresh_team_season
+from stato.versioning import bump_team_version
+from stato.models import Match
+from stato.views import _update_match_xg
+
+
+class Command(BaseCommand):
+    help = 'Recalculate Match.xg from shot events (repairs any drift from live increments)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, help='Only rebuild matches for this team id')
+        parser.add_argument('--match', type=int, help='Only rebuild this match id')
+
+    def handle(self, *args, **options):
+        matches = Match.objects.all()
+        if options.get('team'):
+            matches = matches.filter(team_id=options['team'])
+        if options.get('match'):
+            matches = matches.filter(id=options['match'])
+
+        count = 0
+        seasons = set()
+        for match in matches.iterator():
+            old_xg = match.xg
+            _update_match_xg(match)
+            count += 1
+            seasons.add((match.team_id, match.season))
+            if old_xg != match.xg:
+                self.stdout.write(f'Match {match.id}: xG {old_xg} -> {match.xg}')
+
+        for team_id, season in seasons:
+            refresh_team_season(team_id, season)
+        for team_id in {team_id for team_id, _season in seasons}:
+            bump_team_version(team_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\nRebuilt xG for {count} match(es)')
+        )
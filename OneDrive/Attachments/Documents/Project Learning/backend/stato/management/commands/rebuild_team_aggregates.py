@@ -0,0 +1,17 @@
+# management/commands/rebuild_team_aggregates.py
+from django.core.management.base import BaseCommand
+from stato.aggregates import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild TeamSeasonAggregate rows (season totals) from match and stat data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, help='Only rebuild this team id')
+
+    def handle(self, *args, **options):
+        team_ids = [options['team']] if options.get('team') else None
+        count = rebuild_all(team_ids=team_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt season aggregates for {count} team(s)')
+        )
@@ -0,0 +1,66 @@
+# management/commands/rescore_shot_xg.py
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from stato.aggregates import rebuild_all
+from stato.models import Match, PlayerEventInstance, Team
+from stato.versioning import bump_team_version
+from stato.xg_models import SHOT_EVENTS, get_xg_model, score_shots, xg_model_names
+
+
+class Command(BaseCommand):
+    help = 'Re-score every stored shot with an xG model, then rebuild Match.xg and season totals from the new values'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', help=f'xG model name (default: settings.XG_MODEL). One of: {", ".join(xg_model_names())}')
+        parser.add_argument('--team', type=int, help='Only re-score shots for this team id')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        model = options.get('model')
+        try:
+            get_xg_model(model)
+        except KeyError:
+            raise CommandError(f'Unknown xG model "{model}". Available: {", ".join(xg_model_names())}')
+
+        shots = PlayerEventInstance.objects.filter(event__in=SHOT_EVENTS)
+        matches = Match.objects.all()
+        if options.get('team'):
+            shots = shots.filter(team_id=options['team'])
+            matches = matches.filter(team_id=options['team'])
+
+        batch_size = options['batch_size']
+        count = 0
+        last_id = 0
+        with transaction.atomic():
+            while True:
+                batch = list(shots.filter(id__gt=last_id).order_by('id').only('id', 'event', 'zone')[:batch_size])
+                if not batch:
+                    break
+                values = score_shots([s.event for s in batch], [s.zone for s in batch], model=model)
+                for shot, xg in zip(batch, values):
+                    shot.xg = xg
+                PlayerEventInstance.objects.bulk_update(batch, ['xg'], batch_size=1000)
+                count += len(batch)
+                last_id = batch[-1].id
+
+            # Match totals follow from the stored per-shot values in one UPDATE
+            match_xg = (
+                PlayerEventInstance.objects.filter(match=OuterRef('pk'), event__in=SHOT_EVENTS)
+                .values('match')
+                .annotate(total=Sum('xg'))
+                .values('total')
+            )
+            matches.update(xg=Coalesce(Subquery(match_xg), Value(Decimal('0'))), updated_at=timezone.now())
+            rebuild_all(team_ids=[options['team']] if options.get('team') else None)
+            for team_id in Team.objects.filter(matches__in=matches).values_list('id', flat=True).distinct():
+                bump_team_version(team_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Re-scored {count} shot(s) and rebuilt match xG')
+        )
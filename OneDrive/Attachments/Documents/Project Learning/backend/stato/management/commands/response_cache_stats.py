@@ -0,0 +1,31 @@
+# management/commands/response_cache_stats.py
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from stato.versioning import reset_response_cache_stats, response_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the analytics response cache hit/miss counters (summed over all workers '
+        'with the Redis cache; the local-memory fallback only counts this process)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        # Import every view so each cached one is listed, even with no traffic yet
+        import_module(settings.ROOT_URLCONF)
+        stats = response_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = f'{stats["hits"] / total:.0%}' if total else '-'
+        self.stdout.write(f'all: {stats["hits"]} hits, {stats["misses"]} misses ({ratio} hit rate)')
+        views = sorted({name.rsplit('.', 1)[0] for name in stats if '.' in name})
+        for view in views:
+            self.stdout.write(f'{view}: {stats[f"{view}.hits"]} hits, {stats[f"{view}.misses"]} misses')
+        if options['reset']:
+            reset_response_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
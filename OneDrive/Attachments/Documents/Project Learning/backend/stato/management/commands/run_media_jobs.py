@@ -0,0 +1,26 @@
+# management/commands/run_media_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from stato.media_jobs import run_next_job
+
+
+class Command(BaseCommand):
+    help = 'Media worker: run queued recording jobs (highlight clips, ...) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once, then exit')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            job = run_next_job()
+            if job is not None:
+                self.stdout.write(f'{job.kind} for match {job.match_id}: {job.status}' + (f' ({job.error})' if job.error else ''))
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
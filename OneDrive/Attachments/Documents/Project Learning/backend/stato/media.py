@@ -0,0 +1,155 @@
+"""
+Memory-bounded file responses with HTTP Range support, shared by the
+recording stream endpoint and /media/ (backend/urls.py).
+
+Whole-file responses use FileResponse, which hands the open file to the
+WSGI server's wsgi.file_wrapper (gunicorn uses os.sendfile) or falls back
+to reading fixed-size blocks. Range responses stream CHUNK_SIZE reads from
+a generator that stops at the end of the range. Either way a request holds
+at most one chunk in memory, whatever the file size.
+
+With settings.MEDIA_OFFLOAD set, the views still do their auth / token
+checks but hand the bytes to the front web server instead (offload_response):
+  "x-accel-redirect": nginx; MEDIA_OFFLOAD_PREFIX must be an internal
+                      location aliased to MEDIA_ROOT, e.g.
+                        location /protected-media/ { internal; alias /app/media/; }
+  "x-sendfile":       Apache mod_xsendfile, lighttpd, etc.; gets the absolute path.
+The front server then handles Range itself, so a video request costs the
+Python worker microseconds instead of the whole download.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+OFFLOAD_MODES = ("x-accel-redirect", "x-sendfile")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, or None to send the
+    whole file (no header or a form we don't handle, e.g. multiple ranges).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    header = (header or "").strip()
+    if not header:
+        return None
+    match = _RANGE_RE.match(header)
+    if not match:
+        if header.startswith("bytes=") and "," not in header:
+            raise RangeNotSatisfiable()
+        return None
+    start_s, end_s = match.groups()
+    if not start_s and not end_s:
+        raise RangeNotSatisfiable()
+    if not start_s:
+        # Suffix range: the last N bytes
+        suffix = int(end_s)
+        if suffix == 0:
+            raise RangeNotSatisfiable()
+        return max(size - suffix, 0), size - 1
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def iter_file_range(f, start, length, chunk_size=CHUNK_SIZE):
+    """Yield `length` bytes of `f` from `start` in chunk_size reads; closes `f` when done."""
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def copy_range(src, dst, start, length):
+    """
+    Append `length` bytes of `src` from `start` to `dst` (files opened with
+    buffering=0). Uses os.copy_file_range so the kernel moves the bytes;
+    falls back to CHUNK_SIZE reads where that isn't available (non-Linux,
+    old kernels, cross-device).
+    """
+    copied = 0
+    try:
+        while copied < length:
+            n = os.copy_file_range(src.fileno(), dst.fileno(), length - copied, start + copied)
+            if n == 0:
+                break
+            copied += n
+    except (AttributeError, OSError):
+        pass
+    src.seek(start + copied)
+    while copied < length:
+        chunk = src.read(min(CHUNK_SIZE, length - copied))
+        if not chunk:
+            break
+        dst.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def ranged_file_response(request, f, size, content_type):
+    """
+    200 with the whole file, 206 with the requested range, or 416. Takes
+    ownership of the open file `f` (closed when the response finishes).
+    """
+    try:
+        byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+    except RangeNotSatisfiable:
+        f.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type, as_attachment=False)
+        response["Content-Length"] = str(size)
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(iter_file_range(f, start, length), status=206, content_type=content_type)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def offload_enabled():
+    return getattr(settings, "MEDIA_OFFLOAD", "") in OFFLOAD_MODES
+
+
+def offload_response(name, content_type):
+    """
+    Empty response telling the front server to send MEDIA_ROOT/<name> itself
+    (it honours the client's Range header). Only call when offload_enabled();
+    `name` must already be checked to lie inside MEDIA_ROOT.
+    """
+    response = HttpResponse(content_type=content_type)
+    name = name.replace(os.sep, "/").lstrip("/")
+    if settings.MEDIA_OFFLOAD == "x-accel-redirect":
+        prefix = settings.MEDIA_OFFLOAD_PREFIX.rstrip("/")
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(name)}"
+    else:
+        response["X-Sendfile"] = os.path.join(os.path.abspath(str(settings.MEDIA_ROOT)), name)
+    return response
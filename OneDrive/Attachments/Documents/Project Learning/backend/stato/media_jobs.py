@@ -0,0 +1,107 @@
+"""
+Background post-processing of match recordings.
+
+Web requests only queue a MediaJob (enqueue_media_job); `manage.py
+run_media_jobs` (the `worker` process in the Procfile) claims jobs one at a
+time and runs the handler registered for the job's kind. Jobs are
+idempotent - a handler works out what is missing and does only that - so a
+job queued twice, or retried after a crash, is harmless. At most one pending
+job exists per (match, kind).
+
+A worker that dies mid-job leaves its row "running". Once it has been
+running for longer than RUNNING_TIMEOUT (more than any handler is allowed
+to take), the next run_next_job() puts it back to pending - or marks it
+failed if it is out of attempts or another pending job already covers it.
+"""
+import importlib
+import logging
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import MediaJob
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+# Longer than the slowest handler may run (stato/hls.py gives ffmpeg 4 h)
+RUNNING_TIMEOUT = timedelta(hours=5)
+
+# Modules that register handlers; imported by the worker, not by web requests
+HANDLER_MODULES = ("stato.uploads", "stato.clips", "stato.sprites", "stato.hls")
+
+_HANDLERS = {}
+
+
+class MediaJobError(Exception):
+    """A job can't run here (e.g. ffmpeg is missing). Retried up to MAX_ATTEMPTS."""
+
+
+def ffmpeg_binary():
+    binary = shutil.which(getattr(settings, "FFMPEG_BINARY", "ffmpeg"))
+    if not binary:
+        raise MediaJobError("ffmpeg not found; install it or set FFMPEG_BINARY.")
+    return binary
+
+
+def register_media_job(kind):
+    """Decorator: register fn(match) as the handler for MediaJob.kind == `kind`."""
+    def decorator(fn):
+        _HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def get_handler(kind):
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+    return _HANDLERS[kind]
+
+
+def enqueue_media_job(match_id, kind):
+    """Queue `kind` for the match unless it is already waiting; runs after the current transaction commits."""
+    def create():
+        MediaJob.objects.get_or_create(match_id=match_id, kind=kind, status="pending")
+    transaction.on_commit(create)
+
+
+def reclaim_stale_jobs():
+    """Requeue (or fail) jobs left "running" by a worker that died. Returns how many were requeued."""
+    now = timezone.now()
+    stale = MediaJob.objects.filter(status="running", updated_at__lt=now - RUNNING_TIMEOUT)
+    queued = MediaJob.objects.filter(match=OuterRef("match"), kind=OuterRef("kind"), status="pending")
+    stale.filter(Q(attempts__gte=MAX_ATTEMPTS) | Exists(queued)).update(
+        status="failed", error="Worker stopped while running the job.", updated_at=now
+    )
+    return stale.update(status="pending", updated_at=now)
+
+
+def run_next_job():
+    """Claim and run the oldest pending job. Returns it, or None if the queue is empty."""
+    reclaim_stale_jobs()
+    for job in MediaJob.objects.filter(status="pending").order_by("created_at", "id")[:10]:
+        # Conditional update, so two workers never run the same job
+        claimed = MediaJob.objects.filter(pk=job.pk, status="pending").update(
+            status="running", attempts=job.attempts + 1, updated_at=timezone.now()
+        )
+        if claimed:
+            break
+    else:
+        return None
+
+    job.refresh_from_db()
+    try:
+        get_handler(job.kind)(job.match)
+    except Exception as e:
+        logger.exception("Media job %s failed", job.pk)
+        job.status = "failed" if job.attempts >= MAX_ATTEMPTS else "pending"
+        job.error = f"{type(e).__name__}: {e}"
+    else:
+        job.status = "done"
+        job.error = ""
+    job.save(update_fields=["status", "error", "updated_at"])
+    return job
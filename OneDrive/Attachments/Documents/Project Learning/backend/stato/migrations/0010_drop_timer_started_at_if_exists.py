@@ -4,9 +4,17 @@ from django.db import migrations
 
 
 def drop_timer_started_at(apps, schema_editor):
-    schema_editor.execute(
-        "ALTER TABLE stato_match DROP COLUMN IF EXISTS timer_started_at;"
-    )
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE stato_match DROP COLUMN IF EXISTS timer_started_at;"
+        )
+        return
+    # SQLite has no DROP COLUMN IF EXISTS, so check the table first.
+    with connection.cursor() as cursor:
+        columns = [c.name for c in connection.introspection.get_table_description(cursor, "stato_match")]
+    if "timer_started_at" in columns:
+        schema_editor.execute("ALTER TABLE stato_match DROP COLUMN timer_started_at;")
 
 
 class Migration(migrations.Migration):
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:59
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copy of xg_models.zone_v1 as it was when xg was added, so this
+# migration gives the same result whatever the live model code becomes.
+SHOT_EVENTS = ("shots_on_target", "shots_off_target")
+BATCH_SIZE = 1000
+
+
+def zone_v1_xg(event, zone):
+    if event == "shots_on_target":
+        if zone in ("1", "2", "3"):
+            return Decimal("0.30")
+        if zone in ("4", "5", "6"):
+            return Decimal("0.10")
+        return Decimal("0.20")
+    return Decimal("0.05")
+
+
+def score_existing_shots(apps, schema_editor):
+    PlayerEventInstance = apps.get_model("stato", "PlayerEventInstance")
+    shots = PlayerEventInstance.objects.filter(event__in=SHOT_EVENTS).only("id", "event", "zone").order_by("id")
+    batch = []
+    for shot in shots.iterator(chunk_size=BATCH_SIZE):
+        shot.xg = zone_v1_xg(shot.event, shot.zone)
+        batch.append(shot)
+        if len(batch) >= BATCH_SIZE:
+            PlayerEventInstance.objects.bulk_update(batch, ["xg"])
+            batch = []
+    if batch:
+        PlayerEventInstance.objects.bulk_update(batch, ["xg"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0010_drop_timer_started_at_if_exists'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playereventinstance',
+            name='xg',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True),
+        ),
+        migrations.RunPython(score_existing_shots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_aggregates(apps, schema_editor):
+    from stato.aggregates import rebuild_all
+
+    rebuild_all(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0011_playereventinstance_xg'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamSeasonAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(blank=True, default='', max_length=10)),
+                ('scope', models.CharField(choices=[('all', 'All matches'), ('finished', 'Finished matches')], default='all', max_length=10)),
+                ('match_count', models.PositiveIntegerField(default=0)),
+                ('goals_scored', models.PositiveIntegerField(default=0)),
+                ('goals_conceded', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('draws', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('xg', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('xg_against', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('formations', models.JSONField(blank=True, default=dict)),
+                ('event_totals', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='season_aggregates', to='stato.team')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('team', 'season', 'scope'), name='uniq_team_season_scope_aggregate')],
+            },
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0012_teamseasonaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
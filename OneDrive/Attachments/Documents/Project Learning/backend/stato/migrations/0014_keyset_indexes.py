@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0013_team_data_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['team', 'created_at', 'id'], name='chat_team_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playereventinstance',
+            index=models.Index(fields=['match', 'second', 'id'], name='event_match_second_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playereventstat',
+            index=models.Index(fields=['team', 'updated_at', 'id'], name='stat_team_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playereventstat',
+            index=models.Index(fields=['match', 'updated_at', 'id'], name='stat_match_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0014_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('match', 'Match'), ('player', 'Player'), ('stat', 'Player event stat'), ('event', 'Event instance'), ('chat', 'Chat message')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team', 'updated_at'], name='match_team_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playereventinstance',
+            index=models.Index(fields=['team', 'created_at'], name='event_team_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='synctombstone',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_tombstones', to='stato.team'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['team', 'deleted_at'], name='tombstone_team_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0015_sync_support'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='auth_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0019_media_jobs_highlight_clips'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(choices=[('clips', 'Highlight clips'), ('sprites', 'Thumbnail sprites')], max_length=20),
+        ),
+    ]
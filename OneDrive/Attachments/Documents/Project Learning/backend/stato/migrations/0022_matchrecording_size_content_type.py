@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:20
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# Frozen copy of stream_token.content_type_for_recording
+_CONTENT_TYPES = {".mov": "video/quicktime", ".mp4": "video/mp4", ".webm": "video/webm"}
+
+
+def backfill_size_and_content_type(apps, schema_editor):
+    MatchRecording = apps.get_model("stato", "MatchRecording")
+    for recording in MatchRecording.objects.exclude(file="").only("id", "file").iterator(chunk_size=500):
+        name = recording.file.name
+        try:
+            size = default_storage.size(name)
+        except FileNotFoundError:
+            size = None
+        content_type = next(
+            (ct for ext, ct in _CONTENT_TYPES.items() if name.lower().endswith(ext)), "video/mp4"
+        )
+        MatchRecording.objects.filter(pk=recording.pk).update(size=size, content_type=content_type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0021_mediajob_hls_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchrecording',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='matchrecording',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_size_and_content_type, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0022_matchrecording_size_content_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(choices=[('prepare', 'Faststart and seek index'), ('clips', 'Highlight clips'), ('sprites', 'Thumbnail sprites'), ('hls', 'HLS renditions')], max_length=20),
+        ),
+    ]
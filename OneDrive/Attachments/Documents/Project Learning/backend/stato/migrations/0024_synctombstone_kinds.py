@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0023_mediajob_prepare_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='synctombstone',
+            name='kind',
+            field=models.CharField(choices=[('player', 'Player'), ('stat', 'Player event stat'), ('event', 'Event instance')], max_length=10),
+        ),
+    ]
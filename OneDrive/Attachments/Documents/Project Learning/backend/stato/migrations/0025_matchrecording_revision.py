@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:05
+
+import os
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def backfill_revision(apps, schema_editor):
+    MatchRecording = apps.get_model("stato", "MatchRecording")
+    for recording in MatchRecording.objects.exclude(file="").only("id", "file").iterator(chunk_size=500):
+        try:
+            stat = os.stat(default_storage.path(recording.file.name))
+        except FileNotFoundError:
+            continue
+        MatchRecording.objects.filter(pk=recording.pk).update(size=stat.st_size, revision=stat.st_mtime_ns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stato', '0024_synctombstone_kinds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchrecording',
+            name='revision',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_revision, migrations.RunPython.noop),
+    ]
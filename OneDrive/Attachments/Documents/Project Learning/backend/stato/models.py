@@ -1,6 +1,8 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
@@ -24,6 +26,10 @@ class Team(models.Model):
     team_code = models.CharField(max_length=10, unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Bumped by every write to the team's data; read endpoints derive their
+    # ETag from it (see stato/versioning.py)
+    data_version = models.PositiveBigIntegerField(default=0)
+
     def save(self, *args, **kwargs):
         if not self.team_code or self.team_code == '':
             import random
@@ -59,6 +65,10 @@ class Profile(models.Model):
         "Player", on_delete=models.SET_NULL, null=True, blank=True, related_name="user_profile"
     )
 
+    # Stamped into JWTs; bumped when team membership changes so tokens
+    # issued before that stop being trusted (see stato/authentication.py)
+    auth_version = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return f"{self.user.username} ({self.role})"
 
@@ -145,8 +155,15 @@ class Match(models.Model):
     xg = models.DecimalField(max_digits=5, decimal_places=2, default=0.00, help_text="Expected Goals for")
     xg_against = models.DecimalField(max_digits=5, decimal_places=2, default=0.00, help_text="Expected Goals Against")
 
+    # Any change to the match row (timer, score, xG); drives /api/sync/.
+    # Queryset .update() calls must set it explicitly.
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ["-kickoff_at", "-created_at"]
+        indexes = [
+            models.Index(fields=["team", "updated_at"], name="match_team_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.team.team_name} vs {self.opponent} @ {self.kickoff_at}"
@@ -170,6 +187,11 @@ class PlayerEventStat(models.Model):
                 name="uniq_team_match_player_event",
             ),
         ]
+        # keyset pagination: (updated_at, id) within a team / match
+        indexes = [
+            models.Index(fields=["team", "updated_at", "id"], name="stat_team_updated_idx"),
+            models.Index(fields=["match", "updated_at", "id"], name="stat_match_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.team_id} | m{self.match_id} | {self.player.name} - {self.event}: {self.count}"
@@ -193,10 +215,19 @@ class PlayerEventInstance(models.Model):
     # simple pitch zone bucket (e.g. "1".."6"), aligned with the manager UI
     zone = models.CharField(max_length=8, null=True, blank=True)
 
+    # xG of this shot, scored when it is logged (null for non-shot events)
+    # so player/match/season xG are plain SUMs. See stato/xg_models.py.
+    xg = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["created_at"]
+        # keyset pagination: (second, id) within a match; sync: created since
+        indexes = [
+            models.Index(fields=["match", "second", "id"], name="event_match_second_idx"),
+            models.Index(fields=["team", "created_at"], name="event_team_created_idx"),
+        ]
 
     def __str__(self):
         return f"m{self.match_id} #{self.player_id} {self.event}@{self.second}s (z={self.zone})"
@@ -213,6 +244,12 @@ class MatchRecording(models.Model):
 
     # Optional metadata – can be filled by frontend or left empty
     duration_seconds = models.PositiveIntegerField(null=True, blank=True)
+    # Set by uploads.attach_recording, so stream tokens are signed without a stat
+    size = models.BigIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    # The file's st_mtime_ns when attached / last rewritten (faststart): a
+    # rewrite can keep the size, so stream tokens check this too
+    revision = models.BigIntegerField(null=True, blank=True)
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
@@ -220,6 +257,152 @@ class MatchRecording(models.Model):
         return f"Recording for match {self.match_id}"
 
 
+class RecordingUpload(models.Model):
+    """
+    A resumable recording upload in progress (see stato/uploads.py). Bytes
+    are appended to a staging file; `offset` is how many have been stored.
+    With `part_count` set the client instead sends numbered parts in
+    parallel (RecordingUploadPart) and they are joined on finalize.
+    Deleted once the finished file is attached to the match's MatchRecording.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name="recording_uploads")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    length = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True)
+    part_count = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} for match {self.match_id} ({self.offset}/{self.length})"
+
+
+class RecordingUploadPart(models.Model):
+    """One received part of a multi-part RecordingUpload, with its SHA-256."""
+
+    upload = models.ForeignKey(RecordingUpload, on_delete=models.CASCADE, related_name="parts")
+    number = models.PositiveIntegerField()
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ("upload", "number")
+
+    def __str__(self):
+        return f"Part {self.number} of upload {self.upload_id} ({self.size} bytes)"
+
+
+class MediaJob(models.Model):
+    """
+    Recording post-processing (faststart, clips, sprites, HLS) queued for
+    the media worker, `manage.py run_media_jobs`. See stato/media_jobs.py.
+    """
+    KIND_CHOICES = [
+        ("prepare", "Faststart and seek index"),
+        ("clips", "Highlight clips"),
+        ("sprites", "Thumbnail sprites"),
+        ("hls", "HLS renditions"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name="media_jobs")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="media_job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for match {self.match_id} ({self.status})"
+
+
+class HighlightClip(models.Model):
+    """
+    A short stream-copied cut of the match recording around one event,
+    written by the "clips" media job (stato/clips.py).
+    """
+
+    event = models.OneToOneField(PlayerEventInstance, on_delete=models.CASCADE, related_name="clip")
+    file = models.FileField(upload_to="clips/")
+    # Recording file the clip was cut from; a replaced recording means re-cutting
+    source = models.CharField(max_length=255)
+    start_second = models.FloatField()
+    duration = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Clip for event {self.event_id} @ {self.start_second}s"
+
+
+@receiver(post_delete, sender=HighlightClip)
+def delete_clip_file(sender, instance, **kwargs):
+    """Remove the clip's file with its row (event or player deleted), once the delete commits."""
+    name = instance.file.name
+    if name:
+        transaction.on_commit(lambda: instance.file.storage.delete(name))
+
+
+class TeamSeasonAggregate(models.Model):
+    """
+    Pre-computed season totals per team so the performance endpoints don't
+    re-aggregate every match on each request. One row per (team, season,
+    scope); matches without a season use season="". Kept up to date by the
+    write paths (see stato/aggregates.py) and rebuilt with
+    `manage.py rebuild_team_aggregates`.
+    """
+    SCOPE_CHOICES = [
+        ("all", "All matches"),
+        ("finished", "Finished matches"),
+    ]
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="season_aggregates")
+    season = models.CharField(max_length=10, blank=True, default="")
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES, default="all")
+
+    match_count = models.PositiveIntegerField(default=0)
+    goals_scored = models.PositiveIntegerField(default=0)
+    goals_conceded = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    xg = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    xg_against = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+
+    # {formation: {matches, wins, draws, losses, goals_for, goals_against}}
+    formations = models.JSONField(default=dict, blank=True)
+    # {event: {total, matches}} - finished scope only; live counts change every
+    # few seconds and are read from PlayerEventStat directly
+    event_totals = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["team", "season", "scope"],
+                name="uniq_team_season_scope_aggregate",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.team_id} | {self.season or 'no season'} ({self.scope})"
+
+
 class ChatMessage(models.Model):
     """
     Real-time chat messages between team members (manager, players).
@@ -233,11 +416,41 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        # keyset pagination: (created_at, id) within a team
+        indexes = [
+            models.Index(fields=["team", "created_at", "id"], name="chat_team_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.sender.username} ({self.sender_role}): {self.message[:50]}"
 
 
+class SyncTombstone(models.Model):
+    """
+    Record of a deleted row so /api/sync/ can tell clients to drop it.
+    Written by stato/sync.py from the code paths that delete data; kept for
+    TOMBSTONE_RETENTION (`manage.py purge_sync_tombstones`).
+    """
+    KIND_CHOICES = [
+        ("player", "Player"),
+        ("stat", "Player event stat"),
+        ("event", "Event instance"),
+    ]
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="sync_tombstones")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["team", "deleted_at"], name="tombstone_team_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.team_id} | {self.kind} {self.object_id} deleted @ {self.deleted_at}"
+
+
 class ZoneAnalysis(models.Model):
     """
     Track zone-based performance metrics to identify team strengths and weaknesses.
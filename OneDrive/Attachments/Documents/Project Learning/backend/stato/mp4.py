@@ -0,0 +1,307 @@
+"""
+Pure-Python MP4 / MOV (ISO base media) box handling for uploaded recordings.
+
+Phones write the `moov` box (the index of every sample) after the media
+data, so a browser has to fetch the tail of the file before it can play
+anything. faststart() rewrites such a file with `moov` ahead of `mdat`,
+shifting every chunk offset in the `stco` / `co64` tables by the size of
+the moved box (an `stco` that would overflow 32 bits becomes a `co64`).
+Only `moov` is read into memory (typically well under 1% of the file); the
+media data is copied with media.copy_range, in the kernel where possible.
+
+prepare_recording() faststarts a file in place and returns the duration
+from `mvhd`. Uploads don't call it inline: attaching a recording queues the
+"prepare" media job (uploads.prepare_attached_recording), and the worker
+runs it there, as does `manage.py faststart_recordings` for older files.
+video_keyframes() reads the sample tables behind the seek index
+(stato/seek_index.py).
+"""
+import os
+import struct
+import tempfile
+from array import array
+from collections import namedtuple
+
+from .media import copy_range
+
+# Boxes whose payload is just more boxes, on the way down to the sample tables
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+Box = namedtuple("Box", "type offset size header_size")
+
+
+class Mp4Error(ValueError):
+    """Not an MP4 we can handle (bad box sizes, compressed moov, ...)."""
+
+
+def iter_boxes(f, start, end):
+    """Yield the boxes in f[start:end] without reading their payloads."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size or pos + size > end:
+            raise Mp4Error(f"Bad size for box {kind!r} at {pos}.")
+        yield Box(kind, pos, size, header_size)
+        pos += size
+
+
+def parse_boxes(data):
+    """In-memory box tree: a list of [type, payload bytes | list of children]."""
+    boxes = []
+    pos = 0
+    while pos + 8 <= len(data):
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = len(data) - pos
+        if size < header_size or pos + size > len(data):
+            raise Mp4Error(f"Bad size for box {kind!r}.")
+        payload = data[pos + header_size:pos + size]
+        boxes.append([kind, parse_boxes(payload) if kind in CONTAINER_BOXES else payload])
+        pos += size
+    return boxes
+
+
+def serialize_boxes(boxes):
+    out = []
+    for kind, body in boxes:
+        payload = serialize_boxes(body) if isinstance(body, list) else body
+        if len(payload) + 8 > 0xFFFFFFFF:
+            out.append(struct.pack(">I4sQ", 1, kind, len(payload) + 16))
+        else:
+            out.append(struct.pack(">I4s", len(payload) + 8, kind))
+        out.append(payload)
+    return b"".join(out)
+
+
+def find_boxes(boxes, *path):
+    """Every box reached by following `path` (box types) down the tree."""
+    if not path:
+        return []
+    found = []
+    for box in boxes:
+        if box[0] == path[0]:
+            if len(path) == 1:
+                found.append(box)
+            elif isinstance(box[1], list):
+                found.extend(find_boxes(box[1], *path[1:]))
+    return found
+
+
+def mvhd_duration(moov):
+    """Duration in seconds from the movie header, or None if it isn't recorded."""
+    for _, payload in find_boxes(moov, b"mvhd"):
+        if payload[0] == 1:
+            timescale, duration = struct.unpack_from(">IQ", payload, 20)
+            unknown = 0xFFFFFFFFFFFFFFFF
+        else:
+            timescale, duration = struct.unpack_from(">II", payload, 12)
+            unknown = 0xFFFFFFFF
+        if timescale and duration != unknown:
+            return duration / timescale
+    return None
+
+
+def _shift_chunk_offsets(moov, shift):
+    """Apply shift(offset) -> offset to every stco / co64 entry; stco upgrades to co64 on overflow."""
+    for stbl in find_boxes(moov, b"trak", b"mdia", b"minf", b"stbl"):
+        for box in stbl[1]:
+            kind, payload = box
+            if kind not in (b"stco", b"co64"):
+                continue
+            count = struct.unpack_from(">I", payload, 4)[0]
+            fmt = "I" if kind == b"stco" else "Q"
+            offsets = [shift(o) for o in struct.unpack_from(f">{count}{fmt}", payload, 8)]
+            if fmt == "I" and offsets and max(offsets) > 0xFFFFFFFF:
+                box[0], fmt = b"co64", "Q"
+            box[1] = payload[:8] + struct.pack(f">{count}{fmt}", *offsets)
+
+
+def _top_level(f):
+    size = os.fstat(f.fileno()).st_size
+    boxes = list(iter_boxes(f, 0, size))
+    if not boxes or boxes[0].type != b"ftyp":
+        raise Mp4Error("Not an MP4 (no leading ftyp box).")
+    return boxes, size
+
+
+def _read_moov(f, boxes):
+    moov_box = next((b for b in boxes if b.type == b"moov"), None)
+    if moov_box is None:
+        raise Mp4Error("No moov box.")
+    f.seek(moov_box.offset + moov_box.header_size)
+    moov_data = f.read(moov_box.size - moov_box.header_size)
+    moov = parse_boxes(moov_data)
+    if find_boxes(moov, b"cmov"):
+        raise Mp4Error("Compressed moov is not supported.")
+    return moov_box, moov_data
+
+
+def _faststart_moov(moov_data, insert_at, moov_box):
+    """
+    Serialized moov for the position `insert_at` (where the first mdat was),
+    with chunk offsets shifted to match. Its size feeds back into the shift
+    (and a co64 upgrade grows it), so repeat until it settles.
+    """
+    new_size = moov_box.size
+    while True:
+        moov = parse_boxes(moov_data)
+        moved = new_size
+        grown = new_size - moov_box.size
+        moov_end = moov_box.offset + moov_box.size
+
+        def shift(offset):
+            if insert_at <= offset < moov_box.offset:
+                return offset + moved
+            if offset >= moov_end:
+                return offset + grown
+            return offset
+
+        _shift_chunk_offsets(moov, shift)
+        data = serialize_boxes([[b"moov", moov]])
+        if len(data) == new_size:
+            return data
+        new_size = len(data)
+
+
+def faststart(path):
+    """
+    Rewrite the MP4 at `path` in place with moov before mdat. Returns False
+    if it already was (nothing written). Raises Mp4Error for files it can't handle.
+    """
+    with open(path, "rb", buffering=0) as src:
+        boxes, size = _top_level(src)
+        moov_box, moov_data = _read_moov(src, boxes)
+        mdat_box = next((b for b in boxes if b.type == b"mdat"), None)
+        if mdat_box is None or moov_box.offset < mdat_box.offset:
+            return False
+
+        insert_at = mdat_box.offset
+        new_moov = _faststart_moov(moov_data, insert_at, moov_box)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".faststart")
+        try:
+            with os.fdopen(fd, "wb", buffering=0) as dst:
+                copy_range(src, dst, 0, insert_at)
+                dst.write(new_moov)
+                copy_range(src, dst, insert_at, moov_box.offset - insert_at)
+                moov_end = moov_box.offset + moov_box.size
+                copy_range(src, dst, moov_end, size - moov_end)
+            # mkstemp creates 0600; keep the original's mode so the web server can still read it
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return True
+
+
+def read_moov(path):
+    """(top-level boxes, parsed moov tree) for the MP4 at `path`."""
+    with open(path, "rb") as f:
+        boxes, _ = _top_level(f)
+        _, moov_data = _read_moov(f, boxes)
+    return boxes, parse_boxes(moov_data)
+
+
+def read_duration(path):
+    _, moov = read_moov(path)
+    return mvhd_duration(moov)
+
+
+def _table(payload, fmt, fields=1, count_at=4):
+    """Entries of a full box table: entry count at `count_at`, then `fields` values of `fmt` each."""
+    count = struct.unpack_from(">I", payload, count_at)[0]
+    values = struct.unpack_from(f">{count * fields}{fmt}", payload, count_at + 4)
+    if fields == 1:
+        return values
+    return [values[i:i + fields] for i in range(0, len(values), fields)]
+
+
+def _track(moov, handler):
+    for trak in find_boxes(moov, b"trak"):
+        hdlr = find_boxes(trak[1], b"mdia", b"hdlr")
+        if hdlr and hdlr[0][1][8:12] == handler:
+            return trak
+    return None
+
+
+def _video_track(moov):
+    return _track(moov, b"vide")
+
+
+def has_audio(moov):
+    return _track(moov, b"soun") is not None
+
+
+def video_keyframes(moov):
+    """
+    (decode time in seconds, byte offset) of every sync sample in the video
+    track, from stss / stts / stsz / stsc / stco|co64. Every sample counts
+    as a sync sample when there's no stss. Empty if there's no video track.
+    """
+    trak = _video_track(moov)
+    if trak is None:
+        return []
+    mdhd = find_boxes(trak[1], b"mdia", b"mdhd")[0][1]
+    timescale = struct.unpack_from(">I", mdhd, 20 if mdhd[0] == 1 else 12)[0]
+    stbl = {kind: payload for kind, payload in find_boxes(trak[1], b"mdia", b"minf", b"stbl")[0][1]}
+    if not timescale or not all(k in stbl for k in (b"stts", b"stsz", b"stsc")):
+        raise Mp4Error("Incomplete sample tables.")
+    if b"co64" in stbl:
+        chunk_offsets = _table(stbl[b"co64"], "Q")
+    elif b"stco" in stbl:
+        chunk_offsets = _table(stbl[b"stco"], "I")
+    else:
+        raise Mp4Error("No chunk offset table.")
+
+    uniform_size, sample_count = struct.unpack_from(">II", stbl[b"stsz"], 4)
+    sizes = None if uniform_size else struct.unpack_from(f">{sample_count}I", stbl[b"stsz"], 12)
+    sync = set(_table(stbl[b"stss"], "I")) if b"stss" in stbl else None
+
+    # Decode time of every sample (stts is run-length: count, delta)
+    times = array("Q")
+    t = 0
+    for count, delta in _table(stbl[b"stts"], "I", fields=2):
+        for _ in range(count):
+            times.append(t)
+            t += delta
+
+    keyframes = []
+    sample = 0
+    runs = _table(stbl[b"stsc"], "I", fields=3)
+    for i, (first_chunk, per_chunk, _) in enumerate(runs):
+        last_chunk = runs[i + 1][0] - 1 if i + 1 < len(runs) else len(chunk_offsets)
+        for chunk in range(first_chunk, last_chunk + 1):
+            pos = chunk_offsets[chunk - 1]
+            for _ in range(per_chunk):
+                if sample >= sample_count or sample >= len(times):
+                    return keyframes
+                if sync is None or sample + 1 in sync:
+                    keyframes.append((times[sample] / timescale, pos))
+                pos += sizes[sample] if sizes else uniform_size
+                sample += 1
+    return keyframes
+
+
+def prepare_recording(path):
+    """
+    Faststart an uploaded recording and return its duration in whole
+    seconds from mvhd. Returns None (file untouched) for anything that isn't
+    a well-formed MP4, e.g. WebM.
+    """
+    try:
+        faststart(path)
+        duration = read_duration(path)
+    except (Mp4Error, struct.error):
+        return None
+    return int(round(duration)) if duration is not None else None
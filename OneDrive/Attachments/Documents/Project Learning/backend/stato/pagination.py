@@ -0,0 +1,141 @@
+"""
+Keyset (cursor) pagination for list endpoints that grow with the season.
+
+Pages are read with a row-value comparison, WHERE (field, id) >
+(last_field, last_id) ORDER BY field, id LIMIT n, which PostgreSQL turns
+into a single range scan of the matching (..., field, id) index, so each
+page costs the same however far back the client scrolls (no OFFSET). NULLs
+sort the way that index stores them: last ascending, first descending (a
+backward scan). The cursor is the last row's (field, id) pair, base64
+encoded so clients treat it as opaque.
+
+Pagination is opt-in: without ?limit= or ?cursor= the endpoints keep
+returning their full list, which the app's existing screens rely on. With
+either, the response is {"results": [...], "next_cursor": ..., "next": url}
+and next_cursor is null on the last page.
+"""
+import base64
+import json
+
+from django.db.models import F, Field, Func, Q, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class Row(Func):
+    """SQL row constructor, Row(F("second"), F("id")) -> (second, id), for row-value comparisons."""
+    template = "(%(expressions)s)"
+    output_field = Field()
+
+
+class KeysetPagination(BasePagination):
+    """Orders by (field, id); subclasses set `field`, `descending` and `default_limit`."""
+
+    field = None
+    descending = True
+    default_limit = 100
+    max_limit = 500
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    invalid_cursor_message = "Invalid cursor"
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.limit_query_param in params
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, self.default_limit))
+        except (TypeError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.field)
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        raw = json.dumps([value, obj.pk], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor, model):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if value is not None:
+                value = model._meta.get_field(self.field).to_python(value)
+            return value, int(pk)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, model, value, pk):
+        """Rows strictly after (value, pk) in this ordering."""
+        f = self.field
+        if value is None:
+            if self.descending:
+                return Q(**{f"{f}__isnull": True, "pk__lt": pk}) | Q(**{f"{f}__isnull": False})
+            return Q(**{f"{f}__isnull": True, "pk__gt": pk})
+        row = Row(F(f), F("pk"))
+        last = Row(Value(value, output_field=model._meta.get_field(f)), Value(pk))
+        if self.descending:
+            return Q(LessThan(row, last))
+        return Q(GreaterThan(row, last)) | Q(**{f"{f}__isnull": True})
+
+    def ordering(self):
+        if self.descending:
+            return [F(self.field).desc(nulls_first=True), "-pk"]
+        return [F(self.field).asc(nulls_last=True), "pk"]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        queryset = queryset.order_by(*self.ordering())
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(queryset.model, *self.decode_cursor(cursor, queryset.model)))
+
+        # One extra row tells us whether there is a next page
+        rows = list(queryset[: self.limit + 1])
+        page = rows[: self.limit]
+        self.next_cursor = self.encode_cursor(page[-1]) if len(rows) > self.limit else None
+        return page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "results": data,
+            "next_cursor": self.next_cursor,
+            "next": self.get_next_link(),
+        })
+
+
+class StatsCursorPagination(KeysetPagination):
+    """Stat rows, most recently updated first: (updated_at, id) descending."""
+    field = "updated_at"
+
+
+class EventCursorPagination(KeysetPagination):
+    """Event instances in match order: (second, id) ascending, untimed events last."""
+    field = "second"
+    descending = False
+    default_limit = 200
+    max_limit = 1000
+
+
+class ChatCursorPagination(KeysetPagination):
+    """Chat history newest first: (created_at, id) descending; next pages go back in time."""
+    field = "created_at"
+    default_limit = 50
+    max_limit = 200
@@ -1,10 +1,15 @@
 # permissions.py
 from rest_framework.permissions import BasePermission
 
+from .authentication import token_claims
+
 class IsManager(BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
+        claims = token_claims(request.user)
+        if claims is not None:
+            return claims[1] in ("manager", "analyst")
         profile = getattr(request.user, "profile", None)
         if not profile:
             return False
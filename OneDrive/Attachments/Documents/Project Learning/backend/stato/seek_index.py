@@ -0,0 +1,123 @@
+"""
+Keyframe seek index for match recordings.
+
+Built once per recording from the MP4 sample tables (mp4.video_keyframes)
+and stored next to the file as <name>.seekidx: a small header, then the
+keyframe times in milliseconds (uint32) and their byte offsets (uint64) as
+packed little-endian arrays - about 12 bytes per keyframe, so a 90-minute
+match with a keyframe every 2 s is ~32 KB.
+
+A player that has the moov (the first `media_offset` bytes of a faststarted
+file) can jump to an event with one Range request starting at
+keyframe_at(second).
+"""
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+from django.core.files.storage import default_storage
+
+from .mp4 import Mp4Error, read_moov, video_keyframes
+
+INDEX_SUFFIX = ".seekidx"
+_MAGIC = b"SKX1"
+_HEADER = struct.Struct("<4sIQ")  # magic, keyframe count, media_offset
+
+
+def index_name(recording_name):
+    return f"{recording_name}{INDEX_SUFFIX}"
+
+
+class SeekIndex:
+    def __init__(self, times_ms, offsets, media_offset):
+        self.times_ms = times_ms
+        self.offsets = offsets
+        self.media_offset = media_offset
+
+    def __len__(self):
+        return len(self.times_ms)
+
+    def keyframe_at(self, second):
+        """(keyframe second, byte offset) of the last keyframe at or before `second`."""
+        if not self.times_ms:
+            return None
+        i = max(bisect_right(self.times_ms, int(max(second, 0) * 1000)) - 1, 0)
+        return self.times_ms[i] / 1000, self.offsets[i]
+
+    def as_data(self):
+        return {
+            "media_offset": self.media_offset,
+            "keyframes": [[t / 1000, o] for t, o in zip(self.times_ms, self.offsets)],
+        }
+
+
+def _little_endian(arr):
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def build_seek_index(recording_name):
+    """Read the sample tables and write the sidecar index. Returns the SeekIndex, or None if it isn't an MP4."""
+    path = default_storage.path(recording_name)
+    try:
+        boxes, moov = read_moov(path)
+        keyframes = video_keyframes(moov)
+    except (Mp4Error, struct.error, IndexError):
+        return None
+    mdat = next((b for b in boxes if b.type == b"mdat"), None)
+    index = SeekIndex(
+        array("I", (int(round(t * 1000)) for t, _ in keyframes)),
+        array("Q", (o for _, o in keyframes)),
+        mdat.offset if mdat else 0,
+    )
+
+    target = default_storage.path(index_name(recording_name))
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(index), index.media_offset))
+            f.write(_little_endian(array("I", index.times_ms)).tobytes())
+            f.write(_little_endian(array("Q", index.offsets)).tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return index
+
+
+@lru_cache(maxsize=64)
+def _read_index(path, mtime_ns):
+    with open(path, "rb") as f:
+        magic, count, media_offset = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            return None
+        times = array("I")
+        times.frombytes(f.read(count * 4))
+        offsets = array("Q")
+        offsets.frombytes(f.read(count * 8))
+    return SeekIndex(_little_endian(times), _little_endian(offsets), media_offset)
+
+
+def load_seek_index(recording_name):
+    """The recording's SeekIndex (building it on first use), or None if it has none."""
+    path = default_storage.path(index_name(recording_name))
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        if not default_storage.exists(recording_name):
+            return None
+        return build_seek_index(recording_name)
+    return _read_index(path, mtime_ns)
+
+
+def delete_seek_index(recording_name):
+    try:
+        os.remove(default_storage.path(index_name(recording_name)))
+    except FileNotFoundError:
+        pass
@@ -4,14 +4,14 @@ from django.contrib.auth.models import User
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import Player, PlayerEventStat, Profile, Team, Match, PlayerEventInstance, ZoneAnalysis
+from .models import Player, PlayerEventStat, Profile, Team, Match, PlayerEventInstance, ZoneAnalysis, MatchRecording
 from .stream_token import make_stream_token
 
 
 class EventStatSerializer(serializers.ModelSerializer):
     player = serializers.CharField(source="player.name", read_only=True)
-    player_id = serializers.IntegerField(source="player.id", read_only=True)
-    match_id = serializers.IntegerField(source="match.id", read_only=True)
+    player_id = serializers.IntegerField(read_only=True)
+    match_id = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = PlayerEventStat
@@ -19,7 +19,21 @@ class EventStatSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "updated_at"]
 
 
+def _get_recording(obj):
+    """The match's recording or None (no query when the view used select_related("recording"))."""
+    try:
+        return obj.recording
+    except MatchRecording.DoesNotExist:
+        return None
+
+
 class MatchSerializer(serializers.ModelSerializer):
+    """
+    Context options:
+    - include_recording_urls (default True): set False on list endpoints to skip
+      building recording URLs and signing stream tokens per row.
+    - stream_tokens: {match_id: token} pre-signed by the view in one pass.
+    """
     is_home = serializers.BooleanField()
     has_recording = serializers.SerializerMethodField()
     recording_url = serializers.SerializerMethodField()
@@ -36,13 +50,16 @@ class MatchSerializer(serializers.ModelSerializer):
         ]
 
     def get_has_recording(self, obj):
-        return hasattr(obj, "recording")
+        return _get_recording(obj) is not None
 
     def get_recording_url(self, obj):
-        if hasattr(obj, "recording") and obj.recording.file:
+        if not self.context.get("include_recording_urls", True):
+            return None
+        recording = _get_recording(obj)
+        if recording and recording.file:
             request = self.context.get("request")
             if request:
-                url = obj.recording.file.url
+                url = recording.file.url
                 if callable(url):
                     url = url()
                 return request.build_absolute_uri(url) if url and not url.startswith("http") else url
@@ -50,10 +67,13 @@ class MatchSerializer(serializers.ModelSerializer):
 
     def get_recording_stream_url(self, obj):
         """Backend proxy URL for playback with signed token (video element cannot send Auth header)."""
-        if hasattr(obj, "recording") and obj.recording.file:
+        if not self.context.get("include_recording_urls", True):
+            return None
+        recording = _get_recording(obj)
+        if recording and recording.file:
             request = self.context.get("request")
             if request and request.user and request.user.is_authenticated:
-                token = make_stream_token(obj.id, request.user.id)
+                token = self.context.get("stream_tokens", {}).get(obj.id) or make_stream_token(obj, request.user.id)
                 token_qs = quote(token, safe="")
                 return request.build_absolute_uri(f"/api/matches/{obj.id}/recording/stream/?token={token_qs}")
         return None
@@ -61,11 +81,12 @@ class MatchSerializer(serializers.ModelSerializer):
 
 class EventInstanceSerializer(serializers.ModelSerializer):
     player = serializers.CharField(source="player.name", read_only=True)
-    player_id = serializers.IntegerField(source="player.id", read_only=True)
+    player_id = serializers.IntegerField(read_only=True)
+    match_id = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = PlayerEventInstance
-        fields = ["id", "player_id", "player", "event", "second", "zone", "created_at"]
+        fields = ["id", "match_id", "player_id", "player", "event", "second", "zone", "created_at"]
 
 
 class TeamSerializer(serializers.ModelSerializer):
@@ -138,10 +159,17 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token["email"] = user.email
         token["role"] = getattr(getattr(user, "profile", None), "role", "manager")
-        token["team_id"] = getattr(getattr(getattr(user, "profile", None), "team", None), "id", None)
+        token["team_id"] = getattr(getattr(user, "profile", None), "team_id", None)
+        token["auth_version"] = getattr(getattr(user, "profile", None), "auth_version", 0)
         return token
 
 
+def token_pair_for(user):
+    """Fresh access/refresh tokens with current claims (e.g. after joining or leaving a team)."""
+    refresh = CustomTokenObtainPairSerializer.get_token(user)
+    return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+
 class ZoneAnalysisSerializer(serializers.ModelSerializer):
     class Meta:
         model = ZoneAnalysis
@@ -0,0 +1,141 @@
+"""
+Thumbnail sprite sheets for scrubbing, built by the "sprites" media job
+(stato/media_jobs.py).
+
+One SPRITE_WIDTH x SPRITE_HEIGHT frame every SPRITE_INTERVAL seconds,
+tiled SPRITE_COLUMNS x SPRITE_ROWS to a JPEG sheet, so a 90-minute match is
+6 sheets of a few dozen KB each. They sit under sprites/<recording name
+without extension>/ and are served by /media/ like any other file, next to:
+
+- thumbnails.json: the grid geometry and sheet names (stato/views_match.py
+  returns it with absolute URLs);
+- thumbnails.vtt: WebVTT cues "sheet-001.jpg#xywh=x,y,w,h", the format
+  video players read scrub previews from.
+
+ffmpeg only decodes keyframes (-skip_frame nokey), so a sheet set costs a
+few seconds of CPU rather than a full decode of the match.
+"""
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+
+from django.core.files.storage import default_storage
+
+from .media_jobs import MediaJobError, ffmpeg_binary, register_media_job
+from .models import MatchRecording
+from .versioning import bump_team_version
+
+SPRITE_INTERVAL = 10
+SPRITE_WIDTH = 160
+SPRITE_HEIGHT = 90
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+FFMPEG_TIMEOUT = 600
+
+INDEX_NAME = "thumbnails.json"
+VTT_NAME = "thumbnails.vtt"
+
+
+def sprites_dir(recording_name):
+    return f"sprites/{os.path.splitext(recording_name)[0]}"
+
+
+def _timestamp(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.000"
+
+
+def sprite_vtt(index):
+    """WebVTT text for a thumbnails.json index: one cue per thumbnail, pointing into its sheet."""
+    per_sheet = index["columns"] * index["rows"]
+    width, height, interval = index["width"], index["height"], index["interval"]
+    lines = ["WEBVTT", ""]
+    for i in range(index["count"]):
+        sheet, cell = divmod(i, per_sheet)
+        row, column = divmod(cell, index["columns"])
+        lines.append(f"{_timestamp(i * interval)} --> {_timestamp((i + 1) * interval)}")
+        lines.append(f"{index['sheets'][sheet]}#xywh={column * width},{row * height},{width},{height}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def load_sprite_index(recording_name):
+    """The recording's thumbnails.json as a dict, or None until the job has built it."""
+    try:
+        with open(default_storage.path(f"{sprites_dir(recording_name)}/{INDEX_NAME}")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def delete_sprites(recording_name):
+    shutil.rmtree(default_storage.path(sprites_dir(recording_name)), ignore_errors=True)
+
+
+def render_sheets(ffmpeg, source_path, out_dir):
+    """Write sheet-001.jpg, sheet-002.jpg, ... for source_path into out_dir. Returns the sheet names in order."""
+    scale = (
+        f"scale={SPRITE_WIDTH}:{SPRITE_HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={SPRITE_WIDTH}:{SPRITE_HEIGHT}:(ow-iw)/2:(oh-ih)/2"
+    )
+    try:
+        subprocess.run(
+            [
+                ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+                "-skip_frame", "nokey", "-i", source_path, "-an",
+                "-vf", f"fps=1/{SPRITE_INTERVAL},{scale},tile={SPRITE_COLUMNS}x{SPRITE_ROWS}",
+                "-q:v", "5", os.path.join(out_dir, "sheet-%03d.jpg"),
+            ],
+            check=True, capture_output=True, timeout=FFMPEG_TIMEOUT,
+        )
+    except subprocess.CalledProcessError as e:
+        raise MediaJobError(f"ffmpeg failed: {e.stderr.decode(errors='replace')[-500:]}")
+    return sorted(name for name in os.listdir(out_dir) if name.endswith(".jpg"))
+
+
+@register_media_job("sprites")
+def build_thumbnail_sprites(match):
+    recording = MatchRecording.objects.filter(match=match).values_list("file", "duration_seconds").first()
+    if not recording or not recording[0] or not default_storage.exists(recording[0]):
+        return 0
+    recording_name, duration = recording
+    if load_sprite_index(recording_name) is not None:
+        return 0
+
+    ffmpeg = ffmpeg_binary()
+    target = default_storage.path(sprites_dir(recording_name))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Built in a scratch directory and renamed into place, so /media/ never serves half a set
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(target), prefix=".sprites-")
+    try:
+        sheets = render_sheets(ffmpeg, default_storage.path(recording_name), tmp_dir)
+        if not sheets:
+            raise MediaJobError("ffmpeg produced no thumbnails.")
+        count = len(sheets) * SPRITE_COLUMNS * SPRITE_ROWS
+        if duration:
+            count = min(count, max(math.ceil(duration / SPRITE_INTERVAL), 1))
+        index = {
+            "interval": SPRITE_INTERVAL,
+            "width": SPRITE_WIDTH,
+            "height": SPRITE_HEIGHT,
+            "columns": SPRITE_COLUMNS,
+            "rows": SPRITE_ROWS,
+            "count": count,
+            "sheets": sheets,
+        }
+        with open(os.path.join(tmp_dir, VTT_NAME), "w") as f:
+            f.write(sprite_vtt(index))
+        with open(os.path.join(tmp_dir, INDEX_NAME), "w") as f:
+            json.dump(index, f)
+        os.chmod(tmp_dir, 0o755)
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(tmp_dir, target)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    # The thumbnails endpoint is ETagged on the team version
+    bump_team_version(match.team_id)
+    return len(sheets)
@@ -1,23 +1,130 @@
 """
 Short-lived signed token for recording stream URL.
 The <video> element cannot send Authorization header, so we allow GET with ?token=.
+
+The token carries everything needed to serve the file: match, user and
+team ids plus the recording's storage path, size and content type, all
+signed. A scrub through a long video fires hundreds of Range requests; with
+a valid token each one is served without touching the database.
 """
+from django.core import signing
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.signing import TimestampSigner, SignatureExpired, BadSignature
 
 # 1 hour
 STREAM_TOKEN_MAX_AGE = 3600
 
+_STREAM_SALT = "stato.stream"
+_CLIP_SALT = "stato.clip"
 
-def make_stream_token(match_id, user_id):
-    """Return a signed token string for stream URL. Include match_id and user_id."""
-    signer = TimestampSigner()
-    payload = f"stream:{match_id}:{user_id}"
-    return signer.sign(payload)
+
+def content_type_for_recording(name):
+    """Return a sensible Content-Type for a recording filename."""
+    if not name:
+        return "video/mp4"
+    name_lower = name.lower()
+    if name_lower.endswith(".mov"):
+        return "video/quicktime"
+    if name_lower.endswith(".mp4"):
+        return "video/mp4"
+    if name_lower.endswith(".webm"):
+        return "video/webm"
+    return "video/mp4"
+
+
+def _recording_claims(match):
+    """
+    Team, storage path, size, revision and content type of the match's
+    recording (None without one), all from the MatchRecording row - no
+    storage calls.
+    """
+    try:
+        recording = match.recording
+    except ObjectDoesNotExist:
+        return None
+    if not recording.file:
+        return None
+    name = recording.file.name
+    return {
+        "t": match.team_id,
+        "p": name,
+        "s": recording.size,
+        "r": recording.revision,
+        "c": recording.content_type or content_type_for_recording(name),
+    }
+
+
+def _stream_payload(match, user_id):
+    payload = {"m": match.id, "u": user_id}
+    claims = _recording_claims(match)
+    if claims:
+        payload.update(claims)
+    return payload
+
+
+def make_stream_token(match, user_id):
+    """Return a signed token string for the stream URL of this match (recording loaded or cached)."""
+    return signing.dumps(_stream_payload(match, user_id), salt=_STREAM_SALT, compress=True)
+
+
+def make_stream_tokens(matches, user_id):
+    """
+    Tokens for many matches at once (match list): {match_id: token}. The
+    payloads are built in one pass and signed by a single signer, the same
+    format signing.dumps() produces.
+    """
+    signer = signing.TimestampSigner(salt=_STREAM_SALT)
+    return {
+        match_id: signer.sign_object(payload, compress=True)
+        for match_id, payload in [(match.id, _stream_payload(match, user_id)) for match in matches]
+    }
+
+
+def read_stream_token(token, match_id):
+    """
+    Payload of a valid, unexpired token for this match, else None:
+    {"m": match_id, "u": user_id, "t": team_id, "p": path, "s": size, "r": revision, "c": content_type}
+    ("t"/"p"/"s"/"r"/"c" are missing when the match had no recording at signing
+    time; "s"/"r" are None for recordings whose file was missing when they
+    were backfilled).
+    """
+    if not token or not match_id:
+        return None
+    try:
+        payload = signing.loads(token, salt=_STREAM_SALT, max_age=STREAM_TOKEN_MAX_AGE)
+    except (BadSignature, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get("m") != match_id:
+        return None
+    return payload
+
+
+def make_clip_tokens(clips, user_id):
+    """Signed tokens for HighlightClip stream URLs, {event_id: token}; each carries the clip's storage path."""
+    signer = signing.TimestampSigner(salt=_CLIP_SALT)
+    return {
+        clip.event_id: signer.sign_object({"e": clip.event_id, "u": user_id, "p": clip.file.name})
+        for clip in clips
+    }
+
+
+def read_clip_token(token, event_id):
+    """Payload of a valid, unexpired clip token for this event ({"e", "u", "p"}), else None."""
+    if not token or not event_id:
+        return None
+    try:
+        payload = signing.loads(token, salt=_CLIP_SALT, max_age=STREAM_TOKEN_MAX_AGE)
+    except (BadSignature, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get("e") != event_id or not payload.get("p"):
+        return None
+    return payload
 
 
 def validate_stream_token(token, match_id):
     """
-    Validate token and match_id. Returns (True, user_id) if valid, else (False, None).
+    Validate a token in the old "stream:<match_id>:<user_id>" format, still
+    accepted until those tokens expire. Returns (True, user_id) if valid, else (False, None).
     """
     if not token or not match_id:
         return False, None
@@ -0,0 +1,88 @@
+"""
+Delta sync support for GET /api/sync/.
+
+A sync token is the server time the previous sync started, signed so
+clients treat it as opaque. The next sync returns matches and stats with
+updated_at, and event instances and chat messages with created_at, at or
+after that time, plus the tombstones recorded since.
+
+Rows written by a transaction that was still open when the previous sync
+ran can carry an earlier timestamp than the token, so each sync looks back
+SYNC_OVERLAP before the token. Clients upsert by id, so seeing a row twice
+is harmless.
+
+Deletions are not visible in the tables themselves: the code paths that
+delete data call record_player_deletions() (or record_deletions()) first.
+Players (and their stats and events) are the only data the API deletes;
+matches and chat messages are never removed. Tombstones are purged after
+TOMBSTONE_RETENTION (`manage.py purge_sync_tombstones`), so a token older
+than that gets a full snapshot instead of a delta that could miss deletions.
+"""
+from datetime import timedelta
+
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import PlayerEventInstance, PlayerEventStat, SyncTombstone
+
+SYNC_OVERLAP = timedelta(seconds=5)
+TOMBSTONE_RETENTION = timedelta(days=30)
+_TOKEN_SALT = "stato.sync"
+
+
+def make_sync_token(when):
+    return signing.dumps({"t": when.isoformat()}, salt=_TOKEN_SALT, compress=True)
+
+
+def parse_sync_token(token):
+    """Time encoded in a sync token, or None if the token is invalid."""
+    try:
+        when = parse_datetime(signing.loads(token, salt=_TOKEN_SALT)["t"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+    return when
+
+
+def sync_window_start(since):
+    return since - SYNC_OVERLAP
+
+
+def tombstones_expired(since):
+    """True if tombstones from `since` may already be purged, so a delta can't be trusted."""
+    return since < timezone.now() - TOMBSTONE_RETENTION
+
+
+def purge_tombstones():
+    """Delete tombstones older than TOMBSTONE_RETENTION. Returns how many."""
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+    return deleted
+
+
+def record_deletions(team_id, kind, object_ids):
+    """Tombstone rows of one kind ("player", "stat", "event") about to be deleted."""
+    SyncTombstone.objects.bulk_create(
+        [SyncTombstone(team_id=team_id, kind=kind, object_id=object_id) for object_id in object_ids],
+        batch_size=1000,
+    )
+
+
+def record_player_deletions(team_id, players_qs):
+    """Tombstone players and the stats / event instances that cascade with them."""
+    player_ids = list(players_qs.values_list("id", flat=True))
+    if not player_ids:
+        return
+    record_deletions(team_id, "player", player_ids)
+    record_deletions(team_id, "stat", PlayerEventStat.objects.filter(player_id__in=player_ids).values_list("id", flat=True))
+    record_deletions(team_id, "event", PlayerEventInstance.objects.filter(player_id__in=player_ids).values_list("id", flat=True))
+
+
+def deletions_since(team, since):
+    """{kind: [ids]} of tombstones recorded at or after `since` (every kind present, possibly empty)."""
+    deleted = {kind: [] for kind, _label in SyncTombstone.KIND_CHOICES}
+    if since is None:
+        return deleted
+    rows = SyncTombstone.objects.filter(team=team, deleted_at__gte=since).values_list("kind", "object_id")
+    for kind, object_id in rows:
+        deleted[kind].append(object_id)
+    return deleted
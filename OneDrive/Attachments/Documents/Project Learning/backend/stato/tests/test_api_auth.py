@@ -1,11 +1,18 @@
 """
 Integration tests: login and /auth/me/ (core auth flow).
 """
+import shutil
+import tempfile
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from ..models import Team, Profile
+from ..authentication import _auth_version_key
+from ..models import Team, Profile, Match
 
 
 class AuthIntegrationTests(APITestCase):
@@ -43,3 +50,69 @@ class AuthIntegrationTests(APITestCase):
         self.assertEqual(response.data["email"], "manager@test.com")
         self.assertIsNotNone(response.data.get("team"))
         self.assertEqual(response.data["team"]["id"], self.team.id)
+
+
+class ClaimsAuthenticationTests(APITestCase):
+    """JWT team_id / role claims are trusted until team membership changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        self.other = Team.objects.create(club_name="Other Club", team_name="Other Team")
+        Match.objects.create(team=self.team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M")
+        user = User.objects.create_user(username="player@test.com", email="player@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "player"
+        profile.save()
+
+    def _login(self):
+        response = self.client.post(
+            "/api/auth/login/",
+            {"username": "player@test.com", "password": "pass1234"},
+            format="json",
+        )
+        return response.data["access"]
+
+    def test_request_does_no_identity_queries(self):
+        # A cache shared between workers (Redis in production; files will do here)
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir,
+        }}):
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self._login()}")
+            self.client.get("/api/matches/?warmup=1")
+            # team data version (for the ETag) + the matches themselves
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/matches/")
+        self.assertEqual(len(response.data), 1)
+
+    def test_per_process_cache_reads_version_from_db(self):
+        # LocMemCache: another worker's bump never reaches this process's cache
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self._login()}")
+        user_id = Profile.objects.get(user__username="player@test.com").user_id
+        cache.set(_auth_version_key(user_id), 0)
+        Profile.objects.filter(user_id=user_id).update(team=None, auth_version=1)
+        # The token still says self.team, but the profile has no team any more
+        self.assertEqual(self.client.get("/api/matches/").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_leave_and_join_revoke_old_claims(self):
+        old_access = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {old_access}")
+        left = self.client.post("/api/players/leave-team/", {}, format="json")
+        self.assertEqual(left.status_code, status.HTTP_200_OK)
+        joined = self.client.post(
+            "/api/players/join-team/",
+            {"team_code": self.other.team_code, "player_name": "Alice"},
+            format="json",
+        )
+        self.assertEqual(joined.status_code, status.HTTP_200_OK)
+
+        # The old token still says team_id=self.team; it must not see that team's matches
+        self.assertEqual(self.client.get("/api/matches/").data, [])
+        # The tokens returned on join carry the new team
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {joined.data['tokens']['access']}")
+        response = self.client.get("/api/teams/me/")
+        self.assertEqual(response.data["id"], self.other.id)
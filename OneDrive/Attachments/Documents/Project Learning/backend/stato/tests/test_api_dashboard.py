@@ -0,0 +1,56 @@
+"""
+Integration tests: GET /api/dashboard/ composite endpoint.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from ..aggregates import rebuild_all
+from ..models import Team, Profile, Match, Player, PlayerEventStat
+
+
+class DashboardIntegrationTests(APITestCase):
+    """Sections match their standalone endpoints; ?sections= picks a subset."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user_id = user.pk
+        alice = Player.objects.create(team=self.team, name="Alice")
+        self.live = Match.objects.create(
+            team=self.team, opponent="Live", kickoff_at=timezone.now(), analyst_name="M",
+            state="first_half", goals_scored=1,
+        )
+        Match.objects.create(team=self.team, opponent="Old", kickoff_at=timezone.now(), analyst_name="M", state="finished")
+        PlayerEventStat.objects.create(team=self.team, match=self.live, player=alice, event="tackles", count=2)
+        rebuild_all()
+
+    def _get(self, url):
+        # Fresh user each time, like a real JWT request, so the team's version isn't cached
+        self.client.force_authenticate(user=User.objects.get(pk=self.user_id))
+        return self.client.get(url)
+
+    def test_sections_match_standalone_endpoints(self):
+        data = self._get("/api/dashboard/").data
+        self.assertEqual(data["performance_stats"], self._get("/api/teams/performance-stats/").data)
+        self.assertEqual(data["player_xg"], self._get("/api/teams/player-xg-stats/").data)
+        self.assertEqual(data["stats"], self._get("/api/stats/").data)
+        self.assertEqual(len(data["matches"]), 2)
+        self.assertEqual(data["current_live"]["match"]["id"], self.live.id)
+        self.assertEqual(data["team"]["team_name"], "Test Team")
+
+    def test_sections_subset(self):
+        data = self._get("/api/dashboard/?sections=matches,current_live").data
+        self.assertEqual(set(data), {"sections", "matches", "current_live"})
+
+    def test_unknown_section_is_400(self):
+        response = self._get("/api/dashboard/?sections=matches,bogus")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
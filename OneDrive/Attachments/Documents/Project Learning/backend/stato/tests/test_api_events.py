@@ -0,0 +1,200 @@
+"""
+Integration tests: logging events during a match (single increment and batch upload)
+and reading them back as a compact matrix.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from ..models import Team, Profile, Match, Player, PlayerEventStat, PlayerEventInstance
+
+
+class BatchEventIngestIntegrationTests(APITestCase):
+    """POST /api/matches/{id}/events/batch/ - analyst uploads a queued backlog of events."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        self.user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=self.user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.enabled = True
+        profile.save()
+        self.user = User.objects.get(pk=self.user.pk)
+        self.match = Match.objects.create(
+            team=self.team,
+            opponent="Rivals",
+            kickoff_at=timezone.now(),
+            analyst_name="Manager",
+            is_home=True,
+        )
+        Player.objects.create(team=self.team, name="Alice")
+        self.client.force_authenticate(user=self.user)
+
+    def test_batch_applies_events_in_order(self):
+        response = self.client.post(
+            f"/api/matches/{self.match.id}/events/batch/",
+            {"events": [
+                {"event": "tackles", "player": "Alice", "second": 10, "zone": "4"},
+                {"event": "shots_on_target", "player": "Bob", "second": 20, "zone": "1"},
+                {"event": "tackles", "player": "Alice", "second": 30},
+            ]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e["count"] for e in response.data["events"]], [1, 1, 2])
+        self.assertTrue(Player.objects.filter(team=self.team, name="Bob").exists())
+        self.assertEqual(PlayerEventInstance.objects.filter(match=self.match).count(), 3)
+        stat = PlayerEventStat.objects.get(match=self.match, player__name="Alice", event="tackles")
+        self.assertEqual(stat.count, 2)
+        self.match.refresh_from_db()
+        self.assertGreater(self.match.xg, 0)
+
+    def test_batch_adds_to_existing_counts(self):
+        self.client.post(f"/api/matches/{self.match.id}/tackles/Alice/increment/", {}, format="json")
+        response = self.client.post(
+            f"/api/matches/{self.match.id}/events/batch/",
+            {"events": [{"event": "tackles", "player": "Alice"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["events"][0]["count"], 2)
+
+    def test_invalid_record_rejects_whole_batch(self):
+        response = self.client.post(
+            f"/api/matches/{self.match.id}/events/batch/",
+            {"events": [
+                {"event": "tackles", "player": "Alice"},
+                {"event": "not_an_event", "player": "Alice"},
+            ]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PlayerEventStat.objects.filter(match=self.match).exists())
+        self.assertFalse(PlayerEventInstance.objects.filter(match=self.match).exists())
+
+
+class IncrementEventXGTests(APITestCase):
+    """Match.xg moves by each shot's own value; the timer finish action rebuilds it."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        self.user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=self.user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user = User.objects.get(pk=self.user.pk)
+        self.match = Match.objects.create(
+            team=self.team,
+            opponent="Rivals",
+            kickoff_at=timezone.now(),
+            analyst_name="Manager",
+            is_home=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_only_shots_change_xg(self):
+        url = f"/api/matches/{self.match.id}"
+        self.client.post(f"{url}/tackles/Alice/increment/", {"zone": "1"}, format="json")
+        self.client.post(f"{url}/shots_on_target/Alice/increment/", {"zone": "2"}, format="json")
+        self.client.post(f"{url}/shots_off_target/Alice/increment/", {}, format="json")
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.xg, Decimal("0.35"))
+
+    def test_finish_rebuilds_xg(self):
+        self.client.post(f"/api/matches/{self.match.id}/shots_on_target/Alice/increment/", {"zone": "5"}, format="json")
+        Match.objects.filter(pk=self.match.pk).update(xg=Decimal("9.99"))
+        self.client.post(f"/api/matches/{self.match.id}/timer/", {"action": "finish"}, format="json")
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.xg, Decimal("0.10"))
+
+
+class IncrementEventConcurrencyTests(TransactionTestCase):
+    """POST /api/matches/{id}/{event}/{player}/increment/ - two analysts logging at once must not lose counts."""
+
+    def setUp(self):
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        self.user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=self.user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user = User.objects.get(pk=self.user.pk)
+        self.match = Match.objects.create(
+            team=self.team,
+            opponent="Rivals",
+            kickoff_at=timezone.now(),
+            analyst_name="Manager",
+            is_home=True,
+        )
+        Player.objects.create(team=self.team, name="Alice")
+
+    def _increment(self, _):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        try:
+            response = client.post(f"/api/matches/{self.match.id}/tackles/Alice/increment/", {}, format="json")
+            return response.status_code
+        finally:
+            connection.close()
+
+    def test_concurrent_increments_are_not_lost(self):
+        hits = 40
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(self._increment, range(hits)))
+        self.assertEqual(codes, [status.HTTP_200_OK] * hits)
+        stat = PlayerEventStat.objects.get(match=self.match, player__name="Alice", event="tackles")
+        self.assertEqual(stat.count, hits)
+
+
+class StatsMatrixTests(APITestCase):
+    """GET /api/stats/?format=matrix - dense player x event counts from one grouped query."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user = User.objects.get(pk=user.pk)
+        alice = Player.objects.create(team=self.team, name="Alice")
+        bob = Player.objects.create(team=self.team, name="Bob")
+        self.matches = [
+            Match.objects.create(team=self.team, opponent=f"R{i}", kickoff_at=timezone.now(), analyst_name="M")
+            for i in range(2)
+        ]
+        for match in self.matches:
+            PlayerEventStat.objects.create(team=self.team, match=match, player=alice, event="tackles", count=2)
+            PlayerEventStat.objects.create(team=self.team, match=match, player=bob, event="fouls", count=1)
+        PlayerEventStat.objects.create(team=self.team, match=self.matches[0], player=bob, event="tackles", count=5)
+        self.client.force_authenticate(user=self.user)
+
+    def test_matrix_sums_over_matches(self):
+        self.client.get("/api/stats/?warmup=1")
+        # team lookup is cached on the user; the ETag's data version, then the matrix in one query
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/stats/?format=matrix")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        tackles, fouls = data["events"].index("tackles"), data["events"].index("fouls")
+        self.assertEqual(data["player_names"], ["Alice", "Bob"])
+        self.assertEqual([row[tackles] for row in data["counts"]], [4, 5])
+        self.assertEqual([row[fouls] for row in data["counts"]], [0, 2])
+
+    def test_matrix_per_match(self):
+        data = self.client.get("/api/stats/?format=matrix&per_match=1").data
+        tackles = data["events"].index("tackles")
+        self.assertEqual(sorted(data["matches"]), sorted(m.id for m in self.matches))
+        first = data["matches"].index(self.matches[0].id)
+        self.assertEqual([row[tackles] for row in data["counts"][first]], [2, 5])
@@ -1,12 +1,19 @@
 """
 Integration tests: GET /api/matches/ and timer (start match).
 """
+import os
+import shutil
+import tempfile
+from urllib.parse import unquote
+
 from django.contrib.auth.models import User
+from django.test import override_settings
 from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from ..models import Team, Profile, Match
+from ..models import Team, Profile, Match, MatchRecording
+from ..stream_token import read_stream_token
 
 
 class MatchesIntegrationTests(APITestCase):
@@ -54,3 +61,137 @@ class MatchesIntegrationTests(APITestCase):
         self.match.refresh_from_db()
         self.assertEqual(self.match.state, "in_progress")
         self.assertEqual(self.match.elapsed_seconds, 0)
+
+
+class MatchListETagTests(APITestCase):
+    """GET /api/matches/ - ETag from the team's data version; If-None-Match gets 304 until a write."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user_id = user.pk
+        self.match = Match.objects.create(
+            team=self.team,
+            opponent="Rivals",
+            kickoff_at=timezone.now(),
+            analyst_name="Manager",
+        )
+
+    def _login(self):
+        # Fresh user each time, like a real JWT request, so the team's version isn't cached
+        self.client.force_authenticate(user=User.objects.get(pk=self.user_id))
+
+    def test_unchanged_data_returns_304(self):
+        self._login()
+        first = self.client.get("/api/matches/")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        etag = first["ETag"]
+        self._login()
+        response = self.client.get("/api/matches/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        self._login()
+        etag = self.client.get("/api/matches/")["ETag"]
+        self._login()
+        self.client.post(f"/api/matches/{self.match.id}/tackles/Alice/increment/", {}, format="json")
+        self._login()
+        response = self.client.get("/api/matches/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class MatchListRecordingTests(APITestCase):
+    """GET /api/matches/ - recordings are joined, and URLs/stream tokens are only built with ?include=recording."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user_id = user.pk
+        for i in range(5):
+            match = Match.objects.create(team=self.team, opponent=f"Rivals {i}", kickoff_at=timezone.now(), analyst_name="M")
+            if i % 2 == 0:
+                MatchRecording.objects.create(
+                    match=match, file=f"recordings/match_{i}.mp4", size=1000 + i, content_type="video/mp4",
+                )
+
+    def _get(self, url):
+        self.client.force_authenticate(user=User.objects.get(pk=self.user_id))
+        return self.client.get(url)
+
+    def test_default_list_has_no_recording_urls(self):
+        data = self._get("/api/matches/").data
+        self.assertEqual(sum(m["has_recording"] for m in data), 3)
+        self.assertTrue(all(m["recording_stream_url"] is None and m["recording_url"] is None for m in data))
+
+    def test_include_recording_returns_signed_urls_without_per_row_queries(self):
+        self.client.force_authenticate(user=User.objects.get(pk=self.user_id))
+        # profile + team + data version (ETag) + matches joined with recordings, however many rows
+        with self.assertNumQueries(4):
+            data = self.client.get("/api/matches/?include=recording").data
+        urls = [m["recording_stream_url"] for m in data if m["has_recording"]]
+        self.assertEqual(len(urls), 3)
+        self.assertTrue(all("?token=" in url for url in urls))
+        # Size and content type are signed from the row, not stat'ed from storage
+        row = next(m for m in data if m["has_recording"])
+        payload = read_stream_token(unquote(row["recording_stream_url"].split("?token=")[1]), row["id"])
+        self.assertEqual((payload["s"], payload["c"]), (MatchRecording.objects.get(match_id=row["id"]).size, "video/mp4"))
+
+
+class MatchRecordingStreamTests(APITestCase):
+    """GET /recording/stream/?token= - Range requests served from the signed token with no DB queries."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, "recordings"))
+        self.data = bytes(range(256)) * 4
+        with open(os.path.join(self.media_root, "recordings", "clip.mp4"), "wb") as f:
+            f.write(self.data)
+
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user = User.objects.get(pk=user.pk)
+        self.match = Match.objects.create(team=self.team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M")
+        MatchRecording.objects.create(match=self.match, file="recordings/clip.mp4", size=len(self.data))
+
+    def _stream_url(self):
+        self.client.force_authenticate(user=self.user)
+        url = self.client.get(f"/api/matches/{self.match.id}/recording/playback-url/").data["url"]
+        self.client.force_authenticate(user=None)
+        return url
+
+    def test_range_request_without_db_queries(self):
+        url = self._stream_url()
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(response.streaming_content), self.data[10:20])
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.data)}")
+        self.assertEqual(response["Content-Type"], "video/mp4")
+
+    def test_token_for_replaced_file_is_rejected(self):
+        url = self._stream_url()
+        with open(os.path.join(self.media_root, "recordings", "clip.mp4"), "wb") as f:
+            f.write(b"shorter")
+        response = self.client.get(url, HTTP_RANGE="bytes=0-3")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,76 @@
+"""
+Integration tests: keyset (cursor) pages on stats, event instances and chat.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from ..models import Team, Profile, Match, Player, PlayerEventStat, PlayerEventInstance, ChatMessage
+
+
+class CursorPaginationTests(APITestCase):
+    """?limit=&cursor= walks every row once, in order, even when timestamps tie."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        self.user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=self.user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user = User.objects.get(pk=self.user.pk)
+        self.match = Match.objects.create(team=self.team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M")
+        self.client.force_authenticate(user=self.user)
+
+    def _walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+            pages += 1
+        return ids, pages
+
+    def test_stats_pages_with_tied_updated_at(self):
+        events = ["tackles", "fouls", "interceptions", "clearances", "blocks"]
+        for i in range(7):
+            player = Player.objects.create(team=self.team, name=f"P{i}")
+            PlayerEventStat.objects.create(team=self.team, match=self.match, player=player, event=events[i % 5], count=i)
+        # Same timestamp on every row: order falls back to id
+        PlayerEventStat.objects.update(updated_at=timezone.now())
+
+        ids, pages = self._walk("/api/stats/?limit=3")
+        expected = list(PlayerEventStat.objects.order_by("-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+        # Without ?limit= / ?cursor= the endpoint still returns the plain list
+        self.assertEqual(len(self.client.get("/api/stats/").data), 7)
+
+    def test_events_ordered_by_second_with_untimed_last(self):
+        player = Player.objects.create(team=self.team, name="Alice")
+        for second in [30, None, 10, 30, 20]:
+            PlayerEventInstance.objects.create(team=self.team, match=self.match, player=player, event="tackles", second=second)
+
+        ids, _pages = self._walk(f"/api/matches/{self.match.id}/events/?limit=2")
+        seconds = [PlayerEventInstance.objects.get(id=i).second for i in ids]
+        self.assertEqual(seconds, [10, 20, 30, 30, None])
+
+    def test_chat_pages_back_in_time(self):
+        now = timezone.now()
+        for i in range(5):
+            msg = ChatMessage.objects.create(team=self.team, sender=self.user, sender_role="manager", message=f"m{i}")
+            ChatMessage.objects.filter(id=msg.id).update(created_at=now + timedelta(seconds=i))
+
+        first = self.client.get("/api/chat/messages/?limit=2").data
+        self.assertEqual([m["message"] for m in first["results"]], ["m3", "m4"])
+        older = self.client.get(first["next"]).data
+        self.assertEqual([m["message"] for m in older["results"]], ["m1", "m2"])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get("/api/stats/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
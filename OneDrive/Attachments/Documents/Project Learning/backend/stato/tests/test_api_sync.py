@@ -0,0 +1,84 @@
+"""
+Integration tests: GET /api/sync/ delta sync.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from ..models import Team, Profile, Match, Player, PlayerEventStat, PlayerEventInstance, SyncTombstone
+from ..sync import TOMBSTONE_RETENTION, make_sync_token, purge_tombstones
+
+
+class SyncIntegrationTests(APITestCase):
+    """A token from one sync returns only what changed after it, plus deletions."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user_id = user.pk
+        self.alice = Player.objects.create(team=self.team, name="Alice")
+        self.bob = Player.objects.create(team=self.team, name="Bob")
+        self.old_match = Match.objects.create(team=self.team, opponent="Old", kickoff_at=timezone.now(), analyst_name="M")
+        PlayerEventStat.objects.create(team=self.team, match=self.old_match, player=self.bob, event="fouls", count=3)
+        PlayerEventInstance.objects.create(team=self.team, match=self.old_match, player=self.bob, event="fouls", second=5)
+
+        # Everything above happened an hour ago
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Match.objects.update(updated_at=hour_ago)
+        PlayerEventStat.objects.update(updated_at=hour_ago)
+        PlayerEventInstance.objects.update(created_at=hour_ago)
+
+    def _get(self, url):
+        # Fresh user each time, like a real JWT request, so the team's version isn't cached
+        self.client.force_authenticate(user=User.objects.get(pk=self.user_id))
+        return self.client.get(url)
+
+    def test_full_snapshot_without_token(self):
+        response = self._get("/api/sync/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["full"])
+        self.assertEqual(len(response.data["matches"]), 1)
+        self.assertEqual(len(response.data["stats"]), 1)
+        self.assertEqual(response.data["events"][0]["match_id"], self.old_match.id)
+        self.assertTrue(response.data["token"])
+
+    def test_delta_returns_only_changes_and_deletions(self):
+        # As if the client last synced half an hour ago
+        token = make_sync_token(timezone.now() - timedelta(minutes=30))
+        self.client.force_authenticate(user=User.objects.get(pk=self.user_id))
+        self.client.post(f"/api/matches/{self.old_match.id}/tackles/Alice/increment/", {}, format="json")
+        self.client.post("/api/chat/messages/", {"message": "Press higher"}, format="json")
+        self.client.delete(f"/api/teams/players/{self.bob.id}/")
+
+        data = self._get(f"/api/sync/?since={token}").data
+        self.assertFalse(data["full"])
+        self.assertEqual([s["player"] for s in data["stats"]], ["Alice"])
+        self.assertEqual([e["player"] for e in data["events"]], ["Alice"])
+        self.assertEqual([m["message"] for m in data["chat"]], ["Press higher"])
+        self.assertEqual(data["matches"], [])
+        self.assertEqual(data["deleted"]["player"], [self.bob.id])
+        self.assertEqual(len(data["deleted"]["stat"]), 1)
+        self.assertEqual(len(data["deleted"]["event"]), 1)
+
+    def test_invalid_token_is_400(self):
+        response = self._get("/api/sync/?since=garbage")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_token_gets_full_snapshot_and_old_tombstones_are_purged(self):
+        self.client.force_authenticate(user=User.objects.get(pk=self.user_id))
+        self.client.delete(f"/api/teams/players/{self.bob.id}/")
+        SyncTombstone.objects.update(deleted_at=timezone.now() - TOMBSTONE_RETENTION - timedelta(days=1))
+        self.assertEqual(purge_tombstones(), 3)
+
+        token = make_sync_token(timezone.now() - TOMBSTONE_RETENTION - timedelta(hours=1))
+        data = self._get(f"/api/sync/?since={token}").data
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["matches"]), 1)
@@ -1,11 +1,21 @@
 """
-Integration tests: GET /api/teams/me/ and POST /api/teams/signup/.
+Integration tests: GET /api/teams/me/, POST /api/teams/signup/ and the team analytics endpoints.
 """
+from decimal import Decimal
+from io import StringIO
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from ..models import Team, Profile
+from ..aggregates import rebuild_all
+from ..models import Team, Profile, Player, Match, PlayerEventInstance, PlayerEventStat
+from ..versioning import bump_team_version
 
 
 class TeamMeIntegrationTests(APITestCase):
@@ -62,3 +72,147 @@ class TeamSignupIntegrationTests(APITestCase):
         self.assertTrue(User.objects.filter(username="manager@new.com").exists())
         team = Team.objects.get(club_name="New Club")
         self.assertEqual(team.players.count(), 2)
+
+
+class PlayerXGStatsIntegrationTests(APITestCase):
+    """GET /api/teams/player-xg-stats/ - per-player xG, shots and accuracy from one grouped query."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        self.user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=self.user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user = User.objects.get(pk=self.user.pk)
+        self.match = Match.objects.create(team=self.team, opponent="R", kickoff_at=timezone.now(), analyst_name="A", season="2025/26")
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    def _shot(self, name, event, xg):
+        player, _ = Player.objects.get_or_create(team=self.team, name=name)
+        PlayerEventInstance.objects.create(team=self.team, match=self.match, player=player, event=event, xg=Decimal(xg))
+        # What the increment endpoint does after writing
+        bump_team_version(self.team.id)
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+
+    def test_player_totals(self):
+        self._shot("Alice", "shots_on_target", "0.30")
+        self._shot("Alice", "shots_off_target", "0.05")
+        self._shot("Bob", "shots_on_target", "0.10")
+        response = self.client.get("/api/teams/player-xg-stats/", {"season": "2025/26"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        alice = response.data["player_xg"][0]
+        self.assertEqual(alice["player"], "Alice")
+        self.assertEqual(alice["xg"], 0.35)
+        self.assertEqual(alice["shots"], 2)
+        self.assertEqual(alice["on_target_ratio"], 0.5)
+
+    def test_one_grouped_query_regardless_of_shots(self):
+        self._shot("Alice", "shots_on_target", "0.30")
+        # Warm the cached user.profile.team with other params so the measured request still misses the cache
+        self.client.get("/api/teams/player-xg-stats/", {"season": "x"})
+        with CaptureQueriesContext(connection) as few:
+            self.client.get("/api/teams/player-xg-stats/")
+        for i in range(20):
+            self._shot(f"Player {i}", "shots_on_target", "0.10")
+        self.client.get("/api/teams/player-xg-stats/", {"season": "x"})
+        with CaptureQueriesContext(connection) as many:
+            self.client.get("/api/teams/player-xg-stats/")
+        # data version (cache key) + one grouped query
+        self.assertEqual(len(few), 2)
+        self.assertEqual(len(many), 2)
+
+    def test_response_cached_until_team_data_changes(self):
+        self._shot("Alice", "shots_on_target", "0.30")
+        self.assertEqual(self.client.get("/api/teams/player-xg-stats/")["X-Cache"], "MISS")
+        hit = self.client.get("/api/teams/player-xg-stats/")
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit.data["player_xg"][0]["xg"], 0.3)
+        self._shot("Alice", "shots_on_target", "0.30")
+        fresh = self.client.get("/api/teams/player-xg-stats/")
+        self.assertEqual(fresh["X-Cache"], "MISS")
+        self.assertEqual(fresh.data["player_xg"][0]["xg"], 0.6)
+
+    def test_hit_miss_counters_kept_in_cache(self):
+        self.client.get("/api/teams/player-xg-stats/")
+        self.client.get("/api/teams/player-xg-stats/")
+        out = StringIO()
+        call_command("response_cache_stats", "--reset", stdout=out)
+        self.assertIn("all: 1 hits, 1 misses (50% hit rate)", out.getvalue())
+        self.assertIn("PlayerXGStatsView: 1 hits, 1 misses", out.getvalue())
+        self.assertIn("ZoneAnalysisView: 0 hits, 0 misses", out.getvalue())
+        self.assertEqual(cache.get("resp-stats:hits"), None)
+
+
+class MLPerformanceImprovementTests(APITestCase):
+    """GET /api/ml/performance-improvement/ - cached, so analysis_date is when the stats changed, not request time."""
+
+    def setUp(self):
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.match = Match.objects.create(team=self.team, opponent="R", kickoff_at=timezone.now(), analyst_name="A")
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+
+    def test_analysis_date_is_last_stat_update(self):
+        player = Player.objects.create(team=self.team, name="Alice")
+        stat = PlayerEventStat.objects.create(team=self.team, match=self.match, player=player, event="fouls", count=3)
+        url = f"/api/ml/performance-improvement/?player_id={player.id}"
+        self.assertEqual(self.client.get(url).data["analysis_date"], stat.updated_at.isoformat())
+        hit = self.client.get(url)
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit.data["analysis_date"], stat.updated_at.isoformat())
+
+
+class TeamPerformanceStatsIntegrationTests(APITestCase):
+    """GET /api/teams/performance-stats/ - season totals read from TeamSeasonAggregate, kept current on write."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        self.user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=self.user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.user = User.objects.get(pk=self.user.pk)
+        for scored, conceded, formation in [(2, 1, "4-4-2"), (1, 1, "4-4-2"), (0, 3, "4-3-3")]:
+            Match.objects.create(
+                team=self.team, opponent="R", kickoff_at=timezone.now(), analyst_name="A",
+                goals_scored=scored, goals_conceded=conceded, formation=formation, xg=Decimal("1.20"),
+            )
+        # Matches made through the ORM skip the API write paths, so build the aggregates once
+        rebuild_all(team_ids=[self.team.id])
+        self.client.force_authenticate(user=self.user)
+
+    def test_stats_payload(self):
+        response = self.client.get("/api/teams/performance-stats/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["match_count"], 3)
+        self.assertEqual(response.data["most_used_formation"], "4-4-2")
+        self.assertEqual(response.data["goals"]["scored"], 3)
+        self.assertEqual(response.data["goals"]["conceded"], 5)
+        self.assertEqual(response.data["xg"]["for"], 3.6)
+        self.assertEqual(response.data["record"], {"wins": 1, "draws": 1, "losses": 1, "points": 4})
+
+    def test_query_budget(self):
+        self.client.get("/api/teams/performance-stats/")  # warm the cached user.profile.team
+        # data version (ETag) + the season aggregate
+        with self.assertNumQueries(2):
+            self.client.get("/api/teams/performance-stats/")
+
+    def test_aggregate_follows_writes(self):
+        match = Match.objects.filter(team=self.team, goals_scored=0).first()
+        self.client.patch(f"/api/matches/{match.id}/", {"goals_scored": 4}, format="json")
+        self.client.post(f"/api/matches/{match.id}/shots_on_target/Alice/increment/", {"zone": "1"}, format="json")
+        response = self.client.get("/api/teams/performance-stats/")
+        self.assertEqual(response.data["goals"]["scored"], 7)
+        self.assertEqual(response.data["record"]["wins"], 2)
+        self.assertEqual(response.data["xg"]["for"], 3.9)
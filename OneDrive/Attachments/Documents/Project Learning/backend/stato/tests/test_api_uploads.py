@@ -0,0 +1,191 @@
+"""
+Integration tests: resumable recording uploads (/api/matches/<id>/video/uploads/).
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import UnreadablePostError
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from ..models import Team, Profile, Match, MatchRecording, RecordingUpload
+from ..uploads import _append_file, append_chunk, staging_path
+
+CHUNK_TYPE = "application/offset+octet-stream"
+
+
+class _DroppingStream:
+    """Request body whose connection drops after `data`."""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def read(self, size):
+        chunk = self.stream.read(size)
+        if not chunk:
+            raise UnreadablePostError("connection reset")
+        return chunk
+
+
+class UploadTestCase(APITestCase):
+    """Manager with a match, uploading into a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        self.match = Match.objects.create(team=self.team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M")
+        self.data = bytes(range(256)) * 40
+
+
+class ResumableUploadTests(UploadTestCase):
+    """Chunks append at the current offset; a dropped chunk resumes; finalize attaches the file."""
+
+    def _create(self):
+        response = self.client.post(
+            f"/api/matches/{self.match.id}/video/uploads/",
+            {"length": len(self.data), "filename": "derby.mp4", "duration_seconds": 90},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["url"]
+
+    def _patch(self, url, offset, body):
+        return self.client.generic("PATCH", url, body, content_type=CHUNK_TYPE, HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunks_resume_and_finalize(self):
+        url = self._create()
+        self.assertEqual(self._patch(url, 0, self.data[:4000]).status_code, status.HTTP_204_NO_CONTENT)
+
+        # Replaying a chunk the server already has is a conflict that reports the offset
+        response = self._patch(url, 0, self.data[:4000])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response["Upload-Offset"], "4000")
+        self.assertEqual(self.client.head(url)["Upload-Offset"], "4000")
+        self.assertEqual(self.client.post(url + "finalize/").status_code, status.HTTP_409_CONFLICT)
+
+        # Connection drops after 1000 of 3000 bytes: those are kept
+        upload = RecordingUpload.objects.get()
+        with self.assertRaises(UnreadablePostError):
+            append_chunk(upload, 4000, _DroppingStream(self.data[4000:5000]), 3000)
+        self.assertEqual(self.client.get(url).data["offset"], 5000)
+
+        self._patch(url, 5000, self.data[5000:])
+        response = self.client.post(url + "finalize/")
+        self.assertIn(response.status_code, (status.HTTP_200_OK, status.HTTP_201_CREATED))
+        self.assertEqual(response.data["duration_seconds"], 90)
+
+        recording = MatchRecording.objects.get(match=self.match)
+        self.assertTrue(recording.file.name.startswith("recordings/derby"))
+        with recording.file.open("rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(RecordingUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "upload-staging")), [])
+
+    def test_finalize_replaces_previous_recording(self):
+        response = self.client.post(
+            f"/api/matches/{self.match.id}/video/",
+            {"file": SimpleUploadedFile("first.mp4", b"old video", content_type="video/mp4")},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        old_name = MatchRecording.objects.get(match=self.match).file.name
+
+        url = self._create()
+        self._patch(url, 0, self.data)
+        self.client.post(url + "finalize/")
+        recording = MatchRecording.objects.get(match=self.match)
+        self.assertNotEqual(recording.file.name, old_name)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, old_name)))
+
+    def test_staging_files_are_not_served(self):
+        url = self._create()
+        self._patch(url, 0, self.data[:100])
+        upload = RecordingUpload.objects.get()
+        self.assertTrue(os.path.exists(staging_path(upload)))
+        response = self.client.get(f"/media/upload-staging/{upload.id}.part")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_team_cannot_see_upload(self):
+        url = self._create()
+        other_team = Team.objects.create(club_name="Other", team_name="Other")
+        other = User.objects.create_user(username="other@test.com", email="other@test.com", password="pass1234")
+        profile = Profile.objects.get(user=other)
+        profile.team = other_team
+        profile.save()
+        self.client.force_authenticate(user=User.objects.get(pk=other.pk))
+        self.assertEqual(self._patch(url, 0, self.data[:10]).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MultiPartUploadTests(UploadTestCase):
+    """Parts arrive in any order, are hashed as they stream, and are joined in order on finalize."""
+
+    def _create(self, parts):
+        response = self.client.post(
+            f"/api/matches/{self.match.id}/video/uploads/",
+            {"length": len(self.data), "filename": "derby.mp4", "parts": parts},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["url"]
+
+    def _put(self, url, number, body, **extra):
+        return self.client.generic("PUT", f"{url}parts/{number}/", body, content_type="application/octet-stream", **extra)
+
+    def test_parts_out_of_order_assemble_with_checksum(self):
+        url = self._create(3)
+        parts = [self.data[:4000], self.data[4000:8000], self.data[8000:]]
+
+        response = self._put(url, 3, parts[2])
+        self.assertEqual(response.data["sha256"], hashlib.sha256(parts[2]).hexdigest())
+        bad = self._put(url, 1, parts[0], HTTP_UPLOAD_CHECKSUM="sha256 " + "0" * 64)
+        self.assertEqual(bad.status_code, 460)
+        self._put(url, 1, parts[0], HTTP_UPLOAD_CHECKSUM="sha256 " + hashlib.sha256(parts[0]).hexdigest())
+
+        response = self.client.post(url + "finalize/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["missing_parts"], [2])
+
+        self._put(url, 2, parts[1])
+        self.assertEqual(self.client.get(url).data["offset"], len(self.data))
+        response = self.client.post(url + "finalize/")
+        composite = hashlib.sha256(b"".join(hashlib.sha256(p).digest() for p in parts)).hexdigest()
+        self.assertEqual(response.data["checksum"], f"{composite}-3")
+
+        recording = MatchRecording.objects.get(match=self.match)
+        with recording.file.open("rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "upload-staging")), [])
+
+    def test_append_file_falls_back_without_copy_file_range(self):
+        src = os.path.join(self.media_root, "src")
+        with open(src, "wb") as f:
+            f.write(self.data)
+        dst_path = os.path.join(self.media_root, "dst")
+        copy_file_range = getattr(os, "copy_file_range", None)
+        if copy_file_range:
+            del os.copy_file_range
+            self.addCleanup(setattr, os, "copy_file_range", copy_file_range)
+        with open(dst_path, "wb", buffering=0) as dst:
+            dst.write(b"head")
+            _append_file(dst, src)
+        with open(dst_path, "rb") as f:
+            self.assertEqual(f.read(), b"head" + self.data)
@@ -0,0 +1,135 @@
+"""
+Integration tests: Range streaming of large files from /media/ and the recording stream.
+"""
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from ..media import CHUNK_SIZE
+from ..models import Team, Profile, Match, MatchRecording
+
+# Sparse, so it takes no disk space; reads return zeros
+BIG_FILE_SIZE = 5 * 1024 ** 3
+RANGE_LENGTH = 256 * 1024 ** 2
+
+
+class LargeFileStreamingTests(APITestCase):
+    """A multi-GB file is streamed in chunks: memory stays bounded whatever the size."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, "recordings"))
+        with open(os.path.join(self.media_root, "recordings", "big.mp4"), "wb") as f:
+            f.truncate(BIG_FILE_SIZE)
+        self.client = APIClient()
+
+    def _drain_peak_memory(self, response):
+        """Read the whole streamed body (which closes it); return (bytes read, peak traced memory)."""
+        tracemalloc.start()
+        try:
+            total = 0
+            for chunk in response.streaming_content:
+                total += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return total, peak
+
+    def test_whole_file_is_streamed_not_loaded(self):
+        response = self.client.get("/media/recordings/big.mp4")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Length"], str(BIG_FILE_SIZE))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertLessEqual(len(next(iter(response.streaming_content))), CHUNK_SIZE)
+
+    def test_large_range_uses_bounded_memory(self):
+        start = BIG_FILE_SIZE - RANGE_LENGTH
+        response = self.client.get("/media/recordings/big.mp4", HTTP_RANGE=f"bytes={start}-")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], f"bytes {start}-{BIG_FILE_SIZE - 1}/{BIG_FILE_SIZE}")
+        total, peak = self._drain_peak_memory(response)
+        self.assertEqual(total, RANGE_LENGTH)
+        self.assertLess(peak, 16 * CHUNK_SIZE)
+
+    def test_recording_stream_range_uses_bounded_memory(self):
+        team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = team
+        profile.role = "manager"
+        profile.save()
+        match = Match.objects.create(team=team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M")
+        MatchRecording.objects.create(match=match, file="recordings/big.mp4")
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        url = self.client.get(f"/api/matches/{match.id}/recording/playback-url/").data["url"]
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(url, HTTP_RANGE=f"bytes=-{RANGE_LENGTH}")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Length"], str(RANGE_LENGTH))
+        total, peak = self._drain_peak_memory(response)
+        self.assertEqual(total, RANGE_LENGTH)
+        self.assertLess(peak, 16 * CHUNK_SIZE)
+
+    def test_unsatisfiable_range_is_416(self):
+        response = self.client.get("/media/recordings/big.mp4", HTTP_RANGE=f"bytes={BIG_FILE_SIZE}-")
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], f"bytes */{BIG_FILE_SIZE}")
+
+
+class MediaOffloadTests(APITestCase):
+    """MEDIA_OFFLOAD: Django checks access, the front server sends the bytes."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_OFFLOAD_PREFIX="/protected-media/")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        os.makedirs(os.path.join(self.media_root, "recordings"))
+        with open(os.path.join(self.media_root, "recordings", "my clip.mp4"), "wb") as f:
+            f.write(b"x" * 100)
+        self.client = APIClient()
+
+    @override_settings(MEDIA_OFFLOAD="x-accel-redirect")
+    def test_recording_stream_returns_accel_redirect_without_db_queries(self):
+        team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = team
+        profile.save()
+        match = Match.objects.create(team=team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M")
+        MatchRecording.objects.create(match=match, file="recordings/my clip.mp4")
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        url = self.client.get(f"/api/matches/{match.id}/recording/playback-url/").data["url"]
+        self.client.force_authenticate(user=None)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/recordings/my%20clip.mp4")
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.client.get(url[:-4] + "abcd").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(MEDIA_OFFLOAD="x-sendfile")
+    def test_media_returns_sendfile_path(self):
+        response = self.client.get("/media/recordings/my%20clip.mp4")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Sendfile"], os.path.join(self.media_root, "recordings", "my clip.mp4"))
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, status.HTTP_404_NOT_FOUND)
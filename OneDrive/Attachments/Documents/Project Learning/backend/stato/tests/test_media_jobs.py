@@ -0,0 +1,338 @@
+"""
+Integration tests: media worker jobs (stato/media_jobs.py), highlight clips,
+thumbnail sprites (stato/sprites.py) and HLS renditions (stato/hls.py).
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from ..hls import build_hls, hls_dir
+from ..media_jobs import MAX_ATTEMPTS, RUNNING_TIMEOUT, run_next_job
+from ..sprites import sprite_vtt, sprites_dir
+from ..models import (
+    Team, Profile, Match, MatchRecording, Player, PlayerEventInstance, MediaJob, HighlightClip,
+)
+
+
+class MediaJobTestCase(APITestCase):
+    """Manager with a finished match and a player, in a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "manager"
+        profile.save()
+        self.manager = User.objects.get(pk=user.pk)
+        self.client.force_authenticate(user=self.manager)
+        self.match = Match.objects.create(
+            team=self.team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M", state="finished",
+        )
+        self.alice = Player.objects.create(team=self.team, name="Alice")
+
+    def _upload(self, content, name="match.mp4"):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                f"/api/matches/{self.match.id}/video/",
+                {"file": SimpleUploadedFile(name, content, content_type="video/mp4")},
+                format="multipart",
+            )
+
+
+class MediaJobQueueTests(MediaJobTestCase):
+    """Recording uploads and post-match tagging queue one job per kind; the worker retries then gives up."""
+
+    def test_upload_and_review_tagging_queue_one_job_per_kind(self):
+        self._upload(b"not really a video")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/matches/{self.match.id}/shots_on_target/Alice/increment/", {"second": 30}, format="json")
+        jobs = MediaJob.objects.filter(match=self.match).order_by("created_at", "id")
+        self.assertEqual([j.kind for j in jobs], ["prepare", "clips", "sprites"])
+        self.assertTrue(all(j.status == "pending" for j in jobs))
+
+    def test_live_tagging_skips_recording_lookup(self):
+        Match.objects.filter(pk=self.match.pk).update(state="first_half")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/matches/{self.match.id}/fouls/Alice/increment/", {"second": 30}, format="json")
+        self.assertFalse(MediaJob.objects.exists())
+
+    @override_settings(FFMPEG_BINARY="no-such-ffmpeg-binary")
+    def test_missing_ffmpeg_retries_then_fails(self):
+        self._upload(b"not really a video")
+        PlayerEventInstance.objects.create(team=self.team, match=self.match, player=self.alice, event="fouls", second=30)
+        self.assertEqual(run_next_job().kind, "prepare")  # no ffmpeg needed
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            job = run_next_job()
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn("ffmpeg not found", job.error)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(run_next_job().kind, "sprites")
+
+    def test_job_left_running_by_dead_worker_is_reclaimed(self):
+        stuck = MediaJob.objects.create(match=self.match, kind="prepare", status="running", attempts=1)
+        spent = MediaJob.objects.create(match=self.match, kind="sprites", status="running", attempts=MAX_ATTEMPTS)
+        self.assertIsNone(run_next_job())  # still within RUNNING_TIMEOUT
+
+        MediaJob.objects.update(updated_at=timezone.now() - RUNNING_TIMEOUT - timedelta(minutes=1))
+        job = run_next_job()
+        self.assertEqual((job.pk, job.status, job.attempts), (stuck.pk, "done", 2))
+        spent.refresh_from_db()
+        self.assertEqual(spent.status, "failed")
+        self.assertIn("Worker stopped", spent.error)
+
+
+class PlayerClipsTests(MediaJobTestCase):
+    """GET /api/players/<id>/clips/ - playlist of the current recording's clips, filtered by event."""
+
+    def setUp(self):
+        super().setUp()
+        MatchRecording.objects.create(match=self.match, file="recordings/match.mp4")
+        shot = PlayerEventInstance.objects.create(team=self.team, match=self.match, player=self.alice, event="shots_on_target", second=30)
+        foul = PlayerEventInstance.objects.create(team=self.team, match=self.match, player=self.alice, event="fouls", second=50)
+        stale = PlayerEventInstance.objects.create(team=self.team, match=self.match, player=self.alice, event="shots_on_target", second=70)
+        for event, source in ((shot, "recordings/match.mp4"), (foul, "recordings/match.mp4"), (stale, "recordings/old.mp4")):
+            HighlightClip.objects.create(
+                event=event, file=f"clips/{self.match.id}/{event.id}.mp4", source=source,
+                start_second=event.second - 8, duration=12,
+            )
+        self.shot = shot
+
+    def test_playlist_filtered_by_event(self):
+        response = self.client.get(f"/api/players/{self.alice.id}/clips/?event=shots_on_target")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c["event_id"] for c in response.data["clips"]], [self.shot.id])
+        self.assertEqual(len(self.client.get(f"/api/players/{self.alice.id}/clips/").data["clips"]), 2)
+        self.assertEqual(self.client.get(f"/api/players/{self.alice.id}/clips/?event=bogus").status_code, 400)
+        self.assertEqual(len(self.client.get(f"/api/players/{self.alice.id}/clips/?match={self.match.id}").data["clips"]), 2)
+        self.assertEqual(self.client.get(f"/api/players/{self.alice.id}/clips/?match=abc").status_code, 400)
+
+    def test_clips_only_served_through_signed_url(self):
+        path = os.path.join(self.media_root, "clips", str(self.match.id), f"{self.shot.id}.mp4")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"0123456789abcdef")
+        url = self.client.get(f"/api/players/{self.alice.id}/clips/?event=shots_on_target").data["clips"][0]["url"]
+        self.assertIn(f"/api/players/{self.alice.id}/clips/{self.shot.id}/stream/?token=", url)
+
+        anonymous = APIClient()
+        response = anonymous.get(url, HTTP_RANGE="bytes=0-3")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(response.streaming_content), b"0123")
+        token = url.split("token=", 1)[1]
+        other = f"/api/players/{self.alice.id}/clips/{self.shot.id + 1}/stream/?token={token}"
+        self.assertEqual(anonymous.get(other).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(anonymous.get(f"/media/clips/{self.match.id}/{self.shot.id}.mp4").status_code, 404)
+
+    def test_player_only_sees_own_clips(self):
+        bob = Player.objects.create(team=self.team, name="Bob")
+        user = User.objects.create_user(username="bob@test.com", email="bob@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = self.team
+        profile.role = "player"
+        profile.player = bob
+        profile.save()
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        response = self.client.get(f"/api/players/{self.alice.id}/clips/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ClipJobTests(MediaJobTestCase):
+    """The clips job with a stand-in ffmpeg: per-event failures, retries and clip files removed with their event."""
+
+    def setUp(self):
+        super().setUp()
+        self.first = PlayerEventInstance.objects.create(team=self.team, match=self.match, player=self.alice, event="fouls", second=15)
+        self.broken = PlayerEventInstance.objects.create(team=self.team, match=self.match, player=self.alice, event="fouls", second=40)
+        # Writes its last argument (the output path), except for self.broken's clip
+        self.ffmpeg = os.path.join(self.media_root, "fake-ffmpeg")
+        with open(self.ffmpeg, "w") as f:
+            f.write(
+                "#!/bin/sh\n"
+                "for last; do :; done\n"
+                f'case "$last" in */{self.broken.id}.mp4.tmp.mp4) echo broken >&2; exit 1;; esac\n'
+                'echo clip > "$last"\n'
+            )
+        os.chmod(self.ffmpeg, 0o755)
+        self._upload(b"not really a video")
+        run_next_job()  # prepare
+
+    def test_failed_cut_does_not_stop_the_others(self):
+        with override_settings(FFMPEG_BINARY=self.ffmpeg):
+            job = run_next_job()
+            self.assertEqual((job.kind, job.status), ("clips", "pending"))
+            self.assertIn(f"failed on events {self.broken.id}", job.error)
+            self.assertEqual(list(HighlightClip.objects.values_list("event_id", flat=True)), [self.first.id])
+
+            # The retry only re-cuts the missing clip
+            self.broken.delete()
+            job = run_next_job()
+            self.assertEqual((job.kind, job.status), ("clips", "done"))
+        self.assertEqual(HighlightClip.objects.count(), 1)
+
+    def test_deleting_event_deletes_clip_file(self):
+        with override_settings(FFMPEG_BINARY=self.ffmpeg):
+            run_next_job()
+        path = HighlightClip.objects.get(event=self.first).file.path
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.delete()
+        self.assertFalse(HighlightClip.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+class ThumbnailSpriteTests(MediaJobTestCase):
+    """GET /api/matches/<id>/recording/thumbnails/ and the WebVTT track, served from /media/."""
+
+    INDEX = {"interval": 10, "width": 160, "height": 90, "columns": 10, "rows": 10, "count": 102,
+             "sheets": ["sheet-001.jpg", "sheet-002.jpg"]}
+
+    def _write_sprites(self, recording_name):
+        directory = os.path.join(self.media_root, sprites_dir(recording_name))
+        os.makedirs(directory)
+        with open(os.path.join(directory, "thumbnails.json"), "w") as f:
+            json.dump(self.INDEX, f)
+        with open(os.path.join(directory, "thumbnails.vtt"), "w") as f:
+            f.write(sprite_vtt(self.INDEX))
+        return directory
+
+    def test_vtt_cues_point_into_sheets(self):
+        cues = sprite_vtt(self.INDEX).strip().split("\n\n")
+        self.assertEqual(cues[0], "WEBVTT")
+        self.assertEqual(cues[12], "00:01:50.000 --> 00:02:00.000\nsheet-001.jpg#xywh=160,90,160,90")
+        self.assertEqual(cues[102], "00:16:50.000 --> 00:17:00.000\nsheet-002.jpg#xywh=160,0,160,90")
+
+    def test_thumbnails_endpoint_and_media(self):
+        self._upload(b"not really a video")
+        url = f"/api/matches/{self.match.id}/recording/thumbnails/"
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        recording = MatchRecording.objects.get(match=self.match)
+        self._write_sprites(recording.file.name)
+        data = self.client.get(url).data
+        self.assertEqual(data["count"], 102)
+        self.assertTrue(data["sheets"][1].endswith(f"/media/{sprites_dir(recording.file.name)}/sheet-002.jpg"))
+        vtt = self.client.get(data["vtt_url"])
+        self.assertEqual(vtt["Content-Type"], "text/vtt")
+        self.assertTrue(b"".join(vtt.streaming_content).startswith(b"WEBVTT"))
+
+    def test_replacing_recording_deletes_sprites(self):
+        self._upload(b"first")
+        directory = self._write_sprites(MatchRecording.objects.get(match=self.match).file.name)
+        self._upload(b"second")
+        self.assertFalse(os.path.exists(directory))
+
+
+class HLSPlaybackTests(MediaJobTestCase):
+    """HLS_ENABLED queues the job; /recording/hls/ serves signed playlists and cacheable segments."""
+
+    def _write_hls(self, recording_name):
+        directory = os.path.join(self.media_root, hls_dir(recording_name))
+        os.makedirs(os.path.join(directory, "360p"))
+        with open(os.path.join(directory, "master.m3u8"), "w") as f:
+            f.write("#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\n360p/index.m3u8\n")
+        with open(os.path.join(directory, "360p", "index.m3u8"), "w") as f:
+            f.write("#EXTM3U\n#EXT-X-PLAYLIST-TYPE:VOD\n#EXTINF:6.0,\nseg-00000.ts\n#EXT-X-ENDLIST\n")
+        with open(os.path.join(directory, "360p", "seg-00000.ts"), "wb") as f:
+            f.write(b"G" * 1880)
+        return directory
+
+    def test_hls_job_only_when_enabled(self):
+        self._upload(b"first")
+        self.assertFalse(MediaJob.objects.filter(kind="hls").exists())
+        with override_settings(HLS_ENABLED=True):
+            self._upload(b"second")
+        self.assertTrue(MediaJob.objects.filter(kind="hls", status="pending").exists())
+
+    def test_signed_playlists_and_segments(self):
+        self._upload(b"not really a video")
+        self.assertNotIn("hls_url", self.client.get(f"/api/matches/{self.match.id}/recording/playback-url/").data)
+        directory = self._write_hls(MatchRecording.objects.get(match=self.match).file.name)
+        hls_url = self.client.get(f"/api/matches/{self.match.id}/recording/playback-url/").data["hls_url"]
+        token = hls_url.split("?token=")[1]
+        base = hls_url.split("master.m3u8")[0]
+
+        anonymous = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            master = anonymous.get(hls_url)
+            variant_uri = master.content.decode().splitlines()[2]
+            variant = anonymous.get(base + variant_uri)
+            segment_uri = variant.content.decode().splitlines()[3]
+            segment = anonymous.get(base + "360p/" + segment_uri)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(master["Content-Type"], "application/vnd.apple.mpegurl")
+        self.assertEqual(variant_uri, f"360p/index.m3u8?token={token}")
+        self.assertEqual(segment_uri, f"seg-00000.ts?token={token}")
+        self.assertEqual(b"".join(segment.streaming_content), b"G" * 1880)
+        self.assertEqual(segment["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(anonymous.get(f"/media/{os.path.relpath(directory, self.media_root)}/master.m3u8").status_code, 404)
+
+        self.assertEqual(anonymous.get(base + "master.m3u8").status_code, 401)
+        self.assertEqual(anonymous.get(f"{base}../../stream/?token={token}").status_code, 404)
+        self._upload(b"replacement")
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(anonymous.get(hls_url).status_code, 404)
+
+
+@unittest.skipUnless(shutil.which("ffmpeg"), "ffmpeg is not installed")
+class ClipCuttingTests(MediaJobTestCase):
+    """With a real ffmpeg: the worker cuts keyframe-aligned clips and builds the sprite sheets."""
+
+    def setUp(self):
+        super().setUp()
+        source = os.path.join(self.media_root, "source.mp4")
+        subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=duration=30:size=160x120:rate=25",
+             "-g", "50", "-pix_fmt", "yuv420p", source],
+            check=True,
+        )
+        with open(source, "rb") as f:
+            self._upload(f.read())
+
+    def test_worker_cuts_clip(self):
+        event = PlayerEventInstance.objects.create(team=self.team, match=self.match, player=self.alice, event="fouls", second=15)
+
+        run_next_job()  # prepare
+        job = run_next_job()
+        self.assertEqual(job.status, "done", job.error)
+        clip = HighlightClip.objects.get(event=event)
+        self.assertEqual(clip.start_second, 6.0)  # keyframe every 2 s, at or before 15 - 8
+        self.assertGreater(os.path.getsize(clip.file.path), 0)
+
+    def test_worker_builds_sprites(self):
+        MediaJob.objects.filter(kind="clips").delete()
+        run_next_job()  # prepare: duration from mvhd bounds the thumbnail count
+        job = run_next_job()
+        self.assertEqual((job.kind, job.status), ("sprites", "done"), job.error)
+        data = self.client.get(f"/api/matches/{self.match.id}/recording/thumbnails/").data
+        self.assertEqual((data["count"], len(data["sheets"])), (3, 1))
+
+    def test_build_hls_renditions(self):
+        with override_settings(HLS_RENDITIONS=[("low", 90, "200k"), ("high", 120, "400k")]):
+            self.assertEqual(build_hls(self.match), 2)
+        directory = os.path.join(self.media_root, hls_dir(MatchRecording.objects.get(match=self.match).file.name))
+        with open(os.path.join(directory, "master.m3u8")) as f:
+            master = f.read()
+        self.assertIn("low/index.m3u8", master)
+        self.assertIn("high/index.m3u8", master)
+        self.assertTrue(os.path.exists(os.path.join(directory, "high", "seg-00000.ts")))
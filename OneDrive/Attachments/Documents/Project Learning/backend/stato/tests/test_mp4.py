@@ -0,0 +1,212 @@
+"""
+Unit + integration tests: MP4 faststart and mvhd duration (stato/mp4.py),
+keyframe seek index (stato/seek_index.py).
+"""
+import os
+import shutil
+import struct
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+
+from ..media_jobs import run_next_job
+from ..models import Team, Profile, Match, MatchRecording, Player, PlayerEventInstance
+from ..mp4 import (
+    Box, _faststart_moov, faststart, find_boxes, iter_boxes, parse_boxes, read_duration, read_moov, video_keyframes,
+)
+
+CHUNKS = [b"A" * 300, b"B" * 500, b"C" * 200]
+
+
+def box(kind, payload):
+    return struct.pack(">I4s", len(payload) + 8, kind) + payload
+
+
+def build_moov(offsets, timescale=1000, duration=5400400, chunk_table=b"stco"):
+    """
+    One video track: two samples per chunk (half a chunk each), one sample
+    per second, keyframes on samples 1, 3, 5 -> 0 s, 2 s, 4 s at each chunk start.
+    """
+    mvhd = struct.pack(">I8xII", 0, timescale, duration) + bytes(80)
+    mdhd = struct.pack(">I8xII", 0, 1000, 6000) + bytes(4)
+    hdlr = struct.pack(">I4x4s", 0, b"vide") + bytes(13)
+    sizes = [size // 2 for chunk in CHUNKS for size in (len(chunk), len(chunk))]
+    fmt = "I" if chunk_table == b"stco" else "Q"
+    stbl = box(b"stbl", b"".join([
+        box(b"stts", struct.pack(">IIII", 0, 1, len(sizes), 1000)),
+        box(b"stss", struct.pack(">IIIII", 0, 3, 1, 3, 5)),
+        box(b"stsz", struct.pack(f">III{len(sizes)}I", 0, 0, len(sizes), *sizes)),
+        box(b"stsc", struct.pack(">IIIII", 0, 1, 1, 2, 1)),
+        box(chunk_table, struct.pack(f">II{len(offsets)}{fmt}", 0, len(offsets), *offsets)),
+    ]))
+    mdia = box(b"mdhd", mdhd) + box(b"hdlr", hdlr) + box(b"minf", stbl)
+    return box(b"moov", box(b"mvhd", mvhd) + box(b"trak", box(b"mdia", mdia)))
+
+
+def build_mp4(moov_first=False):
+    """ftyp + mdat(CHUNKS) + moov, the way phones write them (or moov first)."""
+    ftyp = box(b"ftyp", b"isom\x00\x00\x02\x00isommp41")
+    mdat = box(b"mdat", b"".join(CHUNKS))
+
+    def offsets(mdat_at):
+        starts, pos = [], mdat_at + 8
+        for chunk in CHUNKS:
+            starts.append(pos)
+            pos += len(chunk)
+        return starts
+
+    if moov_first:
+        moov_size = len(build_moov(offsets(0)))
+        return ftyp + build_moov(offsets(len(ftyp) + moov_size)) + mdat
+    return ftyp + mdat + build_moov(offsets(len(ftyp)))
+
+
+def chunk_offsets(path):
+    with open(path, "rb") as f:
+        boxes = list(iter_boxes(f, 0, os.path.getsize(path)))
+        moov_box = next(b for b in boxes if b.type == b"moov")
+        f.seek(moov_box.offset + 8)
+        moov = parse_boxes(f.read(moov_box.size - 8))
+    kind, payload = find_boxes(moov, b"trak", b"mdia", b"minf", b"stbl", b"stco")[0]
+    count = struct.unpack_from(">I", payload, 4)[0]
+    return [b.type for b in boxes], list(struct.unpack_from(f">{count}I", payload, 8))
+
+
+class FaststartTests(SimpleTestCase):
+    """moov moves ahead of mdat and the chunk offsets still point at the same bytes."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "match.mp4")
+
+    def test_moov_moved_first_with_shifted_offsets(self):
+        with open(self.path, "wb") as f:
+            f.write(build_mp4())
+        os.chmod(self.path, 0o644)
+
+        self.assertTrue(faststart(self.path))
+        order, offsets = chunk_offsets(self.path)
+        self.assertEqual(order, [b"ftyp", b"moov", b"mdat"])
+        with open(self.path, "rb") as f:
+            for offset, chunk in zip(offsets, CHUNKS):
+                f.seek(offset)
+                self.assertEqual(f.read(len(chunk)), chunk)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o644)
+        self.assertAlmostEqual(read_duration(self.path), 5400.4)
+
+    def test_video_keyframes_from_sample_tables(self):
+        with open(self.path, "wb") as f:
+            f.write(build_mp4())
+        _, offsets = chunk_offsets(self.path)
+        _, moov = read_moov(self.path)
+        self.assertEqual(video_keyframes(moov), [(0.0, offsets[0]), (2.0, offsets[1]), (4.0, offsets[2])])
+
+    def test_already_faststart_is_left_alone(self):
+        data = build_mp4(moov_first=True)
+        with open(self.path, "wb") as f:
+            f.write(data)
+        self.assertFalse(faststart(self.path))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_stco_overflow_becomes_co64(self):
+        # Media near the 4 GB mark: shifting by the moov size no longer fits 32 bits
+        moov_data = build_moov([0xFFFFFFF0])[8:]
+        moov_box = Box(b"moov", 0x100000100, len(moov_data) + 8, 8)
+        new_moov = _faststart_moov(moov_data, 40, moov_box)
+        tables = find_boxes(parse_boxes(new_moov)[0][1], b"trak", b"mdia", b"minf", b"stbl", b"co64")
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(struct.unpack_from(">Q", tables[0][1], 8)[0], 0xFFFFFFF0 + len(new_moov))
+
+
+class RecordingFaststartOnUploadTests(APITestCase):
+    """POST /video/ queues the "prepare" job, which stores the MP4 moov-first with the duration read from mvhd."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        team = Team.objects.create(club_name="Test Club", team_name="Test Team")
+        user = User.objects.create_user(username="manager@test.com", email="manager@test.com", password="pass1234")
+        profile = Profile.objects.get(user=user)
+        profile.team = team
+        profile.role = "manager"
+        profile.save()
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        self.match = Match.objects.create(team=team, opponent="Rivals", kickoff_at=timezone.now(), analyst_name="M")
+
+    def _upload(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/api/matches/{self.match.id}/video/",
+                {"file": SimpleUploadedFile("match.mp4", build_mp4(), content_type="video/mp4"), **data},
+                format="multipart",
+            )
+
+    def test_upload_is_faststarted_and_duration_from_file(self):
+        response = self._upload(duration_seconds=1)
+        # The request doesn't touch the file; the worker does
+        self.assertEqual(response.data["duration_seconds"], 1)
+        recording = MatchRecording.objects.get(match=self.match)
+        order, _ = chunk_offsets(recording.file.path)
+        self.assertEqual(order, [b"ftyp", b"mdat", b"moov"])
+
+        job = run_next_job()
+        self.assertEqual((job.kind, job.status), ("prepare", "done"))
+        recording.refresh_from_db()
+        self.assertEqual(recording.duration_seconds, 5400)
+        self.assertEqual(recording.size, os.path.getsize(recording.file.path))
+        order, _ = chunk_offsets(recording.file.path)
+        self.assertEqual(order, [b"ftyp", b"moov", b"mdat"])
+
+    def test_faststart_command_matches_prepare_job(self):
+        self._upload()
+        recording = MatchRecording.objects.get(match=self.match)
+        call_command("faststart_recordings", stdout=StringIO())
+        order, _ = chunk_offsets(recording.file.path)
+        self.assertEqual(order, [b"ftyp", b"moov", b"mdat"])
+        updated = MatchRecording.objects.get(pk=recording.pk)
+        self.assertEqual(updated.duration_seconds, 5400)
+        self.assertEqual(updated.revision, os.stat(recording.file.path).st_mtime_ns)
+
+    def test_seek_index_and_event_byte_offsets(self):
+        self._upload()
+        run_next_job()
+        recording = MatchRecording.objects.get(match=self.match)
+        self.assertTrue(os.path.exists(recording.file.path + ".seekidx"))
+        _, offsets = chunk_offsets(recording.file.path)
+
+        data = self.client.get(f"/api/matches/{self.match.id}/recording/seek-index/").data
+        self.assertEqual(data["keyframes"], [[0.0, offsets[0]], [2.0, offsets[1]], [4.0, offsets[2]]])
+        with open(recording.file.path, "rb") as f:
+            f.seek(data["keyframes"][1][1])
+            self.assertEqual(f.read(4), b"BBBB")
+
+        player = Player.objects.create(team=self.match.team, name="Alice")
+        PlayerEventInstance.objects.create(team=self.match.team, match=self.match, player=player, event="fouls", second=3)
+        PlayerEventInstance.objects.create(team=self.match.team, match=self.match, player=player, event="fouls", second=None)
+        events = self.client.get(f"/api/matches/{self.match.id}/events/").data
+        self.assertNotIn("byte_offset", events[0])
+        self.assertEqual((events[1]["keyframe_second"], events[1]["byte_offset"]), (2.0, offsets[1]))
+
+    def test_token_from_before_faststart_is_refused(self):
+        self._upload()
+        stale_url = self.client.get(f"/api/matches/{self.match.id}/recording/playback-url/").data["url"]
+        size = os.path.getsize(MatchRecording.objects.get(match=self.match).file.path)
+        run_next_job()  # prepare: moov moves ahead of mdat, same size
+        self.assertEqual(os.path.getsize(MatchRecording.objects.get(match=self.match).file.path), size)
+
+        self.assertEqual(self.client.get(stale_url, HTTP_RANGE="bytes=0-15").status_code, 404)
+        fresh_url = self.client.get(f"/api/matches/{self.match.id}/recording/playback-url/").data["url"]
+        self.assertEqual(self.client.get(fresh_url, HTTP_RANGE="bytes=0-15").status_code, 206)
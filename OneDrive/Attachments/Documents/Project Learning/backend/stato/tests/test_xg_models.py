@@ -0,0 +1,60 @@
+"""
+Unit tests for the xG model registry and the rescore_shot_xg command.
+"""
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Team, Player, Match, PlayerEventInstance
+from ..xg_models import get_xg_model, register_xg_model, score_shots, _XG_MODELS
+
+
+class XGModelRegistryTests(TestCase):
+    """zone_v1 scores whole arrays of shots; non-shots get None."""
+
+    def test_zone_v1_scores_array(self):
+        values = get_xg_model("zone_v1")(
+            np.array(["shots_on_target", "shots_on_target", "shots_on_target", "shots_off_target", "tackles"], dtype=object),
+            np.array(["1", "5", "", "2", "1"], dtype=object),
+        )
+        self.assertEqual(values.tolist(), [0.3, 0.1, 0.2, 0.05, 0.0])
+
+    def test_score_shots_returns_decimals_and_none(self):
+        self.assertEqual(
+            score_shots(["shots_on_target", "fouls"], ["3", None]),
+            [Decimal("0.30"), None],
+        )
+
+
+class RescoreShotXGCommandTests(TestCase):
+    """manage.py rescore_shot_xg re-scores stored shots and rebuilds Match.xg."""
+
+    def setUp(self):
+        self.team = Team.objects.create(club_name="C", team_name="T")
+        self.player = Player.objects.create(team=self.team, name="P1")
+        self.match = Match.objects.create(team=self.team, opponent="R", kickoff_at=timezone.now(), analyst_name="A")
+        for zone in ("1", "4"):
+            PlayerEventInstance.objects.create(
+                team=self.team, match=self.match, player=self.player,
+                event="shots_on_target", zone=zone, xg=Decimal("0.01"),
+            )
+
+    def tearDown(self):
+        _XG_MODELS.pop("flat_test", None)
+
+    def test_rescore_with_new_model(self):
+        @register_xg_model("flat_test")
+        def flat(events, zones):
+            return np.full(len(events), 0.5)
+
+        call_command("rescore_shot_xg", "--model", "flat_test", stdout=StringIO())
+        self.assertEqual(
+            sorted(PlayerEventInstance.objects.values_list("xg", flat=True)),
+            [Decimal("0.50"), Decimal("0.50")],
+        )
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.xg, Decimal("1.00"))
@@ -0,0 +1,283 @@
+"""
+Resumable (tus-style) recording uploads.
+
+A client creates a RecordingUpload with the total length, PATCHes chunks
+at the current offset (each appended straight to a staging file under
+MEDIA_ROOT/UPLOAD_STAGING_DIR), asks for the offset after a dropped
+connection, and finalizes once every byte has arrived. Finalizing renames
+the staging file into recordings/ (same filesystem, so atomic) and points
+the match's MatchRecording at it; a half-finished upload never replaces the
+recording that is already there.
+
+Each PATCH only holds a worker for its own chunk, and the offset is saved
+with whatever did arrive, so the client resumes rather than restarting.
+
+Multi-part mode (create with part_count=N) lets a client PUT numbered parts
+concurrently to fill the uplink. Each part is streamed into its own file
+while its SHA-256 is computed, then finalize joins them in order with
+os.copy_file_range (the kernel copies; no bytes pass through Python). The
+whole-file checksum is S3-style: sha256 of the concatenated part digests,
+suffixed with "-N", so it needs no second read of the data.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Sum
+from django.http import UnreadablePostError
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .hls import delete_hls
+from .media import CHUNK_SIZE, copy_range
+from .mp4 import prepare_recording
+from .seek_index import build_seek_index, delete_seek_index
+from .sprites import delete_sprites
+from .stream_token import content_type_for_recording
+from .media_jobs import enqueue_media_job, register_media_job
+from .models import Match, MatchRecording, RecordingUpload, RecordingUploadPart
+from .versioning import bump_team_version
+
+UPLOAD_STAGING_DIR = "upload-staging"
+
+
+class UploadOffsetMismatch(Exception):
+    """The chunk doesn't start at the upload's current offset."""
+
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+class ChecksumMismatch(Exception):
+    """The part's bytes don't match the checksum the client sent."""
+
+
+class UploadIncomplete(Exception):
+    """Finalize called on a multi-part upload with parts missing or the wrong total size."""
+
+    def __init__(self, missing, size):
+        super().__init__(missing, size)
+        self.missing = missing
+        self.size = size
+
+
+def staging_path(upload):
+    return os.path.join(default_storage.path(UPLOAD_STAGING_DIR), f"{upload.id}.part")
+
+
+def part_path(upload, number):
+    return os.path.join(default_storage.path(UPLOAD_STAGING_DIR), f"{upload.id}.{number}.part")
+
+
+def create_upload(match, user, filename, length, duration_seconds=None, part_count=None):
+    upload = RecordingUpload.objects.create(
+        match=match,
+        created_by=user if user and user.is_authenticated else None,
+        filename=get_valid_filename(os.path.basename(filename or "")) or "recording.mp4",
+        length=length,
+        duration_seconds=duration_seconds,
+        part_count=part_count,
+    )
+    path = staging_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Write `length` bytes from `stream` at `offset` (which must be the current
+    offset) in CHUNK_SIZE pieces, then save the new offset. A short or broken
+    body still records the bytes that arrived. Returns the new offset.
+    """
+    if offset != upload.offset:
+        raise UploadOffsetMismatch(upload.offset)
+    written = 0
+    try:
+        with open(staging_path(upload), "r+b") as f:
+            f.seek(offset)
+            while written < length:
+                chunk = stream.read(min(CHUNK_SIZE, length - written))
+                if not chunk:
+                    break
+                f.write(chunk)
+                written += len(chunk)
+    finally:
+        if written:
+            # Conditional, so a concurrent PATCH at the same offset can't both count
+            moved = RecordingUpload.objects.filter(pk=upload.pk, offset=offset).update(
+                offset=offset + written, updated_at=timezone.now()
+            )
+            if not moved:
+                upload.refresh_from_db(fields=["offset"])
+                raise UploadOffsetMismatch(upload.offset)
+    upload.offset = offset + written
+    return upload.offset
+
+
+def store_part(upload, number, stream, length, expected_sha256=None):
+    """
+    Stream part `number` into its own file, hashing as it goes. The part is
+    written to a temp name and renamed into place, so a retried or
+    concurrent PUT of the same part never leaves a torn file. Returns the part.
+    """
+    staging_dir = os.path.dirname(part_path(upload, number))
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=staging_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            written = 0
+            while written < length:
+                chunk = stream.read(min(CHUNK_SIZE, length - written))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                written += len(chunk)
+        sha256 = digest.hexdigest()
+        if written != length:
+            raise UnreadablePostError(f"Part {number} ended after {written} of {length} bytes.")
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise ChecksumMismatch(sha256)
+        os.replace(tmp_path, part_path(upload, number))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    part, _ = RecordingUploadPart.objects.update_or_create(
+        upload=upload, number=number, defaults={"size": written, "sha256": sha256}
+    )
+    # Progress: bytes received across all parts
+    received = RecordingUploadPart.objects.filter(upload=upload).aggregate(total=Sum("size"))["total"] or 0
+    RecordingUpload.objects.filter(pk=upload.pk).update(offset=received, updated_at=timezone.now())
+    upload.offset = received
+    return part
+
+
+def _append_file(dst, src_path):
+    """Append src_path to the open file `dst`, copied in the kernel where possible."""
+    with open(src_path, "rb", buffering=0) as src:
+        copy_range(src, dst, 0, os.fstat(src.fileno()).st_size)
+
+
+def assemble_parts(upload):
+    """
+    Join parts 1..part_count into the staging file and delete them.
+    Returns the composite checksum ("<sha256 of part digests>-<N>").
+    """
+    parts = list(upload.parts.order_by("number"))
+    numbers = {p.number for p in parts}
+    missing = [n for n in range(1, upload.part_count + 1) if n not in numbers]
+    size = sum(p.size for p in parts if p.number <= upload.part_count)
+    if missing or size != upload.length:
+        raise UploadIncomplete(missing, size)
+
+    parts = parts[:upload.part_count]
+    with open(staging_path(upload), "wb", buffering=0) as dst:
+        for part in parts:
+            _append_file(dst, part_path(upload, part.number))
+    for part in parts:
+        os.remove(part_path(upload, part.number))
+
+    composite = hashlib.sha256(b"".join(bytes.fromhex(p.sha256) for p in parts))
+    return f"{composite.hexdigest()}-{len(parts)}"
+
+
+def discard_upload(upload):
+    paths = [staging_path(upload)] + [part_path(upload, n) for n in upload.parts.values_list("number", flat=True)]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    upload.delete()
+
+
+def attach_recording(match, name, duration_seconds=None):
+    """
+    Point the match's MatchRecording at `name` (already in default_storage),
+    delete the file it replaces (and its seek index, sprites and HLS), tell
+    clients the match changed and queue the media jobs: "prepare" first
+    (see prepare_attached_recording), then the highlight clips, thumbnail
+    sprites and, with HLS_ENABLED, the HLS renditions. Nothing here reads
+    the file, so finalizing a 5 GB upload returns straight away; until the
+    worker has prepared it, duration_seconds is the client's value.
+    Returns (recording, created).
+    """
+    with transaction.atomic():
+        recording, created = MatchRecording.objects.get_or_create(match=match, defaults={"file": name})
+        old_name = None if created else recording.file.name
+        recording.file.name = name
+        stat = os.stat(default_storage.path(name))
+        recording.size, recording.revision = stat.st_size, stat.st_mtime_ns
+        recording.content_type = content_type_for_recording(name)
+        if duration_seconds is not None:
+            recording.duration_seconds = duration_seconds
+        recording.save()
+        # has_recording / recording URLs changed: let /api/sync/ pick the match up
+        Match.objects.filter(pk=match.pk).update(updated_at=timezone.now())
+    if old_name and old_name != name:
+        if default_storage.exists(old_name):
+            default_storage.delete(old_name)
+        delete_seek_index(old_name)
+        delete_sprites(old_name)
+        delete_hls(old_name)
+    bump_team_version(match.team_id)
+    enqueue_media_job(match.id, "prepare")
+    enqueue_media_job(match.id, "clips")
+    enqueue_media_job(match.id, "sprites")
+    if settings.HLS_ENABLED:
+        enqueue_media_job(match.id, "hls")
+    return recording, created
+
+
+@register_media_job("prepare")
+def prepare_attached_recording(match):
+    """
+    Rewrite an MP4 recording for fast start, take its duration from mvhd
+    rather than the client and build its keyframe seek index (stato/mp4.py,
+    stato/seek_index.py). Run by the media worker: a faststart of a
+    multi-GB file copies every byte, far too long to hold a web request.
+    """
+    recording = MatchRecording.objects.filter(match=match).first()
+    if not recording or not recording.file or not default_storage.exists(recording.file.name):
+        return 0
+    name = recording.file.name
+    duration = prepare_recording(default_storage.path(name))
+    # Offsets change when the file is faststarted
+    delete_seek_index(name)
+    build_seek_index(name)
+    # The rewrite usually keeps the size; the new mtime retires tokens for the old layout
+    stat = os.stat(default_storage.path(name))
+    updates = {"size": stat.st_size, "revision": stat.st_mtime_ns}
+    if duration is not None:
+        updates["duration_seconds"] = duration
+    # Only if the recording wasn't replaced in the meantime
+    if MatchRecording.objects.filter(pk=recording.pk, file=name).update(**updates):
+        Match.objects.filter(pk=match.pk).update(updated_at=timezone.now())
+        bump_team_version(match.team_id)
+    return 1
+
+
+def finalize_upload(upload):
+    """
+    Move the complete staging file into recordings/ and attach it (joining
+    the parts first in multi-part mode). Returns (recording, created, checksum);
+    checksum is None for chunked uploads.
+    """
+    checksum = None
+    if upload.part_count:
+        checksum = assemble_parts(upload)
+    elif upload.offset != upload.length:
+        raise UploadOffsetMismatch(upload.offset)
+    name = default_storage.get_available_name(f"recordings/{upload.filename}")
+    target = default_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(staging_path(upload), target)
+    recording, created = attach_recording(upload.match, name, upload.duration_seconds)
+    upload.delete()
+    return recording, created, checksum
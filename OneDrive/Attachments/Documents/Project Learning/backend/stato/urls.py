@@ -10,6 +10,7 @@ from .views import (
     MatchDetailView,
     MatchStatsListView,
     IncrementEventForMatchView,
+    BatchEventIngestView,
     PerformanceInsightsView,
 )
 from .views_auth import MeView
@@ -19,14 +20,25 @@ from .views_match import (
     MatchVideoUploadView,
     MatchRecordingPlaybackURLView,
     MatchRecordingStreamView,
+    MatchRecordingHLSView,
+    MatchRecordingSeekIndexView,
+    MatchRecordingThumbnailsView,
     MatchOppositionView,
     MatchEventInstancesView,
     LiveMatchSuggestionsView,
     MatchPerformanceSuggestionsView,
 )
+from .views_upload import (
+    RecordingUploadCreateView,
+    RecordingUploadView,
+    RecordingUploadPartView,
+    RecordingUploadFinalizeView,
+)
 from .views_chat import ChatMessagesView
+from .views_sync import SyncView
+from .views_dashboard import DashboardView
 from .views_ml import MLPerformanceImprovementView
-from .views_player import PlayerSignupView, PlayerProfileView, PlayerJoinTeamView, PlayerLeaveTeamView, PlayerMeStatsView
+from .views_player import PlayerSignupView, PlayerProfileView, PlayerJoinTeamView, PlayerLeaveTeamView, PlayerMeStatsView, PlayerClipsView, PlayerClipStreamView
 
 
 class CustomTokenView(TokenObtainPairView):
@@ -55,6 +67,8 @@ urlpatterns = [
     path("players/leave-team/", PlayerLeaveTeamView.as_view()),
     path("players/me/", PlayerProfileView.as_view()),
     path("players/me/stats/", PlayerMeStatsView.as_view()),
+    path("players/<int:player_id>/clips/", PlayerClipsView.as_view()),
+    path("players/<int:player_id>/clips/<int:event_id>/stream/", PlayerClipStreamView.as_view()),
 
     # Matches
     path("matches/", MatchListCreateView.as_view()),
@@ -64,13 +78,24 @@ urlpatterns = [
     path("matches/<int:match_id>/<str:event>/<str:player>/increment/", IncrementEventForMatchView.as_view()),
     path("matches/<int:match_id>/timer/", MatchTimerControlView.as_view()),
     path("matches/<int:match_id>/video/", MatchVideoUploadView.as_view()),
+    path("matches/<int:match_id>/video/uploads/", RecordingUploadCreateView.as_view()),
+    path("matches/<int:match_id>/video/uploads/<uuid:upload_id>/", RecordingUploadView.as_view()),
+    path("matches/<int:match_id>/video/uploads/<uuid:upload_id>/parts/<int:number>/", RecordingUploadPartView.as_view()),
+    path("matches/<int:match_id>/video/uploads/<uuid:upload_id>/finalize/", RecordingUploadFinalizeView.as_view()),
     path("matches/<int:match_id>/recording/playback-url/", MatchRecordingPlaybackURLView.as_view()),
     path("matches/<int:match_id>/recording/stream/", MatchRecordingStreamView.as_view()),
+    path("matches/<int:match_id>/recording/hls/<path:path>", MatchRecordingHLSView.as_view()),
+    path("matches/<int:match_id>/recording/seek-index/", MatchRecordingSeekIndexView.as_view()),
+    path("matches/<int:match_id>/recording/thumbnails/", MatchRecordingThumbnailsView.as_view()),
     path("matches/<int:match_id>/opposition/", MatchOppositionView.as_view()),
     path("matches/<int:match_id>/events/", MatchEventInstancesView.as_view()),
+    path("matches/<int:match_id>/events/batch/", BatchEventIngestView.as_view()),
     path("matches/<int:match_id>/live-suggestions/", LiveMatchSuggestionsView.as_view()),
     path("matches/<int:match_id>/performance-suggestions/", MatchPerformanceSuggestionsView.as_view()),
 
+    # Manager dashboard (all sections in one request)
+    path("dashboard/", DashboardView.as_view()),
+
     # Overall stats (all matches)
     path("stats/", EventStatListView.as_view()),
 
@@ -80,6 +105,9 @@ urlpatterns = [
     # Chat
     path("chat/messages/", ChatMessagesView.as_view()),
 
+    # Delta sync (mobile clients)
+    path("sync/", SyncView.as_view()),
+
     # ML Performance Improvement
     path("ml/performance-improvement/", MLPerformanceImprovementView.as_view()),
 ]
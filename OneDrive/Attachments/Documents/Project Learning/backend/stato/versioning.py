@@ -0,0 +1,193 @@
+"""
+Per-team data version, ETag support and response caching for read endpoints.
+
+Every write that changes what a team's read endpoints return bumps
+Team.data_version. Read views decorated with @etag_by_team_version send an
+ETag derived from that version and answer a matching If-None-Match with 304
+before running the view's own queries or serializer. The version is read
+with one single-column primary-key query (team_data_version): _get_team()
+usually returns a pk-only handle, and a Team cached on the user could carry
+an old version. With JWT claims that query is the whole cost of a 304.
+
+Heavier analytics views use @cached_by_team_version instead: their response
+data is kept in Django's cache under a key that includes the version, so a
+write makes old entries unreachable and they age out via LRU/timeout. Their
+hit/miss counters live in the same cache, so with Redis they add up across
+workers; `manage.py response_cache_stats` prints them.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import F
+from django.http import HttpResponseNotModified
+from rest_framework.response import Response
+
+from .models import Team
+
+
+def bump_team_version(team_id):
+    """Mark a team's data as changed (invalidates ETags and cached responses)."""
+    if team_id:
+        Team.objects.filter(pk=team_id).update(data_version=F("data_version") + 1)
+
+
+def team_data_version(team):
+    """The team's current data_version, in one query."""
+    return Team.objects.filter(pk=team.pk).values_list("data_version", flat=True).first() or 0
+
+
+def team_etag(request, team, version, vary_user=False, max_age=None):
+    """
+    Weak ETag for this request's response given the team's data version.
+    vary_user: response contains per-user data (e.g. signed stream tokens).
+    max_age: also roll the ETag every max_age seconds, so embedded tokens
+    are never reused past that age.
+    """
+    parts = [request.path, request.META.get("QUERY_STRING", "")]
+    if vary_user:
+        parts.append(str(request.user.pk))
+    if max_age:
+        parts.append(str(int(time.time() // max_age)))
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+    return f'W/"{team.id}-{version}-{digest}"'
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: ignore the W/ prefix on either side
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def etag_by_team_version(vary_user=False, max_age=None):
+    """
+    Decorator for APIView GET handlers whose response only depends on the
+    team's data (plus the URL). Returns 304 on a matching If-None-Match,
+    otherwise runs the view and attaches the ETag.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            from .views import _get_team
+
+            team = _get_team(request)
+            if not team:
+                return view_method(self, request, *args, **kwargs)
+
+            etag = team_etag(request, team, team_data_version(team), vary_user=vary_user, max_age=max_age)
+            if _etag_matches(request.META.get("HTTP_IF_NONE_MATCH"), etag):
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                response["ETag"] = etag
+                response["Cache-Control"] = "private, no-cache"
+            return response
+        return wrapper
+    return decorator
+
+
+_STATS_PREFIX = "resp-stats"
+# Names of the views decorated with @cached_by_team_version
+_cached_views = set()
+
+
+def _stats_key(name):
+    return f"{_STATS_PREFIX}:{name}"
+
+
+def _count(view_name, outcome):
+    for name in (outcome, f"{view_name}.{outcome}"):
+        key = _stats_key(name)
+        try:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key)
+        except Exception:
+            pass  # Counters are best effort; never fail a request over them
+
+
+def response_cache_stats():
+    """
+    Hit/miss counters of every worker sharing the cache, e.g. {"hits": 3,
+    "misses": 1, "ZoneAnalysisView.hits": 2, ...}. Views are only listed
+    once their module is imported.
+    """
+    names = ["hits", "misses"] + [
+        f"{view}.{outcome}" for view in sorted(_cached_views) for outcome in ("hits", "misses")
+    ]
+    try:
+        values = cache.get_many([_stats_key(name) for name in names])
+    except Exception:
+        values = {}
+    return {name: values.get(_stats_key(name), 0) for name in names}
+
+
+def reset_response_cache_stats():
+    try:
+        cache.delete_many([_stats_key(name) for name in response_cache_stats()])
+    except Exception:
+        pass
+
+
+def response_cache_key(view_name, request, team, version, view_kwargs=None):
+    """Cache key for (view, team, URL kwargs, query params incl. season, team data version)."""
+    params = sorted((k, sorted(v)) for k, v in request.GET.lists())
+    raw = repr((sorted((view_kwargs or {}).items()), params))
+    digest = hashlib.sha1(raw.encode()).hexdigest()[:16]
+    return f"resp:{view_name}:{team.id}:{version}:{digest}"
+
+
+def cached_by_team_version(timeout=DEFAULT_TIMEOUT):
+    """
+    Decorator for APIView GET handlers that are pure functions of the team's
+    data and the query params. Serves response data from the cache when the
+    team hasn't changed; falls back to computing it if the cache is down.
+    """
+    def decorator(view_method):
+        view_name = view_method.__qualname__.split(".")[0]
+        _cached_views.add(view_name)
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            from .views import _get_team
+
+            team = _get_team(request)
+            if not team:
+                return view_method(self, request, *args, **kwargs)
+
+            key = response_cache_key(view_name, request, team, team_data_version(team), kwargs)
+            try:
+                data = cache.get(key)
+            except Exception:
+                data = None
+            if data is not None:
+                _count(view_name, "hits")
+                response = Response(data, status=200)
+                response["X-Cache"] = "HIT"
+                return response
+
+            _count(view_name, "misses")
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                try:
+                    cache.set(key, response.data, timeout)
+                except Exception:
+                    pass
+                response["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
@@ -2,12 +2,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
 
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from decimal import Decimal
 
-from .models import Player, PlayerEventStat, Match, EVENT_CHOICES, PlayerEventInstance, Profile
+from .models import Player, PlayerEventStat, Match, MatchRecording, EVENT_CHOICES, PlayerEventInstance, Profile
 from .serializers import EventStatSerializer, MatchSerializer
+from .xg_models import SHOT_EVENTS, score_shot, score_shots
+from .aggregates import add_season_xg, refresh_team, refresh_team_season
+from .stream_token import STREAM_TOKEN_MAX_AGE, make_stream_tokens
+from .versioning import bump_team_version, cached_by_team_version, etag_by_team_version
+from .pagination import StatsCursorPagination
+from .sync import record_player_deletions
+from .media_jobs import enqueue_media_job
+from .authentication import bump_auth_version, team_handle, token_claims
 
 
 try:
@@ -26,9 +39,16 @@ except Exception:  # pragma: no cover - safe fallback if redis isn't installed /
 
 
 EVENT_KEYS = {k for (k, _label) in EVENT_CHOICES}
+LIVE_STATES = ("in_progress", "paused", "first_half", "second_half")
+
 
 
 def _get_team(request):
+    claims = token_claims(request.user)
+    if claims is not None:
+        # Verified JWT claims: no Profile / Team query
+        team_id = claims[0]
+        return team_handle(team_id) if team_id else None
     profile = getattr(request.user, "profile", None)
     return getattr(profile, "team", None)
 
@@ -41,6 +61,46 @@ def _get_or_create_player(team, player_name: str):
     return player
 
 
+def _get_or_create_players(team, names):
+    """
+    Bulk version of _get_or_create_player: returns {name: Player} for the
+    given (already stripped) names, creating any that are missing.
+    """
+    names = set(names)
+    players = {p.name: p for p in Player.objects.filter(team=team, name__in=names)}
+    missing = names - set(players)
+    if missing:
+        Player.objects.bulk_create(
+            [Player(team=team, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        players.update({p.name: p for p in Player.objects.filter(team=team, name__in=missing)})
+    return players
+
+
+def _increment_stat(team_id, match_id, player_id, event, by=1):
+    """
+    Atomically bump one PlayerEventStat counter and return the new count.
+
+    Single INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement, so two
+    analysts logging the same player/event at once can't lose an increment
+    (works on PostgreSQL and SQLite >= 3.35).
+    """
+    table = connection.ops.quote_name(PlayerEventStat._meta.db_table)
+    count_col = connection.ops.quote_name("count")
+    sql = (
+        f"INSERT INTO {table} (team_id, match_id, player_id, event, {count_col}, updated_at) "
+        f"VALUES (%s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT (team_id, match_id, player_id, event) "
+        f"DO UPDATE SET {count_col} = {table}.{count_col} + excluded.{count_col}, "
+        f"updated_at = excluded.updated_at "
+        f"RETURNING {count_col}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [team_id, match_id, player_id, event, by, timezone.now()])
+        return cursor.fetchone()[0]
+
+
 def _parse_kickoff(value):
     """
     Accepts ISO strings like:
@@ -90,6 +150,7 @@ class PerformanceInsightsView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @cached_by_team_version()
     def get(self, request):
         team = _get_team(request)
         if not team:
@@ -212,8 +273,12 @@ class TeamPlayersView(APIView):
             seen.add(key)
             cleaned.append(name)
 
+        record_player_deletions(team.id, team.players.all())
         team.players.all().delete()
         Player.objects.bulk_create([Player(team=team, name=name) for name in cleaned])
+        # Deleting players cascades to their stats
+        refresh_team(team.id)
+        bump_team_version(team.id)
 
         return Response({"ok": True, "count": len(cleaned)}, status=200)
 
@@ -231,8 +296,13 @@ class TeamPlayersView(APIView):
             player = Player.objects.get(id=player_id, team=team)
             # Unlink any profile that was linked to this player so they see no team
             # on home and profile until they rejoin.
+            unlinked = list(Profile.objects.filter(player=player).values_list("user_id", flat=True))
             Profile.objects.filter(player=player).update(team=None, player=None)
+            bump_auth_version(unlinked)
+            record_player_deletions(team.id, Player.objects.filter(pk=player.pk))
             player.delete()
+            refresh_team(team.id)
+            bump_team_version(team.id)
             return Response({"ok": True, "message": "Player removed from team."}, status=200)
         except Player.DoesNotExist:
             return Response({"detail": "Player not found."}, status=404)
@@ -244,11 +314,15 @@ class TeamPlayersView(APIView):
 class MatchListCreateView(APIView):
     """
     GET  /api/matches/  -> list matches for team
+         ?include=recording also returns recording_url / recording_stream_url
+         (off by default so the list doesn't sign a token per row)
     POST /api/matches/ -> create match
     body: { opponent, kickoff_at, analyst_name }
     """
     permission_classes = [IsAuthenticated]
 
+    # Rows embed per-user stream tokens, so vary by user and roll before they expire
+    @etag_by_team_version(vary_user=True, max_age=STREAM_TOKEN_MAX_AGE // 2)
     def get(self, request):
         team = _get_team(request)
         if not team:
@@ -261,8 +335,16 @@ class MatchListCreateView(APIView):
         if season:
             qs = qs.filter(season=season)
         
-        qs = qs.order_by("-kickoff_at")
-        return Response(MatchSerializer(qs, many=True, context={"request": request}).data, status=200)
+        # Recording is a reverse one-to-one: join it instead of one query per row
+        matches = list(qs.select_related("recording").order_by("-kickoff_at"))
+
+        include = request.query_params.get("include", "").split(",")
+        context = {"request": request, "include_recording_urls": "recording" in include}
+        if context["include_recording_urls"]:
+            with_recording = [m for m in matches if getattr(m, "recording", None) and m.recording.file]
+            context["stream_tokens"] = make_stream_tokens(with_recording, request.user.id)
+
+        return Response(MatchSerializer(matches, many=True, context=context).data, status=200)
 
     def post(self, request):
         team = _get_team(request)
@@ -317,6 +399,9 @@ class MatchListCreateView(APIView):
                 status=500,
             )
 
+        refresh_team_season(team.id, m.season)
+        bump_team_version(team.id)
+
         return Response(MatchSerializer(m, context={"request": request}).data, status=201)
 
 
@@ -327,6 +412,7 @@ class CurrentLiveMatchView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @etag_by_team_version(vary_user=True, max_age=STREAM_TOKEN_MAX_AGE // 2)
     def get(self, request):
         team = _get_team(request)
         if not team:
@@ -334,8 +420,8 @@ class CurrentLiveMatchView(APIView):
 
         live_match = Match.objects.filter(
             team=team,
-            state__in=["in_progress", "paused", "first_half", "second_half"]
-        ).order_by("-created_at").first()
+            state__in=LIVE_STATES
+        ).select_related("recording").order_by("-created_at").first()
 
         if not live_match:
             return Response({"match": None}, status=200)
@@ -386,6 +472,8 @@ class MatchDetailView(APIView):
                 return Response({"detail": "goals_conceded must be an integer."}, status=400)
 
         match.save()
+        refresh_team_season(team.id, match.season)
+        bump_team_version(team.id)
         
         # Publish goal update to Redis for real-time updates
         if "goals_scored" in request.data or "goals_conceded" in request.data:
@@ -403,9 +491,11 @@ class MatchDetailView(APIView):
 class MatchStatsListView(generics.ListAPIView):
     """
     GET /api/matches/<match_id>/stats/
+    ?limit=&cursor= for keyset pages (see stato/pagination.py)
     """
     permission_classes = [IsAuthenticated]
     serializer_class = EventStatSerializer
+    pagination_class = StatsCursorPagination
 
     def get_queryset(self):
         team = _get_team(self.request)
@@ -415,18 +505,97 @@ class MatchStatsListView(generics.ListAPIView):
         return PlayerEventStat.objects.filter(team=team, match_id=match_id).order_by("-updated_at")
 
 
+class MatrixJSONRenderer(JSONRenderer):
+    """
+    Plain JSON, registered under format "matrix" so DRF's ?format= override
+    accepts /api/stats/?format=matrix instead of answering 404.
+    """
+    format = "matrix"
+
+
+def _stats_matrix(team, per_match=False):
+    """
+    Dense player x event count matrix (optionally match x player x event)
+    from one grouped query over PlayerEventStat.
+    """
+    events = [k for (k, _label) in EVENT_CHOICES]
+    event_index = {e: i for i, e in enumerate(events)}
+
+    group_by = ["player_id", "player__name", "event"] + (["match_id"] if per_match else [])
+    rows = (
+        PlayerEventStat.objects.filter(team=team)
+        .values(*group_by)
+        .annotate(total=Sum("count"))
+        .order_by("player__name", "player_id")
+    )
+
+    players, player_names, player_index = [], [], {}
+    matches, match_index = [], {}
+    cells = []
+    for row in rows:
+        pid = row["player_id"]
+        if pid not in player_index:
+            player_index[pid] = len(players)
+            players.append(pid)
+            player_names.append(row["player__name"])
+        mid = row.get("match_id")
+        if per_match and mid not in match_index:
+            match_index[mid] = len(matches)
+            matches.append(mid)
+        cells.append((match_index.get(mid), player_index[pid], event_index[row["event"]], row["total"] or 0))
+
+    def empty():
+        return [[0] * len(events) for _ in players]
+
+    if per_match:
+        counts = [empty() for _ in matches]
+        for m, p, e, total in cells:
+            counts[m][p][e] = total
+    else:
+        counts = empty()
+        for _m, p, e, total in cells:
+            counts[p][e] = total
+
+    data = {
+        "events": events,
+        "players": players,
+        "player_names": player_names,
+        "counts": counts,
+    }
+    if per_match:
+        data["matches"] = matches
+    return data
+
+
 class EventStatListView(generics.ListAPIView):
     """
     GET /api/stats/ -> overall stats across ALL matches
+    ?limit=&cursor= for keyset pages (see stato/pagination.py)
+    ?format=matrix -> {"events": [...], "players": [ids], "player_names": [...],
+                       "counts": [[int per event] per player]} summed over matches
+    ?format=matrix&per_match=1 -> also "matches": [ids] and counts shaped
+                       (match, player, event)
     """
     permission_classes = [IsAuthenticated]
     serializer_class = EventStatSerializer
+    pagination_class = StatsCursorPagination
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [MatrixJSONRenderer]
+
+    @etag_by_team_version()
+    def get(self, request, *args, **kwargs):
+        if request.query_params.get("format") == "matrix":
+            team = _get_team(request)
+            if not team:
+                return Response({"detail": "No team assigned."}, status=400)
+            per_match = request.query_params.get("per_match") in ("1", "true")
+            return Response(_stats_matrix(team, per_match=per_match), status=200)
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         team = _get_team(self.request)
         if not team:
             return PlayerEventStat.objects.none()
-        return PlayerEventStat.objects.filter(team=team).order_by("-updated_at")
+        return PlayerEventStat.objects.filter(team=team).select_related("player").order_by("-updated_at")
 
 
 # ----------------------------
@@ -454,17 +623,6 @@ class IncrementEventForMatchView(APIView):
         if not p:
             return Response({"detail": "Invalid player."}, status=400)
 
-        stat, _ = PlayerEventStat.objects.get_or_create(
-            team=team,
-            match=match,
-            player=p,
-            event=event,
-            defaults={"count": 0},
-        )
-
-        stat.count += 1
-        stat.save()
-
         # optional richer instance for timestamps + pitch zones
         second = request.data.get("second")
         zone = request.data.get("zone")
@@ -473,28 +631,34 @@ class IncrementEventForMatchView(APIView):
                 second = int(second)
         except (TypeError, ValueError):
             second = None
+        zone_str = str(zone) if zone is not None else None
+        shot_xg = score_shot(event, zone_str)
 
-        # Create event instance if table exists (gracefully skip if migrations not run yet)
-        try:
+        # Counter, instance and xG move together; a failure is a 500, not a silently lost instance
+        with transaction.atomic():
+            count = _increment_stat(team.id, match.id, p.id, event)
             PlayerEventInstance.objects.create(
                 team=team,
                 match=match,
                 player=p,
                 event=event,
                 second=second,
-                zone=str(zone) if zone is not None else None,
+                zone=zone_str,
+                xg=shot_xg,
             )
-        except Exception:
-            # Table might not exist yet - that's okay, the stat increment still worked
-            pass
+            # Only shots move xG, and only by this shot's own value
+            _add_match_xg(match, shot_xg)
+            _refresh_if_finished(match)
+            _queue_clips_if_reviewed(match, [second])
+            bump_team_version(team.id)
 
         data = {
             "team_id": team.id,
             "match_id": match.id,
             "player": p.name,
             "player_id": p.id,
-            "event": stat.event,
-            "count": stat.count,
+            "event": event,
+            "count": count,
             "second": second,
             "zone": zone,
         }
@@ -502,49 +666,184 @@ class IncrementEventForMatchView(APIView):
         # Publish to Redis so the Node WebSocket server can broadcast to clients
         _publish_event_to_redis(data)
 
-        # Update xG if shots events are recorded
-        _update_match_xg(match)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+# Upper bound on one batch so a single request can't hold the transaction open forever.
+MAX_BATCH_EVENTS = 500
+
+
+class BatchEventIngestView(APIView):
+    """
+    POST /api/matches/<match_id>/events/batch/
+    body: { events: [{ event, player, second?, zone? }, ...] }
+
+    Applies a backlog of logged events (e.g. queued while the analyst was
+    offline) in one transaction: players are resolved in bulk, instances are
+    bulk-inserted and counters are bumped with a single UPDATE. One combined
+    message is published to Redis instead of one per event.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, match_id):
+        team = _get_team(request)
+        if not team:
+            return Response({"detail": "No team assigned."}, status=400)
+
+        match = Match.objects.filter(team=team, id=match_id).first()
+        if not match:
+            return Response({"detail": "Match not found."}, status=404)
+
+        records = request.data.get("events")
+        if not isinstance(records, list) or not records:
+            return Response({"detail": "events must be a non-empty list."}, status=400)
+        if len(records) > MAX_BATCH_EVENTS:
+            return Response({"detail": f"At most {MAX_BATCH_EVENTS} events per batch."}, status=400)
+
+        # Validate everything up front so a bad record rejects the whole batch
+        cleaned = []
+        for i, rec in enumerate(records):
+            if not isinstance(rec, dict):
+                return Response({"detail": f"events[{i}] must be an object."}, status=400)
+            event = rec.get("event")
+            if event not in EVENT_KEYS:
+                return Response({"detail": f"events[{i}]: Invalid event."}, status=400)
+            name = str(rec.get("player") or "").strip()
+            if not name:
+                return Response({"detail": f"events[{i}]: Invalid player."}, status=400)
+            second = rec.get("second")
+            try:
+                if second is not None:
+                    second = int(second)
+            except (TypeError, ValueError):
+                second = None
+            zone = rec.get("zone")
+            cleaned.append({
+                "event": event,
+                "player": name,
+                "second": second,
+                "zone": str(zone) if zone is not None else None,
+            })
+
+        shot_xgs = score_shots([r["event"] for r in cleaned], [r["zone"] for r in cleaned])
+
+        with transaction.atomic():
+            players = _get_or_create_players(team, {r["player"] for r in cleaned})
+
+            PlayerEventInstance.objects.bulk_create([
+                PlayerEventInstance(
+                    team=team,
+                    match=match,
+                    player=players[r["player"]],
+                    event=r["event"],
+                    second=r["second"],
+                    zone=r["zone"],
+                    xg=xg,
+                )
+                for r, xg in zip(cleaned, shot_xgs)
+            ])
+
+            deltas = {}
+            for r in cleaned:
+                key = (players[r["player"]].id, r["event"])
+                deltas[key] = deltas.get(key, 0) + 1
+
+            # Make sure every counter row exists, then bump them all in one statement
+            PlayerEventStat.objects.bulk_create(
+                [
+                    PlayerEventStat(team=team, match=match, player_id=pid, event=ev, count=0)
+                    for (pid, ev) in deltas
+                ],
+                ignore_conflicts=True,
+            )
+            pairs = Q()
+            whens = []
+            for (pid, ev), delta in deltas.items():
+                pairs |= Q(player_id=pid, event=ev)
+                whens.append(When(player_id=pid, event=ev, then=Value(delta)))
+            stats_qs = PlayerEventStat.objects.filter(team=team, match=match).filter(pairs)
+            stats_qs.update(
+                count=F("count") + Case(*whens, default=Value(0), output_field=IntegerField()),
+                updated_at=timezone.now(),
+            )
+            final_counts = {
+                (row["player_id"], row["event"]): row["count"]
+                for row in stats_qs.values("player_id", "event", "count")
+            }
+
+            _add_match_xg(match, sum(xg for xg in shot_xgs if xg))
+            _refresh_if_finished(match)
+            _queue_clips_if_reviewed(match, [r["second"] for r in cleaned])
+            bump_team_version(team.id)
+
+        # Work out the running count each record produced, in the order sent
+        remaining = dict(deltas)
+        applied = []
+        for r in cleaned:
+            p = players[r["player"]]
+            key = (p.id, r["event"])
+            remaining[key] -= 1
+            applied.append({
+                "player": p.name,
+                "player_id": p.id,
+                "event": r["event"],
+                "count": final_counts.get(key, 0) - remaining[key],
+                "second": r["second"],
+                "zone": r["zone"],
+            })
+
+        data = {
+            "team_id": team.id,
+            "match_id": match.id,
+            "type": "batch",
+            "events": applied,
+        }
+        _publish_event_to_redis(data)
 
         return Response(data, status=status.HTTP_200_OK)
 
 
+def _add_match_xg(match, amount):
+    """
+    Atomically add a shot's xG to Match.xg and the team's season aggregate
+    (no-op for non-shot events).
+    """
+    if not amount:
+        return
+    Match.objects.filter(pk=match.pk).update(xg=F("xg") + amount, updated_at=timezone.now())
+    add_season_xg(match, amount)
+
+
+def _refresh_if_finished(match):
+    """Finished matches feed the season event totals, so fold late corrections in."""
+    if match.state == "finished":
+        refresh_team_season(match.team_id, match.season)
+
+
+def _queue_clips_if_reviewed(match, seconds):
+    """
+    Timed events tagged on a finished match (post-match review against the
+    recording) get highlight clips. Live matches have no recording yet, so
+    the hot path skips the lookup; the recording upload queues their clips.
+    """
+    if match.state == "finished" and any(s is not None for s in seconds):
+        if MatchRecording.objects.filter(match=match).exists():
+            enqueue_media_job(match.id, "clips")
+
+
 def _update_match_xg(match):
     """
-    Calculate and update xG for a match based on shot events.
-    Simplified xG model:
-    - Shots on target in zones 1-3 (attacking zones): 0.3 xG each
-    - Shots on target in zones 4-6 (defensive zones): 0.1 xG each
-    - Shots off target: 0.05 xG each
+    Rebuild Match.xg from scratch from the match's shot events.
+    The hot path keeps xG up to date with _add_match_xg; this is the repair
+    routine used when a match finishes and by `manage.py rebuild_match_xg`.
     """
-    from .models import PlayerEventInstance
-    
-    # Get all shot events for this match
-    shots_on_target = PlayerEventInstance.objects.filter(
+    xg_total = PlayerEventInstance.objects.filter(
         match=match,
-        event="shots_on_target"
-    )
-    shots_off_target = PlayerEventInstance.objects.filter(
-        match=match,
-        event="shots_off_target"
-    )
-    
-    xg_total = 0.0
-    
-    # Calculate xG for shots on target based on zone
-    for shot in shots_on_target:
-        zone = shot.zone
-        if zone in ["1", "2", "3"]:  # Attacking zones
-            xg_total += 0.3
-        elif zone in ["4", "5", "6"]:  # Defensive/midfield zones
-            xg_total += 0.1
-        else:
-            xg_total += 0.2  # Default
-    
-    # Shots off target have lower xG
-    xg_total += shots_off_target.count() * 0.05
-    
+        event__in=SHOT_EVENTS,
+    ).aggregate(total=Sum("xg"))["total"] or Decimal("0")
+
     match.xg = xg_total
-    match.save(update_fields=["xg"])
+    match.save(update_fields=["xg", "updated_at"])
 
 
 # ----------------------------
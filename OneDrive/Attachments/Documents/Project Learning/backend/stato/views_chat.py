@@ -7,11 +7,24 @@ from datetime import timedelta
 
 from .models import ChatMessage, Team, Match
 from .views import _get_team
+from .versioning import bump_team_version
+from .pagination import ChatCursorPagination
+
+
+def _message_data(msg):
+    return {
+        "id": msg.id,
+        "sender": msg.sender.username,
+        "sender_role": msg.sender_role,
+        "message": msg.message,
+        "timestamp": msg.created_at.isoformat(),
+    }
 
 
 class ChatMessagesView(APIView):
     """
     GET /api/chat/messages/ - Get recent team chat messages (manager or player with team)
+        ?limit=&cursor= pages back through older messages (see stato/pagination.py)
     POST /api/chat/messages/ - Send a new message (manager or player with team)
     """
     permission_classes = [IsAuthenticated]
@@ -32,18 +45,16 @@ class ChatMessagesView(APIView):
             except Match.DoesNotExist:
                 pass
 
+        queryset = queryset.select_related("sender")
+        paginator = ChatCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            # Page is newest first; send it oldest first like the default view
+            return paginator.get_paginated_response([_message_data(msg) for msg in reversed(page)])
+
         messages = queryset[:50]
         
-        return Response([
-            {
-                "id": msg.id,
-                "sender": msg.sender.username,
-                "sender_role": msg.sender_role,
-                "message": msg.message,
-                "timestamp": msg.created_at.isoformat(),
-            }
-            for msg in reversed(messages)
-        ], status=200)
+        return Response([_message_data(msg) for msg in reversed(messages)], status=200)
 
     def post(self, request):
         team = _get_team(request)
@@ -74,6 +85,7 @@ class ChatMessagesView(APIView):
             sender_role=profile.role,
             message=message_text,
         )
+        bump_team_version(team.id)
 
         # Publish to Redis for WebSocket broadcast
         from .views import _publish_event_to_redis
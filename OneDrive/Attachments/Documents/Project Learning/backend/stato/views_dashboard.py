@@ -0,0 +1,95 @@
+# views_dashboard.py - Manager dashboard in one request
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from .models import Match, PlayerEventStat
+from .serializers import EventStatSerializer, MatchSerializer, TeamSerializer
+from .stream_token import STREAM_TOKEN_MAX_AGE
+from .versioning import etag_by_team_version
+from .authentication import load_team
+from .views import LIVE_STATES, _get_team
+from .views_team import _performance_stats_data, _player_xg_data, _zone_analysis_data
+
+DASHBOARD_SECTIONS = (
+    "team",
+    "matches",
+    "current_live",
+    "performance_stats",
+    "player_xg",
+    "zone_analysis",
+    "stats",
+)
+
+
+class DashboardView(APIView):
+    """
+    GET /api/dashboard/?sections=team,matches,...&season=2025/26
+
+    Everything the manager dashboard used to fetch separately, in one
+    request. Each section holds exactly what its standalone endpoint returns:
+      team              -> /api/teams/me/
+      matches           -> /api/matches/ (no recording URLs; ?season= applies)
+      current_live      -> /api/matches/current-live/
+      performance_stats -> /api/teams/performance-stats/
+      player_xg         -> /api/teams/player-xg-stats/
+      zone_analysis     -> /api/teams/zone-analysis/
+      stats             -> /api/stats/
+    Without ?sections= every section is returned. The team is resolved once,
+    and matches and current_live share one query.
+    """
+    permission_classes = [IsAuthenticated]
+
+    # current_live embeds a per-user stream token, like /matches/current-live/
+    @etag_by_team_version(vary_user=True, max_age=STREAM_TOKEN_MAX_AGE // 2)
+    def get(self, request):
+        team = _get_team(request)
+        if not team:
+            return Response({"detail": "No team assigned."}, status=400)
+
+        requested = request.query_params.get("sections")
+        if requested:
+            sections = [s.strip() for s in requested.split(",") if s.strip()]
+            unknown = [s for s in sections if s not in DASHBOARD_SECTIONS]
+            if unknown:
+                return Response({
+                    "detail": f"Unknown section(s): {', '.join(unknown)}.",
+                    "sections": list(DASHBOARD_SECTIONS),
+                }, status=400)
+        else:
+            sections = list(DASHBOARD_SECTIONS)
+
+        season = request.query_params.get("season", None)
+        data = {"sections": sections}
+
+        if "team" in sections:
+            data["team"] = TeamSerializer(load_team(team)).data
+
+        if "matches" in sections or "current_live" in sections:
+            # One query for both: the live match may be from any season
+            matches = list(Match.objects.filter(team=team).select_related("recording").order_by("-kickoff_at"))
+            if "matches" in sections:
+                season_matches = [m for m in matches if m.season == season] if season else matches
+                context = {"request": request, "include_recording_urls": False}
+                data["matches"] = MatchSerializer(season_matches, many=True, context=context).data
+            if "current_live" in sections:
+                live = [m for m in matches if m.state in LIVE_STATES]
+                live_match = max(live, key=lambda m: m.created_at) if live else None
+                data["current_live"] = {
+                    "match": MatchSerializer(live_match, context={"request": request}).data if live_match else None
+                }
+
+        if "performance_stats" in sections:
+            data["performance_stats"] = _performance_stats_data(team, season)
+
+        if "player_xg" in sections:
+            data["player_xg"] = _player_xg_data(team, season)
+
+        if "zone_analysis" in sections:
+            data["zone_analysis"] = _zone_analysis_data(team, season)
+
+        if "stats" in sections:
+            stats = PlayerEventStat.objects.filter(team=team).select_related("player").order_by("-updated_at")
+            data["stats"] = EventStatSerializer(stats, many=True).data
+
+        return Response(data, status=200)
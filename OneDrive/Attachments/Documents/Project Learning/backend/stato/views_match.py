@@ -2,7 +2,7 @@
 Match management views: timer control, video upload, event instances, live and post-match suggestions.
 Formation comparison uses Match.opponent_formation only; no opposition event stats.
 """
-import re
+import os
 from urllib.parse import quote
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -11,13 +11,21 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 
 from django.core.files.storage import default_storage
-from django.http import FileResponse, HttpResponse
+from django.http import HttpResponse
 from rest_framework.permissions import AllowAny
 
 from .models import Match, PlayerEventInstance, MatchRecording, EVENT_CHOICES
 from .serializers import MatchSerializer, EventInstanceSerializer
 from .views import _get_team, EVENT_KEYS
-from .stream_token import make_stream_token, validate_stream_token
+from .stream_token import content_type_for_recording, make_stream_token, read_stream_token, validate_stream_token
+from .aggregates import refresh_team_season
+from .versioning import bump_team_version, etag_by_team_version
+from .seek_index import load_seek_index
+from .hls import MASTER_NAME, has_hls, hls_file, sign_playlist
+from .sprites import VTT_NAME, load_sprite_index, sprites_dir
+from .pagination import EventCursorPagination
+from .uploads import attach_recording
+from .media import offload_enabled, offload_response, ranged_file_response
 
 
 class MatchTimerControlView(APIView):
@@ -39,6 +47,7 @@ class MatchTimerControlView(APIView):
 
         action = request.data.get("action")
         elapsed = request.data.get("elapsed_seconds")
+        was_finished = match.state == "finished"
 
         if action == "start":
             match.state = "first_half"
@@ -61,6 +70,9 @@ class MatchTimerControlView(APIView):
             return Response({"detail": "Invalid action. Use start, pause, resume, or finish."}, status=400)
 
         match.save()
+        if was_finished or match.state == "finished":
+            refresh_team_season(team.id, match.season)
+        bump_team_version(team.id)
         return Response(MatchSerializer(match, context={"request": request}).data, status=200)
 
 
@@ -68,6 +80,8 @@ class MatchVideoUploadView(APIView):
     """
     POST /api/matches/<match_id>/video/
     multipart/form-data with 'file' field
+    Large files: use /video/uploads/ instead (resumable chunks, or parallel
+    parts with "parts": N - see stato/views_upload.py).
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
@@ -86,38 +100,29 @@ class MatchVideoUploadView(APIView):
 
         video_file = request.FILES["file"]
         duration = request.data.get("duration_seconds")
-
-        # Create or update recording
-        recording, created = MatchRecording.objects.get_or_create(
-            match=match,
-            defaults={"file": video_file}
-        )
-
-        if not created:
-            # Update existing recording
-            if default_storage.exists(recording.file.name):
-                default_storage.delete(recording.file.name)
-            recording.file = video_file
-
-        if duration:
-            try:
-                recording.duration_seconds = int(duration)
-            except (TypeError, ValueError):
-                pass
-
-        recording.save()
-
-        if recording.file and request.user.is_authenticated:
-            token = make_stream_token(match_id, request.user.id)
-            stream_url = request.build_absolute_uri(f"/api/matches/{match_id}/recording/stream/?token={quote(token, safe='')}")
-        else:
-            stream_url = None
-        return Response({
-            "ok": True,
-            "recording_url": request.build_absolute_uri(recording.file.url) if recording.file else None,
-            "recording_stream_url": stream_url,
-            "duration_seconds": recording.duration_seconds,
-        }, status=200 if created else 201)
+        try:
+            duration = int(duration) if duration else None
+        except (TypeError, ValueError):
+            duration = None
+
+        name = default_storage.save(default_storage.generate_filename(f"recordings/{video_file.name}"), video_file)
+        recording, created = attach_recording(match, name, duration)
+        return _recording_saved_response(request, match, recording, created)
+
+
+def _recording_saved_response(request, match, recording, created):
+    """Response for a newly attached recording (multipart or resumable upload)."""
+    if recording.file and request.user.is_authenticated:
+        token = make_stream_token(match, request.user.id)
+        stream_url = request.build_absolute_uri(f"/api/matches/{match.id}/recording/stream/?token={quote(token, safe='')}")
+    else:
+        stream_url = None
+    return Response({
+        "ok": True,
+        "recording_url": request.build_absolute_uri(recording.file.url) if recording.file else None,
+        "recording_stream_url": stream_url,
+        "duration_seconds": recording.duration_seconds,
+    }, status=200 if created else 201)
 
 
 class MatchOppositionView(APIView):
@@ -138,20 +143,6 @@ class MatchOppositionView(APIView):
         return Response([], status=200)
 
 
-def _content_type_for_recording(name):
-    """Return a sensible Content-Type for a recording filename."""
-    if not name:
-        return "video/mp4"
-    name_lower = name.lower()
-    if name_lower.endswith(".mov"):
-        return "video/quicktime"
-    if name_lower.endswith(".mp4"):
-        return "video/mp4"
-    if name_lower.endswith(".webm"):
-        return "video/webm"
-    return "video/mp4"
-
-
 class MatchRecordingPlaybackURLView(APIView):
     """
     GET /api/matches/<match_id>/recording/playback-url/
@@ -172,9 +163,62 @@ class MatchRecordingPlaybackURLView(APIView):
                 return Response({"detail": "No recording."}, status=404)
         except MatchRecording.DoesNotExist:
             return Response({"detail": "No recording."}, status=404)
-        token = make_stream_token(match_id, request.user.id)
-        url = request.build_absolute_uri(f"/api/matches/{match_id}/recording/stream/?token={quote(token, safe='')}")
-        return Response({"url": url}, status=200)
+        token = make_stream_token(match, request.user.id)
+        token_qs = quote(token, safe='')
+        data = {"url": request.build_absolute_uri(f"/api/matches/{match_id}/recording/stream/?token={token_qs}")}
+        if has_hls(match.recording.file.name):
+            data["hls_url"] = request.build_absolute_uri(
+                f"/api/matches/{match_id}/recording/hls/{MASTER_NAME}?token={token_qs}"
+            )
+        return Response(data, status=200)
+
+
+class MatchRecordingHLSView(APIView):
+    """
+    GET /api/matches/<match_id>/recording/hls/<path>?token=<signed_token>
+    HLS playlists and segments of the match recording (stato/hls.py), for
+    the hls_url returned by /recording/playback-url/. Checked with the same
+    stream token as /recording/stream/ and, like it, served without database
+    queries. Every URI inside a served playlist gets the token appended, so
+    the player can follow them without an Authorization header. Segments are
+    immutable and publicly cacheable for a year; a token for a replaced
+    recording is 404.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, match_id, path):
+        token = request.query_params.get("token", "").strip()
+        payload = read_stream_token(token, match_id)
+        if not payload:
+            return Response({"detail": "Invalid or expired token."}, status=401)
+        name = hls_file(payload["p"], path) if payload.get("p") else None
+        if not name:
+            return Response({"detail": "Not found."}, status=404)
+
+        if path.endswith(".m3u8"):
+            try:
+                with default_storage.open(name, "r") as f:
+                    playlist = f.read()
+            except FileNotFoundError:
+                return Response({"detail": "Not found."}, status=404)
+            response = HttpResponse(sign_playlist(playlist, token), content_type="application/vnd.apple.mpegurl")
+            response["Cache-Control"] = "private, no-cache"
+            _add_cors(request, response)
+            return response
+
+        if offload_enabled():
+            if not default_storage.exists(name):
+                return Response({"detail": "Not found."}, status=404)
+            response = offload_response(name, "video/mp2t")
+        else:
+            try:
+                f = default_storage.open(name, "rb")
+            except FileNotFoundError:
+                return Response({"detail": "Not found."}, status=404)
+            response = ranged_file_response(request, f, f.size, "video/mp2t")
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+        _add_cors(request, response)
+        return response
 
 
 class MatchRecordingStreamView(APIView):
@@ -182,13 +226,23 @@ class MatchRecordingStreamView(APIView):
     GET /api/matches/<match_id>/recording/stream/?token=<signed_token>
     Stream the match recording. Accepts either ?token= (for <video> src) or Bearer auth.
     Token is short-lived so the video element can load without sending Authorization header.
+    A token carries the recording's path, size, revision and content type,
+    so serving it does no database queries.
     """
     permission_classes = [AllowAny]
 
     def get(self, request, match_id):
-        match = None
         token = request.query_params.get("token", "").strip()
         if token:
+            payload = read_stream_token(token, match_id)
+            if payload and payload.get("p"):
+                return _stream_recording(
+                    request, payload["p"], payload["c"], size=payload.get("s"), revision=payload.get("r")
+                )
+
+        match = None
+        if token:
+            # Tokens minted before they carried the recording details
             valid, user_id = validate_stream_token(token, match_id)
             if valid:
                 from django.contrib.auth import get_user_model
@@ -217,70 +271,65 @@ class MatchRecordingStreamView(APIView):
         name = recording.file.name
         if not default_storage.exists(name):
             return Response({"detail": "Recording file not found."}, status=404)
-        content_type = _content_type_for_recording(name)
-        origin = request.headers.get("Origin", "*")
+        return _stream_recording(request, name, content_type_for_recording(name))
+
+
+def _add_cors(request, response):
+    response["Access-Control-Allow-Origin"] = request.headers.get("Origin", "*")
+    response["Access-Control-Expose-Headers"] = "Accept-Ranges, Content-Length, Content-Range"
 
-        def add_cors(r):
-            r["Access-Control-Allow-Origin"] = origin
-            r["Access-Control-Expose-Headers"] = "Accept-Ranges, Content-Length, Content-Range"
 
+def _stream_recording(request, name, content_type, size=None, revision=None):
+    """
+    Serve a recording from default_storage with Range support, or hand it to
+    the front server when MEDIA_OFFLOAD is set (see stato/media.py). `size`
+    and `revision` (st_mtime_ns) come from the stream token when known; one
+    stat checks them against the file, so a token for a since-replaced or
+    since-rewritten (faststarted) upload gets a 404 instead of bad ranges.
+    """
+    if size is not None or revision is not None:
         try:
-            size = default_storage.size(name)
-        except Exception:
-            size = None
-        if size is None:
-            # Fallback: open and get size by seeking (e.g. some storages)
-            try:
-                with default_storage.open(name, "rb") as f:
-                    f.seek(0, 2)
-                    size = f.tell()
-            except Exception as e:
-                return Response({"detail": str(e)}, status=500)
-
-        range_header = request.META.get("HTTP_RANGE", "").strip()
-        if not range_header:
-            try:
-                f = default_storage.open(name, "rb")
-                response = FileResponse(f, content_type=content_type, as_attachment=False)
-                response["Accept-Ranges"] = "bytes"
-                response["Content-Length"] = str(size)
-                add_cors(response)
-                return response
-            except Exception as e:
-                return Response({"detail": str(e)}, status=500)
-
-        match = re.match(r"bytes=(\d*)-(\d*)", range_header)
-        if not match:
-            r = HttpResponse(status=416)
-            add_cors(r)
-            return r
-        start_s, end_s = match.groups()
-        start = int(start_s) if start_s else 0
-        end = int(end_s) if end_s else size - 1
-        if start >= size:
-            r = HttpResponse(status=416)
-            add_cors(r)
-            return r
-        end = min(end, size - 1)
-        length = end - start + 1
+            stat = os.stat(default_storage.path(name))
+        except FileNotFoundError:
+            return Response({"detail": "Recording file not found."}, status=404)
+        if (size is not None and stat.st_size != size) or (revision is not None and stat.st_mtime_ns != revision):
+            return Response({"detail": "Recording has changed; request a new playback URL."}, status=404)
+
+    if offload_enabled():
+        # Checked above; let the front server send the bytes
+        response = offload_response(name, content_type)
+        _add_cors(request, response)
+        return response
+
+    try:
+        f = default_storage.open(name, "rb")
+    except FileNotFoundError:
+        return Response({"detail": "Recording file not found."}, status=404)
+    except Exception as e:
+        return Response({"detail": str(e)}, status=500)
+
+    try:
+        actual_size = f.size
+    except Exception:
+        # Fallback: get size by seeking (e.g. some storages)
         try:
-            with default_storage.open(name, "rb") as f:
-                f.seek(start)
-                content = f.read(length)
+            f.seek(0, 2)
+            actual_size = f.tell()
+            f.seek(0)
         except Exception as e:
+            f.close()
             return Response({"detail": str(e)}, status=500)
-        response = HttpResponse(content, status=206, content_type=content_type)
-        response["Content-Range"] = f"bytes {start}-{end}/{size}"
-        response["Content-Length"] = str(length)
-        response["Accept-Ranges"] = "bytes"
-        add_cors(response)
-        return response
+    # Streams the file / range in fixed-size chunks; never reads it whole
+    response = ranged_file_response(request, f, actual_size, content_type)
+    _add_cors(request, response)
+    return response
 
 
 class MatchEventInstancesView(APIView):
     """
     GET /api/matches/<match_id>/events/
     Returns all event instances with timestamps for video seeking.
+    ?limit=&cursor= for keyset pages ordered by (second, id) (see stato/pagination.py)
     """
     permission_classes = [IsAuthenticated]
 
@@ -294,7 +343,88 @@ class MatchEventInstancesView(APIView):
             return Response({"detail": "Match not found."}, status=404)
 
         instances = PlayerEventInstance.objects.filter(team=team, match=match).order_by("second", "created_at")
-        return Response(EventInstanceSerializer(instances, many=True).data, status=200)
+        recording_name = MatchRecording.objects.filter(match=match).values_list("file", flat=True).first()
+        index = load_seek_index(recording_name) if recording_name else None
+        paginator = EventCursorPagination()
+        page = paginator.paginate_queryset(instances, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(_with_seek_offsets(EventInstanceSerializer(page, many=True).data, index))
+        return Response(_with_seek_offsets(EventInstanceSerializer(instances, many=True).data, index), status=200)
+
+
+def _with_seek_offsets(events, index):
+    """
+    Add keyframe_second / byte_offset (where to start a Range request) to
+    each event that has a timestamp, when the recording has a seek index.
+    """
+    if not index:
+        return events
+    for event in events:
+        keyframe = index.keyframe_at(event["second"]) if event.get("second") is not None else None
+        if keyframe:
+            event["keyframe_second"], event["byte_offset"] = keyframe
+    return events
+
+
+class MatchRecordingSeekIndexView(APIView):
+    """
+    GET /api/matches/<match_id>/recording/seek-index/
+    {"media_offset": <bytes of header + moov before the media data>,
+     "keyframes": [[second, byte_offset], ...]} for the match recording,
+    from stato/seek_index.py. 404 when there's no recording or it isn't an MP4.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @etag_by_team_version()
+    def get(self, request, match_id):
+        team = _get_team(request)
+        if not team:
+            return Response({"detail": "No team assigned."}, status=400)
+        recording_name = MatchRecording.objects.filter(
+            match__team=team, match_id=match_id
+        ).values_list("file", flat=True).first()
+        if not recording_name:
+            return Response({"detail": "No recording."}, status=404)
+        index = load_seek_index(recording_name)
+        if index is None:
+            return Response({"detail": "No seek index for this recording."}, status=404)
+        return Response(index.as_data(), status=200)
+
+
+class MatchRecordingThumbnailsView(APIView):
+    """
+    GET /api/matches/<match_id>/recording/thumbnails/
+    Scrub-preview sprite sheets of the match recording (stato/sprites.py):
+    {"interval", "width", "height", "columns", "rows", "count",
+     "sheets": [<sheet URL>, ...], "vtt_url": <WebVTT thumbnails track>}.
+    Thumbnail i is cell i % (columns * rows) of sheet i // (columns * rows),
+    covering seconds [i * interval, (i + 1) * interval). 404 until the media
+    worker has built them.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @etag_by_team_version()
+    def get(self, request, match_id):
+        team = _get_team(request)
+        if not team:
+            return Response({"detail": "No team assigned."}, status=400)
+        recording_name = MatchRecording.objects.filter(
+            match__team=team, match_id=match_id
+        ).values_list("file", flat=True).first()
+        if not recording_name:
+            return Response({"detail": "No recording."}, status=404)
+        index = load_sprite_index(recording_name)
+        if index is None:
+            return Response({"detail": "Thumbnails are not ready."}, status=404)
+        directory = sprites_dir(recording_name)
+
+        def url(name):
+            return request.build_absolute_uri(default_storage.url(f"{directory}/{name}"))
+
+        data = {k: v for k, v in index.items() if k != "sheets"}
+        data["sheets"] = [url(sheet) for sheet in index["sheets"]]
+        data["vtt_url"] = url(VTT_NAME)
+        return Response(data, status=200)
 
 
 class LiveMatchSuggestionsView(APIView):
@@ -2,12 +2,12 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Avg
-from django.utils import timezone
+from django.db.models import Sum, Count, Avg, Max
 from datetime import timedelta
 
 from .models import PlayerEventStat, Player, Team, Match
 from .views import _get_team
+from .versioning import cached_by_team_version
 
 
 class MLPerformanceImprovementView(APIView):
@@ -19,6 +19,7 @@ class MLPerformanceImprovementView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_by_team_version()
     def get(self, request):
         team = _get_team(request)
         if not team:
@@ -61,13 +62,17 @@ class MLPerformanceImprovementView(APIView):
         
         stats = stats_query.values("event").annotate(
             total=Sum("count"),
-            matches=Count("match", distinct=True)
+            matches=Count("match", distinct=True),
+            last_updated=Max("updated_at"),
         )
 
         # Build performance profile
         performance = {}
         total_events = 0
+        last_updated = None
         for stat in stats:
+            if last_updated is None or stat["last_updated"] > last_updated:
+                last_updated = stat["last_updated"]
             event = stat["event"]
             count = stat["total"] or 0
             matches = stat["matches"] or 1
@@ -229,5 +234,7 @@ class MLPerformanceImprovementView(APIView):
             "performance_breakdown": performance,
             "recommendations": recommendations,
             "priority_score": priority_score,
-            "analysis_date": timezone.now().isoformat(),
+            # When the stats behind the analysis last changed: the response is
+            # cached until the team's data does, so "now" would go stale
+            "analysis_date": last_updated.isoformat() if last_updated else None,
         }
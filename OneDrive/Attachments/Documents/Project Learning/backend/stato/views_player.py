@@ -1,13 +1,21 @@
 # views_player.py - Player signup and management
+from urllib.parse import quote
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth.models import User
 from django.db import transaction
-from django.db.models import Sum, Count
+from django.db.models import F, Sum, Count
 
-from .models import Profile, Team, Player, PlayerEventStat
-from .serializers import TeamSerializer, EventStatSerializer
+from .models import HighlightClip, Profile, Team, Player, PlayerEventStat
+from .serializers import TeamSerializer, EventStatSerializer, token_pair_for
+from .authentication import bump_auth_version
+from .pagination import StatsCursorPagination
+from .stream_token import make_clip_tokens, read_clip_token
+from .versioning import bump_team_version
+from .views import EVENT_KEYS, _get_team
+from .views_match import _stream_recording
 
 
 class PlayerSignupView(APIView):
@@ -137,12 +145,17 @@ class PlayerJoinTeamView(APIView):
         profile.team = team
         profile.player = player
         profile.save()
+        bump_team_version(team.id)
+        bump_auth_version([profile.user_id])
+        profile.refresh_from_db(fields=["auth_version"])
 
         return Response(
             {
                 "message": "Successfully joined team.",
                 "team": TeamSerializer(team).data,
                 "player": {"id": player.id, "name": player.name},
+                # Tokens carrying the new team; the old ones fall back to DB lookups
+                "tokens": token_pair_for(profile.user),
             },
             status=200,
         )
@@ -164,11 +177,18 @@ class PlayerLeaveTeamView(APIView):
             return Response({"detail": "You are not on any team."}, status=400)
 
         # Fully unlink profile from team and player — they will see no team and no stats
+        old_team_id = profile.team_id
         profile.team = None
         profile.player = None
         profile.save()
+        bump_team_version(old_team_id)
+        bump_auth_version([profile.user_id])
+        profile.refresh_from_db(fields=["auth_version"])
 
-        return Response({"message": "Successfully left team."}, status=200)
+        return Response({
+            "message": "Successfully left team.",
+            "tokens": token_pair_for(profile.user),
+        }, status=200)
 
 
 class PlayerProfileView(APIView):
@@ -223,6 +243,7 @@ class PlayerMeStatsView(APIView):
     GET /api/players/me/stats/
     Returns only the logged-in player's stats (per match, same format as /api/stats/)
     so players never receive other team members' data.
+    ?limit=&cursor= for keyset pages (see stato/pagination.py)
     """
     permission_classes = [IsAuthenticated]
 
@@ -236,5 +257,92 @@ class PlayerMeStatsView(APIView):
             return Response([], status=200)
 
         qs = PlayerEventStat.objects.filter(player=player).order_by("-updated_at")
+        paginator = StatsCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(EventStatSerializer(page, many=True).data)
         serializer = EventStatSerializer(qs, many=True)
         return Response(serializer.data, status=200)
+
+
+class PlayerClipsView(APIView):
+    """
+    GET /api/players/<player_id>/clips/?event=shots_on_target&season=2025/26&match=<id>
+    Playlist of the player's highlight clips (a few seconds around each
+    event, cut by the media worker - see stato/clips.py), oldest match
+    first. Managers can fetch any player in their team; a player only
+    their own. Each url is a short-lived signed link to PlayerClipStreamView;
+    /media/ doesn't serve clips.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, player_id):
+        team = _get_team(request)
+        if not team:
+            return Response({"detail": "No team assigned."}, status=400)
+        player = Player.objects.filter(team=team, id=player_id).first()
+        if not player:
+            return Response({"detail": "Player not found."}, status=404)
+        profile = Profile.objects.filter(user=request.user).values("role", "player_id").first()
+        if profile and profile["role"] == "player" and profile["player_id"] != player.id:
+            return Response({"detail": "Players can only view their own clips."}, status=403)
+
+        # Only clips of the match's current recording
+        clips = HighlightClip.objects.filter(
+            event__player=player, source=F("event__match__recording__file")
+        ).select_related("event__match").order_by("event__match__kickoff_at", "event__second", "event_id")
+        event = request.query_params.get("event")
+        if event:
+            if event not in EVENT_KEYS:
+                return Response({"detail": "Invalid event."}, status=400)
+            clips = clips.filter(event__event=event)
+        season = request.query_params.get("season")
+        if season:
+            clips = clips.filter(event__match__season=season)
+        match_id = request.query_params.get("match")
+        if match_id:
+            try:
+                clips = clips.filter(event__match_id=int(match_id))
+            except ValueError:
+                return Response({"detail": "match must be an integer."}, status=400)
+
+        clips = list(clips)
+        tokens = make_clip_tokens(clips, request.user.id)
+        return Response({
+            "player_id": player.id,
+            "player": player.name,
+            "event": event,
+            "clips": [
+                {
+                    "event_id": clip.event_id,
+                    "event": clip.event.event,
+                    "match_id": clip.event.match_id,
+                    "opponent": clip.event.match.opponent,
+                    "kickoff_at": clip.event.match.kickoff_at,
+                    "second": clip.event.second,
+                    "start_second": clip.start_second,
+                    "duration": clip.duration,
+                    "url": request.build_absolute_uri(
+                        f"/api/players/{player.id}/clips/{clip.event_id}/stream/"
+                        f"?token={quote(tokens[clip.event_id], safe='')}"
+                    ),
+                }
+                for clip in clips
+            ],
+        }, status=200)
+
+
+class PlayerClipStreamView(APIView):
+    """
+    GET /api/players/<player_id>/clips/<event_id>/stream/?token=<signed_token>
+    Stream one highlight clip, with Range support. The token comes from the
+    clips playlist above (the <video> element can't send Authorization) and
+    carries the clip's path, so serving it does no database queries.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, player_id, event_id):
+        payload = read_clip_token(request.query_params.get("token", "").strip(), event_id)
+        if not payload:
+            return Response({"detail": "Invalid or expired token."}, status=401)
+        return _stream_recording(request, payload["p"], "video/mp4")
@@ -0,0 +1,77 @@
+# views_sync.py - Delta sync for mobile clients
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from .models import ChatMessage, Match, PlayerEventInstance, PlayerEventStat
+from .serializers import EventInstanceSerializer, EventStatSerializer, MatchSerializer
+from .sync import deletions_since, make_sync_token, parse_sync_token, sync_window_start, tombstones_expired
+from .versioning import etag_by_team_version
+from .views import _get_team
+from .views_chat import _message_data
+
+
+class SyncView(APIView):
+    """
+    GET /api/sync/               -> full snapshot (chat: last 50 messages) + token
+    GET /api/sync/?since=<token> -> only what was created / changed since the
+                                    token, plus deleted ids, + a new token
+
+    Response:
+    {
+      "token": "...", "full": bool,
+      "matches": [...], "stats": [...], "events": [...], "chat": [...],
+      "deleted": {"player": [ids], "stat": [ids], "event": [ids]}
+    }
+    Clients upsert by id (rows near the token boundary can come back twice)
+    and drop the deleted ids. A 304 for the same ?since= means nothing changed.
+    A token older than TOMBSTONE_RETENTION gets a full snapshot ("full": true):
+    the tombstones it would need may be gone, so the client replaces its data.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @etag_by_team_version()
+    def get(self, request):
+        team = _get_team(request)
+        if not team:
+            return Response({"detail": "No team assigned."}, status=400)
+
+        since = None
+        token = request.query_params.get("since")
+        if token:
+            since = parse_sync_token(token)
+            if since is None:
+                return Response({"detail": "Invalid sync token."}, status=400)
+            if tombstones_expired(since):
+                since = None
+
+        # Taken before reading so anything written during this request is in the next delta
+        started_at = timezone.now()
+
+        matches = Match.objects.filter(team=team).select_related("recording")
+        stats = PlayerEventStat.objects.filter(team=team).select_related("player")
+        events = PlayerEventInstance.objects.filter(team=team).select_related("player")
+        chat = ChatMessage.objects.filter(team=team).select_related("sender")
+
+        if since is None:
+            chat = reversed(chat.order_by("-created_at", "-id")[:50])
+            deleted = deletions_since(team, None)
+        else:
+            start = sync_window_start(since)
+            matches = matches.filter(updated_at__gte=start)
+            stats = stats.filter(updated_at__gte=start)
+            events = events.filter(created_at__gte=start)
+            chat = chat.filter(created_at__gte=start).order_by("created_at", "id")
+            deleted = deletions_since(team, start)
+
+        context = {"request": request, "include_recording_urls": False}
+        return Response({
+            "token": make_sync_token(started_at),
+            "full": since is None,
+            "matches": MatchSerializer(matches.order_by("updated_at", "id"), many=True, context=context).data,
+            "stats": EventStatSerializer(stats.order_by("updated_at", "id"), many=True).data,
+            "events": EventInstanceSerializer(events.order_by("created_at", "id"), many=True).data,
+            "chat": [_message_data(msg) for msg in chat],
+            "deleted": deleted,
+        }, status=200)
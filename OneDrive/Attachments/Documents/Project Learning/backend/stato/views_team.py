@@ -1,12 +1,162 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Sum, Count, Q, F, DecimalField
-from django.db.models.functions import Coalesce
+from django.db.models import Sum, Count, Q
 
 from .models import Match, PlayerEventStat, ZoneAnalysis, PlayerEventInstance, Team
 from .serializers import ZoneAnalysisSerializer, TeamSignupSerializer, TeamSerializer
 from .views import _get_team
+from .authentication import load_team
+from .aggregates import season_totals
+from .versioning import bump_team_version, cached_by_team_version, etag_by_team_version
+from .xg_models import SHOT_EVENTS
+
+
+def _performance_stats_data(team, season=None):
+    """Body of GET /api/teams/performance-stats/ (also a /api/dashboard/ section)."""
+    # Include all matches (not just finished/live) to show all goals;
+    # read from the materialised season totals
+    totals = season_totals(team, season, scope="all")
+    match_count = totals["match_count"]
+    total_goals_scored = totals["goals_scored"]
+    total_goals_conceded = totals["goals_conceded"]
+    total_xg = totals["xg"]
+    total_xg_against = totals["xg_against"]
+    wins = totals["wins"]
+    draws = totals["draws"]
+    losses = totals["losses"]
+
+    # Most used formation
+    formations = totals["formations"]
+    most_used_formation = min(formations, key=lambda f: (-formations[f]["matches"], f)) if formations else None
+
+    # Average goals per match
+    avg_goals_scored = total_goals_scored / match_count if match_count > 0 else 0
+    avg_goals_conceded = total_goals_conceded / match_count if match_count > 0 else 0
+
+    return {
+        "season": season,
+        "match_count": match_count,
+        "most_used_formation": most_used_formation,
+        "goals": {
+            "scored": total_goals_scored,
+            "conceded": total_goals_conceded,
+            "difference": total_goals_scored - total_goals_conceded,
+            "avg_scored": round(avg_goals_scored, 2),
+            "avg_conceded": round(avg_goals_conceded, 2),
+        },
+        "xg": {
+            "for": float(total_xg),
+            "against": float(total_xg_against),
+            "difference": float(total_xg - total_xg_against),
+        },
+        "record": {
+            "wins": wins,
+            "draws": draws,
+            "losses": losses,
+            "points": wins * 3 + draws,
+        },
+    }
+
+
+def _player_xg_data(team, season=None):
+    """Body of GET /api/teams/player-xg-stats/ (also a /api/dashboard/ section)."""
+    shots = PlayerEventInstance.objects.filter(team=team, event__in=SHOT_EVENTS)
+    if season:
+        shots = shots.filter(match__season=season)
+
+    # Per-shot xG is stored when the shot is logged, so totals, shot counts
+    # and accuracy all come from one grouped query
+    rows = shots.values("player_id", "player__name").annotate(
+        total_xg=Sum("xg"),
+        shots=Count("id"),
+        on_target=Count("id", filter=Q(event="shots_on_target")),
+    ).order_by("-total_xg", "player__name")
+
+    player_xg_list = [
+        {
+            "player": row["player__name"],
+            "player_id": row["player_id"],
+            "xg": round(float(row["total_xg"] or 0), 2),
+            "shots": row["shots"],
+            "shots_on_target": row["on_target"],
+            "on_target_ratio": round(row["on_target"] / row["shots"], 2) if row["shots"] else 0,
+        }
+        for row in rows
+    ]
+
+    return {
+        "season": season,
+        "player_xg": player_xg_list,
+    }
+
+
+def _zone_analysis_data(team, season=None):
+    """Body of GET /api/teams/zone-analysis/ (also a /api/dashboard/ section)."""
+    # Get zone analysis from database
+    zones_qs = ZoneAnalysis.objects.filter(team=team)
+    if season:
+        zones_qs = zones_qs.filter(season=season)
+
+    zones = zones_qs
+
+    # If no manual entries, calculate from event instances
+    if not zones.exists():
+        from .models import PlayerEventInstance
+        from django.db.models import Count, Q
+
+        season_filter = Q()
+        if season:
+            season_filter = Q(match__season=season)
+
+        # Get event counts by zone
+        zone_stats = PlayerEventInstance.objects.filter(
+            team=team
+        ).filter(season_filter).exclude(zone__isnull=True).exclude(zone="").values("zone").annotate(
+            total_events=Count("id"),
+            successful=Count("id", filter=Q(event__in=["duels_won", "interceptions", "blocks", "tackles", "clearances"])),
+        )
+
+        # Calculate success rates and identify strengths/weaknesses
+        strengths = []
+        weaknesses = []
+
+        for zone_stat in zone_stats:
+            zone = zone_stat["zone"]
+            total = zone_stat["total_events"]
+            successful = zone_stat["successful"]
+            success_rate = (successful / total * 100) if total > 0 else 0
+
+            if success_rate >= 60:  # Threshold for strength
+                strengths.append({
+                    "zone": zone,
+                    "events": total,
+                    "success_rate": round(success_rate, 1),
+                })
+            elif success_rate < 40:  # Threshold for weakness
+                weaknesses.append({
+                    "zone": zone,
+                    "events": total,
+                    "success_rate": round(success_rate, 1),
+                })
+
+        return {
+            "season": season,
+            "strengths": strengths,
+            "weaknesses": weaknesses,
+            "source": "calculated",
+        }
+
+    # Return manual entries
+    strengths = zones.filter(zone_type="strength")
+    weaknesses = zones.filter(zone_type="weakness")
+
+    return {
+        "season": season,
+        "strengths": ZoneAnalysisSerializer(strengths, many=True).data,
+        "weaknesses": ZoneAnalysisSerializer(weaknesses, many=True).data,
+        "source": "manual",
+    }
 
 
 class TeamSignupView(APIView):
@@ -38,7 +188,7 @@ class TeamMeView(APIView):
         team = _get_team(request)
         if not team:
             return Response({"detail": "No team assigned."}, status=400)
-        return Response(TeamSerializer(team).data, status=200)
+        return Response(TeamSerializer(load_team(team)).data, status=200)
 
 
 class TeamPerformanceStatsView(APIView):
@@ -53,135 +203,32 @@ class TeamPerformanceStatsView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @etag_by_team_version()
     def get(self, request):
         team = _get_team(request)
         if not team:
             return Response({"detail": "No team assigned."}, status=400)
 
         season = request.query_params.get("season", None)
-
-        # Include all matches (not just finished/live) to show all goals
-        matches_qs = Match.objects.filter(team=team)
-        if season:
-            matches_qs = matches_qs.filter(season=season)
-
-        matches = matches_qs
-
-        # Most used formation
-        formation_counts = matches.exclude(formation__isnull=True).exclude(formation="").values("formation").annotate(
-            count=Count("id")
-        ).order_by("-count")
-        most_used_formation = formation_counts.first()["formation"] if formation_counts else None
-
-        # Goals
-        total_goals_scored = matches.aggregate(total=Sum("goals_scored"))["total"] or 0
-        total_goals_conceded = matches.aggregate(total=Sum("goals_conceded"))["total"] or 0
-
-        # xG
-        total_xg = matches.aggregate(total=Sum("xg"))["total"] or 0
-        total_xg_against = matches.aggregate(total=Sum("xg_against"))["total"] or 0
-
-        # Match record
-        wins = matches.filter(goals_scored__gt=F("goals_conceded")).count()
-        draws = matches.filter(goals_scored=F("goals_conceded")).count()
-        losses = matches.filter(goals_scored__lt=F("goals_conceded")).count()
-
-        # Total matches
-        match_count = matches.count()
-
-        # Average goals per match
-        avg_goals_scored = total_goals_scored / match_count if match_count > 0 else 0
-        avg_goals_conceded = total_goals_conceded / match_count if match_count > 0 else 0
-
-        return Response({
-            "season": season,
-            "match_count": match_count,
-            "most_used_formation": most_used_formation,
-            "goals": {
-                "scored": total_goals_scored,
-                "conceded": total_goals_conceded,
-                "difference": total_goals_scored - total_goals_conceded,
-                "avg_scored": round(avg_goals_scored, 2),
-                "avg_conceded": round(avg_goals_conceded, 2),
-            },
-            "xg": {
-                "for": float(total_xg),
-                "against": float(total_xg_against),
-                "difference": float(total_xg - total_xg_against),
-            },
-            "record": {
-                "wins": wins,
-                "draws": draws,
-                "losses": losses,
-                "points": wins * 3 + draws,
-            },
-        }, status=200)
+        return Response(_performance_stats_data(team, season), status=200)
 
 
 class PlayerXGStatsView(APIView):
     """
     GET /api/teams/player-xg-stats/
-    Returns player xG totals calculated from shot events with zones.
+    Returns player xG totals calculated from shot events with zones,
+    plus shot counts and on-target ratio per player.
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_by_team_version()
     def get(self, request):
         team = _get_team(request)
         if not team:
             return Response({"detail": "No team assigned."}, status=400)
 
         season = request.query_params.get("season", None)
-        from .models import PlayerEventInstance
-        from django.db.models import Q
-
-        season_filter = Q()
-        if season:
-            season_filter = Q(match__season=season)
-
-        # Get all shot events for the team
-        shots_on_target = PlayerEventInstance.objects.filter(
-            team=team,
-            event="shots_on_target"
-        ).filter(season_filter).select_related("player")
-
-        shots_off_target = PlayerEventInstance.objects.filter(
-            team=team,
-            event="shots_off_target"
-        ).filter(season_filter).select_related("player")
-
-        # Calculate xG per player
-        player_xg = {}
-        
-        for shot in shots_on_target:
-            player_name = shot.player.name
-            if player_name not in player_xg:
-                player_xg[player_name] = 0.0
-            
-            zone = shot.zone
-            if zone in ["1", "2", "3"]:  # Attacking zones
-                player_xg[player_name] += 0.3
-            elif zone in ["4", "5", "6"]:  # Defensive/midfield zones
-                player_xg[player_name] += 0.1
-            else:
-                player_xg[player_name] += 0.2  # Default
-
-        for shot in shots_off_target:
-            player_name = shot.player.name
-            if player_name not in player_xg:
-                player_xg[player_name] = 0.0
-            player_xg[player_name] += 0.05
-
-        # Convert to list and sort
-        player_xg_list = [
-            {"player": name, "xg": round(xg, 2)}
-            for name, xg in player_xg.items()
-        ]
-        player_xg_list.sort(key=lambda x: x["xg"], reverse=True)
-
-        return Response({
-            "season": season,
-            "player_xg": player_xg_list,
-        }, status=200)
+        return Response(_player_xg_data(team, season), status=200)
 
 
 class TeamPerformanceSuggestionsView(APIView):
@@ -191,6 +238,7 @@ class TeamPerformanceSuggestionsView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_by_team_version()
     def get(self, request):
         team = _get_team(request)
         if not team:
@@ -198,14 +246,10 @@ class TeamPerformanceSuggestionsView(APIView):
 
         season = request.query_params.get("season", None)
         
-        # Filter matches
-        matches_qs = Match.objects.filter(team=team, state="finished")
-        if season:
-            matches_qs = matches_qs.filter(season=season)
-        
-        matches = matches_qs
-        match_count = matches.count()
-        
+        # Finished matches only, read from the materialised season totals
+        totals = season_totals(team, season, scope="finished")
+        match_count = totals["match_count"]
+
         if match_count == 0:
             return Response({
                 "suggestions": [],
@@ -213,25 +257,10 @@ class TeamPerformanceSuggestionsView(APIView):
             }, status=200)
 
         suggestions = []
-        
+
         # 1. Formation Analysis
-        formation_results = {}
-        for match in matches:
-            if match.formation:
-                if match.formation not in formation_results:
-                    formation_results[match.formation] = {"wins": 0, "draws": 0, "losses": 0, "goals_for": 0, "goals_against": 0, "matches": 0}
-                
-                formation_results[match.formation]["matches"] += 1
-                formation_results[match.formation]["goals_for"] += match.goals_scored
-                formation_results[match.formation]["goals_against"] += match.goals_conceded
-                
-                if match.goals_scored > match.goals_conceded:
-                    formation_results[match.formation]["wins"] += 1
-                elif match.goals_scored == match.goals_conceded:
-                    formation_results[match.formation]["draws"] += 1
-                else:
-                    formation_results[match.formation]["losses"] += 1
-        
+        formation_results = totals["formations"]
+
         if formation_results:
             # Find best and worst formations
             best_formation = None
@@ -263,8 +292,8 @@ class TeamPerformanceSuggestionsView(APIView):
                 })
         
         # 2. Goals Analysis
-        total_goals_for = matches.aggregate(total=Sum("goals_scored"))["total"] or 0
-        total_goals_against = matches.aggregate(total=Sum("goals_conceded"))["total"] or 0
+        total_goals_for = totals["goals_scored"]
+        total_goals_against = totals["goals_conceded"]
         avg_goals_for = total_goals_for / match_count if match_count > 0 else 0
         avg_goals_against = total_goals_against / match_count if match_count > 0 else 0
         
@@ -297,8 +326,8 @@ class TeamPerformanceSuggestionsView(APIView):
             })
         
         # 3. xG Analysis
-        total_xg = matches.aggregate(total=Sum("xg"))["total"] or 0
-        total_xg_against = matches.aggregate(total=Sum("xg_against"))["total"] or 0
+        total_xg = totals["xg"]
+        total_xg_against = totals["xg_against"]
         avg_xg = float(total_xg) / match_count if match_count > 0 else 0
         avg_xg_against = float(total_xg_against) / match_count if match_count > 0 else 0
         
@@ -331,18 +360,8 @@ class TeamPerformanceSuggestionsView(APIView):
             })
         
         # 4. Event Analysis (passing, duels, etc.)
-        from .models import PlayerEventStat
-        event_stats = PlayerEventStat.objects.filter(
-            team=team,
-            match__in=matches
-        ).values("event").annotate(
-            total=Sum("count"),
-            matches=Count("match", distinct=True)
-        )
-        
         event_totals = {}
-        for stat in event_stats:
-            event = stat["event"]
+        for event, stat in totals["event_totals"].items():
             total = stat["total"] or 0
             matches_count = stat["matches"] or 1
             event_totals[event] = {
@@ -424,77 +443,14 @@ class ZoneAnalysisView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_by_team_version()
     def get(self, request):
         team = _get_team(request)
         if not team:
             return Response({"detail": "No team assigned."}, status=400)
 
         season = request.query_params.get("season", None)
-
-        # Get zone analysis from database
-        zones_qs = ZoneAnalysis.objects.filter(team=team)
-        if season:
-            zones_qs = zones_qs.filter(season=season)
-
-        zones = zones_qs
-
-        # If no manual entries, calculate from event instances
-        if not zones.exists():
-            from .models import PlayerEventInstance
-            from django.db.models import Count, Q
-
-            season_filter = Q()
-            if season:
-                season_filter = Q(match__season=season)
-
-            # Get event counts by zone
-            zone_stats = PlayerEventInstance.objects.filter(
-                team=team
-            ).filter(season_filter).exclude(zone__isnull=True).exclude(zone="").values("zone").annotate(
-                total_events=Count("id"),
-                successful=Count("id", filter=Q(event__in=["duels_won", "interceptions", "blocks", "tackles", "clearances"])),
-            )
-
-            # Calculate success rates and identify strengths/weaknesses
-            strengths = []
-            weaknesses = []
-            
-            for zone_stat in zone_stats:
-                zone = zone_stat["zone"]
-                total = zone_stat["total_events"]
-                successful = zone_stat["successful"]
-                success_rate = (successful / total * 100) if total > 0 else 0
-
-                if success_rate >= 60:  # Threshold for strength
-                    strengths.append({
-                        "zone": zone,
-                        "events": total,
-                        "success_rate": round(success_rate, 1),
-                    })
-                elif success_rate < 40:  # Threshold for weakness
-                    weaknesses.append({
-                        "zone": zone,
-                        "events": total,
-                        "success_rate": round(success_rate, 1),
-                    })
-
-            return Response({
-                "season": season,
-                "strengths": strengths,
-                "weaknesses": weaknesses,
-                "source": "calculated",
-            }, status=200)
-
-        # Return manual entries
-        strengths = zones.filter(zone_type="strength")
-        weaknesses = zones.filter(zone_type="weakness")
-
-        return Response({
-            "season": season,
-            "strengths": ZoneAnalysisSerializer(strengths, many=True).data,
-            "weaknesses": ZoneAnalysisSerializer(weaknesses, many=True).data,
-            "source": "manual",
-        }, status=200)
+        return Response(_zone_analysis_data(team, season), status=200)
 
     def post(self, request):
         team = _get_team(request)
@@ -521,5 +477,6 @@ class ZoneAnalysisView(APIView):
                 "notes": notes,
             }
         )
+        bump_team_version(team.id)
 
         return Response(ZoneAnalysisSerializer(zone_analysis).data, status=201 if created else 200)
@@ -0,0 +1,254 @@
+# views_upload.py - Resumable recording uploads (see stato/uploads.py)
+import base64
+import binascii
+
+from django.http import UnreadablePostError
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from .models import Match, RecordingUpload
+from .views import _get_team
+from .views_match import _recording_saved_response
+from .uploads import (
+    ChecksumMismatch,
+    UploadIncomplete,
+    UploadOffsetMismatch,
+    append_chunk,
+    create_upload,
+    discard_upload,
+    finalize_upload,
+    store_part,
+)
+
+CHUNK_CONTENT_TYPES = ("application/offset+octet-stream", "application/octet-stream")
+MAX_PARTS = 10000
+
+
+def _parse_size(value):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return None
+    return size if size >= 0 else None
+
+
+def _upload_headers(response, upload):
+    response["Upload-Offset"] = str(upload.offset)
+    response["Upload-Length"] = str(upload.length)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _upload_data(request, upload):
+    data = {
+        "id": str(upload.id),
+        "url": request.build_absolute_uri(f"/api/matches/{upload.match_id}/video/uploads/{upload.id}/"),
+        "filename": upload.filename,
+        "offset": upload.offset,
+        "length": upload.length,
+        "part_count": upload.part_count,
+    }
+    if upload.part_count:
+        data["parts"] = [
+            {"number": n, "size": size, "sha256": sha256}
+            for n, size, sha256 in upload.parts.order_by("number").values_list("number", "size", "sha256")
+        ]
+    return data
+
+
+def _parse_checksum(value):
+    """
+    Upload-Checksum: "sha256 <hex or base64 digest>" -> hex digest; "" if
+    absent, None if it can't be read.
+    """
+    if not value:
+        return ""
+    algorithm, _, digest = value.strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        return None
+    digest = digest.strip()
+    if len(digest) == 64:
+        return digest.lower()
+    try:
+        raw = base64.b64decode(digest, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return raw.hex() if len(raw) == 32 else None
+
+
+def _conflict(offset):
+    response = Response({"detail": "Upload-Offset does not match the upload's offset.", "offset": offset}, status=409)
+    response["Upload-Offset"] = str(offset)
+    return response
+
+
+def _get_upload(request, match_id, upload_id):
+    team = _get_team(request)
+    if not team:
+        return None
+    return RecordingUpload.objects.filter(
+        id=upload_id, match_id=match_id, match__team=team
+    ).select_related("match").first()
+
+
+class RecordingUploadCreateView(APIView):
+    """
+    POST /api/matches/<match_id>/video/uploads/
+    {"length": <total bytes>, "filename": "match.mp4", "duration_seconds": 5400}
+    (length may also come as an Upload-Length header). Returns the upload's
+    url; PATCH chunks to it, then POST <url>finalize/.
+    Add "parts": N for multi-part mode: PUT <url>parts/1/ .. parts/N/ in any
+    order and concurrently, then finalize.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, match_id):
+        team = _get_team(request)
+        if not team:
+            return Response({"detail": "No team assigned."}, status=400)
+
+        match = Match.objects.filter(team=team, id=match_id).first()
+        if not match:
+            return Response({"detail": "Match not found."}, status=404)
+
+        length = _parse_size(request.data.get("length", request.headers.get("Upload-Length")))
+        if length is None:
+            return Response({"detail": "length (total size in bytes) is required."}, status=400)
+        duration = _parse_size(request.data.get("duration_seconds"))
+        part_count = None
+        if request.data.get("parts") is not None:
+            part_count = _parse_size(request.data.get("parts"))
+            if not part_count or part_count > MAX_PARTS:
+                return Response({"detail": f"parts must be between 1 and {MAX_PARTS}."}, status=400)
+
+        upload = create_upload(match, request.user, request.data.get("filename"), length, duration, part_count)
+        response = Response(_upload_data(request, upload), status=201)
+        response["Location"] = response.data["url"]
+        return _upload_headers(response, upload)
+
+
+class RecordingUploadView(APIView):
+    """
+    /api/matches/<match_id>/video/uploads/<upload_id>/
+    GET / HEAD  current offset (Upload-Offset header); resume from there
+    PATCH       append the body at Upload-Offset
+                (Content-Type: application/offset+octet-stream) -> 204
+    DELETE      abandon the upload
+    A PATCH whose Upload-Offset isn't the current offset gets 409 with the
+    offset to resume from.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, match_id, upload_id):
+        upload = _get_upload(request, match_id, upload_id)
+        if not upload:
+            return Response({"detail": "Upload not found."}, status=404)
+        return _upload_headers(Response(_upload_data(request, upload)), upload)
+
+    def patch(self, request, match_id, upload_id):
+        upload = _get_upload(request, match_id, upload_id)
+        if not upload:
+            return Response({"detail": "Upload not found."}, status=404)
+        if upload.part_count:
+            return Response({"detail": "Multi-part upload: PUT parts/<n>/ instead."}, status=400)
+        if request.content_type.split(";")[0].strip() not in CHUNK_CONTENT_TYPES:
+            return Response({"detail": "Content-Type must be application/offset+octet-stream."}, status=415)
+
+        offset = _parse_size(request.headers.get("Upload-Offset"))
+        chunk_length = _parse_size(request.META.get("CONTENT_LENGTH"))
+        if offset is None or chunk_length is None:
+            return Response({"detail": "Upload-Offset and Content-Length headers are required."}, status=400)
+        if offset + chunk_length > upload.length:
+            return Response({"detail": "Chunk runs past the upload's length."}, status=400)
+
+        if not chunk_length:
+            return _upload_headers(Response(status=204), upload)
+        try:
+            # request.stream is the raw body; request.data is never touched, so nothing buffers it
+            append_chunk(upload, offset, request.stream, chunk_length)
+        except UploadOffsetMismatch as e:
+            return _conflict(e.offset)
+        except UnreadablePostError:
+            # Connection dropped mid-chunk; what arrived is kept
+            upload.refresh_from_db(fields=["offset"])
+            return _upload_headers(Response({"detail": "Chunk incomplete."}, status=400), upload)
+        return _upload_headers(Response(status=204), upload)
+
+    def delete(self, request, match_id, upload_id):
+        upload = _get_upload(request, match_id, upload_id)
+        if not upload:
+            return Response({"detail": "Upload not found."}, status=404)
+        discard_upload(upload)
+        return Response(status=204)
+
+
+class RecordingUploadPartView(APIView):
+    """
+    PUT /api/matches/<match_id>/video/uploads/<upload_id>/parts/<n>/
+    Raw body = part n (1-based) of a multi-part upload. Parts can be sent
+    concurrently and retried; a re-sent part replaces the earlier copy.
+    Optional Upload-Checksum: sha256 <hex|base64> is verified (460 if wrong).
+    Returns the part's size and SHA-256.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, match_id, upload_id, number):
+        upload = _get_upload(request, match_id, upload_id)
+        if not upload:
+            return Response({"detail": "Upload not found."}, status=404)
+        if not upload.part_count:
+            return Response({"detail": "Not a multi-part upload: PATCH chunks instead."}, status=400)
+        if not 1 <= number <= upload.part_count:
+            return Response({"detail": f"Part number must be between 1 and {upload.part_count}."}, status=400)
+
+        length = _parse_size(request.META.get("CONTENT_LENGTH"))
+        if length is None:
+            return Response({"detail": "Content-Length header is required."}, status=400)
+        if length > upload.length:
+            return Response({"detail": "Part is larger than the whole upload."}, status=400)
+        expected = _parse_checksum(request.headers.get("Upload-Checksum"))
+        if expected is None:
+            return Response({"detail": "Upload-Checksum must be 'sha256 <hex or base64 digest>'."}, status=400)
+
+        try:
+            # Streamed from the raw body, never buffered whole (see append_chunk)
+            part = store_part(upload, number, request.stream, length, expected)
+        except ChecksumMismatch as e:
+            return Response({"detail": "Checksum mismatch.", "sha256": str(e)}, status=460)
+        except UnreadablePostError:
+            return Response({"detail": "Part incomplete; send it again."}, status=400)
+        response = Response({"number": part.number, "size": part.size, "sha256": part.sha256})
+        return _upload_headers(response, upload)
+
+
+class RecordingUploadFinalizeView(APIView):
+    """
+    POST /api/matches/<match_id>/video/uploads/<upload_id>/finalize/
+    Once every byte is in, attach the file as the match recording (replacing
+    any previous one). Same response as POST /video/; multi-part uploads are
+    joined first and also return "checksum" (sha256 of the part digests + "-N").
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, match_id, upload_id):
+        upload = _get_upload(request, match_id, upload_id)
+        if not upload:
+            return Response({"detail": "Upload not found."}, status=404)
+        try:
+            recording, created, checksum = finalize_upload(upload)
+        except UploadIncomplete as e:
+            response = Response({
+                "detail": "Upload is not complete.", "missing_parts": e.missing, "size": e.size,
+            }, status=409)
+            return _upload_headers(response, upload)
+        except UploadOffsetMismatch as e:
+            response = Response({"detail": "Upload is not complete.", "offset": e.offset}, status=409)
+            return _upload_headers(response, upload)
+        except FileNotFoundError:
+            # Finalized by a concurrent request
+            return Response({"detail": "Upload not found."}, status=404)
+        response = _recording_saved_response(request, upload.match, recording, created)
+        if checksum:
+            response.data["checksum"] = checksum
+        return response
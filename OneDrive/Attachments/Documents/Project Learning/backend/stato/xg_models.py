@@ -0,0 +1,81 @@
+"""
+Named xG (expected goals) models.
+
+Each model scores a whole batch of shots at once: it gets NumPy arrays of
+event names and pitch zones and returns an array of xG values. The active
+model is picked with settings.XG_MODEL; `manage.py rescore_shot_xg` re-scores
+historical shots after the model changes.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+
+SHOT_EVENTS = ("shots_on_target", "shots_off_target")
+
+DEFAULT_XG_MODEL = "zone_v1"
+
+_XG_MODELS = {}
+
+
+def register_xg_model(name):
+    """Decorator: register fn(events, zones) -> np.ndarray of xG under `name`."""
+    def decorator(fn):
+        _XG_MODELS[name] = fn
+        return fn
+    return decorator
+
+
+def get_xg_model(name=None):
+    """Return the named model (or the configured one). Raises KeyError if unknown."""
+    name = name or getattr(settings, "XG_MODEL", DEFAULT_XG_MODEL)
+    return _XG_MODELS[name]
+
+
+def xg_model_names():
+    return sorted(_XG_MODELS)
+
+
+@register_xg_model("zone_v1")
+def zone_v1(events, zones):
+    """
+    Simplified xG model:
+    - Shots on target in zones 1-3 (attacking zones): 0.3 xG each
+    - Shots on target in zones 4-6 (defensive zones): 0.1 xG each
+    - Shots on target with no zone: 0.2 xG each
+    - Shots off target: 0.05 xG each
+    """
+    on_target = events == "shots_on_target"
+    return np.select(
+        [
+            on_target & np.isin(zones, ["1", "2", "3"]),
+            on_target & np.isin(zones, ["4", "5", "6"]),
+            on_target,
+            events == "shots_off_target",
+        ],
+        [0.3, 0.1, 0.2, 0.05],
+        default=0.0,
+    )
+
+
+def score_shots(events, zones, model=None):
+    """
+    Score many shots at once. Returns a list of Decimal xG values (2 dp),
+    with None for anything that isn't a shot, ready to store on
+    PlayerEventInstance.xg.
+    """
+    events = np.asarray(list(events), dtype=object)
+    zones = np.asarray([z if z is not None else "" for z in zones], dtype=object)
+    if events.size == 0:
+        return []
+    values = get_xg_model(model)(events, zones)
+    is_shot = np.isin(events, SHOT_EVENTS)
+    return [
+        Decimal(f"{v:.2f}") if shot else None
+        for v, shot in zip(values.tolist(), is_shot.tolist())
+    ]
+
+
+def score_shot(event, zone, model=None):
+    """Score a single event; None if it isn't a shot."""
+    return score_shots([event], [zone], model=model)[0]